@@ -3,6 +3,7 @@ Automation Voice Service
 Manages voice control configurations for relay devices via MQTT.
 """
 
+import itertools
 import json
 import uuid
 import os
@@ -11,22 +12,67 @@ import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List
 
-from middleware.mqtt_handler import MQTTHandler
-from middleware.logging import setup_logging, log_simple
+from middleware.mqtt_manager import MQTTConnectionManager
+from middleware.logging import setup_logging, log_simple, log_event
 from middleware.network_utils import get_active_mac_address
+from middleware.topic_router import TopicRouter
+from middleware.heartbeat import HeartbeatCoalescer
+from middleware.deadlines import DeadlineScheduler
+from middleware.device_history import DeviceHistory
+from middleware.discovery import DiscoveryCoordinator
 
 class AutomationVoice:
-    def __init__(self, config_file="JSON/automationVoiceConfig.json"):
+    COMPONENT = "automation_voice"
+    RESPONSE_TOPIC = "response/automation_voice/result"
+
+    def __init__(self, config_file="JSON/automationVoiceConfig.json", mqtt_manager=None, router_workers=4,
+                 history_capacity=256, history_max_devices=10000,
+                 discovery_window=5.0, discovery_quiet=1.5):
         self.config_file = config_file
-        self.mqtt = MQTTHandler(client_id="automation_voice")
+        # Use the shared connection when one is provided, otherwise a private one
+        self.mqtt_manager = mqtt_manager or MQTTConnectionManager(client_id="automation_voice")
+        self.mqtt = self.mqtt_manager.handler
         self.logger = setup_logging()
         self.ensure_config_file()
         self.device_status = {}  # Cache for device status
-        self.status_monitor_thread = None
+        self.status_version = 0  # Bumped on every status transition, used as ETag (last_seen excluded)
         self.monitoring_active = False
 
-        # Setup MQTT message handler
-        self.mqtt.client.on_message = self.on_mqtt_message
+        # Liveness deadlines per MAC, pushed back by every heartbeat
+        self.device_timeouts = DeadlineScheduler(self._on_devices_expired, name="device_timeouts")
+        self._heartbeat_intervals = {}
+
+        # Heartbeat arrivals and status transitions per MAC, for uptime/jitter/flap statistics
+        self.history = DeviceHistory(heartbeat_capacity=history_capacity, max_devices=history_max_devices)
+
+        # Announce responses to a discovery request are collected and persisted once per session
+        self.discovery = DiscoveryCoordinator(self._on_discovery_complete, window=discovery_window,
+                                              quiet=discovery_quiet)
+
+        # Callbacks notified of device status transitions and configuration changes
+        self._event_listeners = []
+        self._seed_status_cache(self.load_config())
+
+        # Serializes load/modify/save of the config file across router workers and Flask threads
+        self._config_lock = threading.RLock()
+        self._command_seq = itertools.count()
+        self.router = self._build_router(router_workers)
+        self.heartbeats = HeartbeatCoalescer()
+
+    def add_event_listener(self, callback):
+        """
+        Register a callback for service events, called as callback(event_type, data) with
+        "device_status" ({mac, status, last_seen}), "config" ({action, id}) or "discovery"
+        (aggregated session result).
+        """
+        self._event_listeners.append(callback)
+
+    def _emit(self, event_type, data):
+        for listener in list(self._event_listeners):
+            try:
+                listener(event_type, data)
+            except Exception as e:
+                log_simple(f"Error in AutomationVoice event listener: {e}", "ERROR")
 
     def ensure_config_file(self):
         """Ensure configuration file exists"""
@@ -56,6 +102,8 @@ class AutomationVoice:
         try:
             with open(self.config_file, 'w') as f:
                 json.dump(config, f, indent=2)
+            self._heartbeat_intervals = self._index_heartbeat_intervals(config)
+            self._seed_status_cache(config)
             return True
         except Exception as e:
             log_simple(f"Error saving config: {e}", "ERROR")
@@ -63,42 +111,50 @@ class AutomationVoice:
 
     def create_configuration(self, data):
         """Create new configuration"""
-        config = self.load_config()
-
-        # Generate unique ID
-        new_id = str(uuid.uuid4())
-
-        # Get MAC address
-        mac = get_active_mac_address()
-
-        # Create configuration entry
-        current_time = datetime.now(timezone.utc)
-        entry = {
-            "id": new_id,
-            "desc": data.get("desc", ""),
-            "object_name": data.get("object_name", ""),
-            "device_name": data.get("device_name", ""),
-            "part_number": data.get("part_number", ""),
-            "pin": int(data.get("pin", "1").replace("PIN", "")),
-            "address": int(data.get("address", 0)),
-            "device_bus": int(data.get("bus", 0)),
-            "mac": mac,
-            "created_at": current_time.isoformat() + "Z",
-            "updated_at": current_time.isoformat() + "Z"
-        }
-
-        config.append(entry)
-
-        if self.save_config(config):
-            log_simple(f"Created configuration with ID: {new_id}", "SUCCESS")
-            return {"status": "success", "id": new_id, "data": entry}
-        else:
-            return {"status": "error", "message": "Failed to save configuration"}
+        with self._config_lock:
+            config = self.load_config()
+
+            # Generate unique ID
+            new_id = str(uuid.uuid4())
+
+            # Get MAC address
+            mac = get_active_mac_address()
+
+            # Create configuration entry
+            current_time = datetime.now(timezone.utc)
+            entry = {
+                "id": new_id,
+                "desc": data.get("desc", ""),
+                "object_name": data.get("object_name", ""),
+                "device_name": data.get("device_name", ""),
+                "part_number": data.get("part_number", ""),
+                "pin": int(data.get("pin", "1").replace("PIN", "")),
+                "address": int(data.get("address", 0)),
+                "device_bus": int(data.get("bus", 0)),
+                "mac": mac,
+                "created_at": current_time.isoformat() + "Z",
+                "updated_at": current_time.isoformat() + "Z"
+            }
+
+            config.append(entry)
+
+            if self.save_config(config):
+                log_simple(f"Created configuration with ID: {new_id}", "SUCCESS")
+                self._emit("config", {"action": "create", "id": new_id})
+                return {"status": "success", "id": new_id, "data": entry}
+            else:
+                return {"status": "error", "message": "Failed to save configuration"}
 
     def read_configurations(self, filters=None):
         """Read configurations with optional filters"""
         configurations = self.load_config()
 
+        # last_seen of online devices is only kept in memory between status transitions
+        for conf in configurations:
+            cached = self.device_status.get(conf.get('mac'))
+            if cached and cached['status'] == conf.get('status') and cached.get('last_seen'):
+                conf['last_seen'] = cached['last_seen']
+
         if filters:
             # Apply filters if provided
             filtered = []
@@ -116,157 +172,259 @@ class AutomationVoice:
 
     def update_configuration(self, config_id, data):
         """Update existing configuration"""
-        configurations = self.load_config()
-
-        for i, conf in enumerate(configurations):
-            if conf["id"] == config_id:
-                # Update fields
-                for key, value in data.items():
-                    if key in ["device_name", "desc", "object_name", "pin", "address", "bus", "part_number", "mac"]:
-                        if key == "object_name":
-                            conf["object_name"] = value
-                        else:
-                            conf[key] = value
-
-                # Update timestamp
-                current_time = datetime.now(timezone.utc)
-                conf['updated_at'] = current_time.isoformat() + "Z"
+        with self._config_lock:
+            configurations = self.load_config()
 
-                if self.save_config(configurations):
-                    log_simple(f"Updated configuration with ID: {config_id}", "SUCCESS")
-                    return {"status": "success", "id": config_id, "data": conf}
-                else:
-                    return {"status": "error", "message": "Failed to save configuration"}
+            for i, conf in enumerate(configurations):
+                if conf["id"] == config_id:
+                    # Update fields
+                    for key, value in data.items():
+                        if key in ["device_name", "desc", "object_name", "pin", "address", "bus", "part_number", "mac"]:
+                            if key == "object_name":
+                                conf["object_name"] = value
+                            else:
+                                conf[key] = value
+
+                    # Update timestamp
+                    current_time = datetime.now(timezone.utc)
+                    conf['updated_at'] = current_time.isoformat() + "Z"
+
+                    if self.save_config(configurations):
+                        log_simple(f"Updated configuration with ID: {config_id}", "SUCCESS")
+                        self._emit("config", {"action": "update", "id": config_id})
+                        return {"status": "success", "id": config_id, "data": conf}
+                    else:
+                        return {"status": "error", "message": "Failed to save configuration"}
 
-        return {"status": "error", "message": "Configuration not found"}
+            return {"status": "error", "message": "Configuration not found"}
 
     def delete_configuration(self, config_id):
         """Delete configuration"""
-        configurations = self.load_config()
+        with self._config_lock:
+            configurations = self.load_config()
 
-        for i, conf in enumerate(configurations):
-            if conf["id"] == config_id:
-                deleted = configurations.pop(i)
-                if self.save_config(configurations):
-                    log_simple(f"Deleted configuration with ID: {config_id}", "SUCCESS")
-                    return {"status": "success", "id": config_id, "data": deleted}
-                else:
-                    return {"status": "error", "message": "Failed to save configuration"}
+            for i, conf in enumerate(configurations):
+                if conf["id"] == config_id:
+                    deleted = configurations.pop(i)
+                    if self.save_config(configurations):
+                        if deleted.get("mac") and not any(c.get("mac") == deleted["mac"] for c in configurations):
+                            self.history.forget(deleted["mac"])
+                        log_simple(f"Deleted configuration with ID: {config_id}", "SUCCESS")
+                        self._emit("config", {"action": "delete", "id": config_id})
+                        return {"status": "success", "id": config_id, "data": deleted}
+                    else:
+                        return {"status": "error", "message": "Failed to save configuration"}
 
-        return {"status": "error", "message": "Configuration not found"}
+            return {"status": "error", "message": "Configuration not found"}
 
     def update_device_status(self, mac_address, status, last_seen=None):
         """Update device status in configuration"""
-        try:
-            configurations = self.load_config()
-            updated = False
-            current_time = datetime.now(timezone.utc)
-
-            for config in configurations:
-                if config.get('mac') == mac_address:
-                    config['status'] = status
-                    if last_seen:
-                        config['last_seen'] = last_seen
-                    else:
-                        config['last_seen'] = current_time.isoformat() + "Z"
-                    config['updated_at'] = current_time.isoformat() + "Z"
-                    updated = True
-                    log_simple(f"Updated status for device {mac_address}: {status}", "INFO")
-
-            if updated:
-                self.save_config(configurations)
-                # Update cache
-                self.device_status[mac_address] = {
-                    'status': status,
-                    'last_seen': last_seen or (current_time.isoformat() + "Z")
-                }
+        self.history.record_status(mac_address, status)
+        with self._config_lock:
+            try:
+                configurations = self.load_config()
+                updated = False
+                current_time = datetime.now(timezone.utc)
 
-            return updated
-        except Exception as e:
-            log_simple(f"Error updating device status: {e}", "ERROR")
-            return False
+                for config in configurations:
+                    if config.get('mac') == mac_address:
+                        config['status'] = status
+                        if last_seen:
+                            config['last_seen'] = last_seen
+                        else:
+                            config['last_seen'] = current_time.isoformat() + "Z"
+                        config['updated_at'] = current_time.isoformat() + "Z"
+                        updated = True
+                        log_simple(f"Updated status for device {mac_address}: {status}", "INFO")
+
+                if updated:
+                    self.save_config(configurations)
+                    # Update cache
+                    self.device_status[mac_address] = {
+                        'status': status,
+                        'last_seen': last_seen or (current_time.isoformat() + "Z")
+                    }
+                    self.status_version += 1
+                    self._emit("device_status", dict(self.device_status[mac_address], mac=mac_address))
+
+                return updated
+            except Exception as e:
+                log_simple(f"Error updating device status: {e}", "ERROR")
+                return False
 
     def get_device_status(self, mac_address):
         """Get current device status"""
-        # Check cache first
-        if mac_address in self.device_status:
-            return self.device_status[mac_address]
-
-        # Check configuration file
-        configurations = self.load_config()
+        # The cache is seeded from the configuration file whenever it is saved
+        return self.device_status.get(mac_address) or {'status': 'unknown', 'last_seen': None}
+
+    def get_all_device_status(self, mac_addresses=None):
+        """
+        Get the status of many devices from the in-memory cache.
+        last_seen moves with every heartbeat without a version bump, so it is
+        left out here; get_device_status() has it.
+
+        Args:
+            mac_addresses: Only these MACs (unknown ones are reported as "unknown"); all if None
+
+        Returns:
+            (status_version, {mac: {'status'}})
+        """
+        version = self.status_version
+        cache = {mac: {'status': cached['status']} for mac, cached in list(self.device_status.items())}
+        if mac_addresses is None:
+            return version, cache
+        unknown = {'status': 'unknown'}
+        return version, {mac: cache.get(mac, unknown) for mac in mac_addresses}
+
+    def _seed_status_cache(self, configurations):
+        """Add devices of the configuration file that have no cached status yet"""
+        added = False
         for config in configurations:
-            if config.get('mac') == mac_address:
-                return {
+            mac = config.get('mac')
+            if mac and mac not in self.device_status:
+                self.device_status[mac] = {
                     'status': config.get('status', 'unknown'),
                     'last_seen': config.get('last_seen', None)
                 }
+                added = True
+        if added:
+            self.status_version += 1
+
+    @staticmethod
+    def _index_heartbeat_intervals(configurations):
+        """Heartbeat interval per MAC (the shortest one if a device has several configurations)"""
+        intervals = {}
+        for config in configurations:
+            mac = config.get('mac')
+            if mac:
+                interval = config.get('heartbeat_interval', 30)
+                intervals[mac] = min(interval, intervals.get(mac, interval))
+        return intervals
+
+    def _device_timeout(self, mac_address):
+        """Seconds without heartbeat after which a device is offline: 2x interval + 10 seconds"""
+        return self._heartbeat_intervals.get(mac_address, 30) * 2 + 10
 
-        return {'status': 'unknown', 'last_seen': None}
+    def _touch_device(self, mac_address):
+        """Push back a device's liveness deadline"""
+        self.device_timeouts.touch(mac_address, self._device_timeout(mac_address))
 
     def check_device_timeout(self):
-        """Check for devices that haven't sent heartbeat recently"""
-        try:
-            configurations = self.load_config()
-            current_time = datetime.now(timezone.utc)
-            updated = False
+        """
+        Arm liveness deadlines for every device stored as online.
+
+        The stored last_seen is only written on status transitions and on stop,
+        so it says nothing about heartbeats received by an earlier run; every
+        online device gets a full timeout from now to send one.
+        """
+        with self._config_lock:
+            try:
+                configurations = self.load_config()
+                self._heartbeat_intervals = self._index_heartbeat_intervals(configurations)
+                now = time.monotonic()
+                deadlines = {}
 
-            for config in configurations:
-                last_seen_str = config.get('last_seen')
-                heartbeat_interval = config.get('heartbeat_interval', 30)
+                for config in configurations:
+                    mac = config.get('mac')
+                    if mac and config.get('status') == 'online':
+                        deadlines[mac] = now + self._device_timeout(mac)
 
-                if last_seen_str and config.get('status') == 'online':
-                    try:
-                        last_seen = datetime.fromisoformat(last_seen_str.replace('Z', '+00:00'))
-                        time_diff = (current_time - last_seen).total_seconds()
+                self.device_timeouts.schedule_many(deadlines.items())
+            except Exception as e:
+                log_simple(f"Error checking device timeout: {e}", "ERROR")
 
-                        # If no heartbeat for 2x interval + 10 seconds, mark as offline
-                        if time_diff > (heartbeat_interval * 2) + 10:
-                            config['status'] = 'offline'
-                            config['updated_at'] = current_time.isoformat() + "Z"
-                            updated = True
-                            log_simple(f"Device {config.get('mac')} marked offline due to timeout", "WARNING")
-                    except ValueError as e:
-                        log_simple(f"Invalid last_seen format for device {config.get('mac')}: {e}", "ERROR")
+    def _persist_last_seen(self):
+        """Write the in-memory last_seen of every device to the configuration file (one save)"""
+        with self._config_lock:
+            try:
+                configurations = self.load_config()
+                updated = False
+                for config in configurations:
+                    cached = self.device_status.get(config.get('mac'))
+                    if (cached and cached['status'] == config.get('status') and cached.get('last_seen')
+                            and cached['last_seen'] != config.get('last_seen')):
+                        config['last_seen'] = cached['last_seen']
+                        updated = True
+                if updated:
+                    self.save_config(configurations)
+            except Exception as e:
+                log_simple(f"Error saving last_seen: {e}", "ERROR")
 
-            if updated:
-                self.save_config(configurations)
+    def _on_devices_expired(self, mac_addresses):
+        """Mark devices offline whose deadline expired (one config load/save per batch)"""
+        expired = set(mac_addresses)
+        with self._config_lock:
+            try:
+                configurations = self.load_config()
+                current_time = datetime.now(timezone.utc)
+                updated = False
+
+                for config in configurations:
+                    mac = config.get('mac')
+                    if mac not in expired or config.get('status') != 'online':
+                        continue
+                    last_seen_str = self.device_status.get(mac, {}).get('last_seen') or config.get('last_seen')
+                    config['status'] = 'offline'
+                    config['last_seen'] = last_seen_str
+                    config['updated_at'] = current_time.isoformat() + "Z"
+                    updated = True
+                    self.device_status[mac] = {
+                        'status': 'offline',
+                        'last_seen': last_seen_str
+                    }
+                    log_simple(f"Device {mac} marked offline due to timeout", "WARNING")
+
+                for mac in expired:
+                    self.heartbeats.forget(mac)
+                    # Also for devices without configuration, so their history shows the outage
+                    self.history.record_status(mac, 'offline')
+                if updated:
+                    self.status_version += 1
+                    self.save_config(configurations)
+                    for mac in expired:
+                        if self.device_status.get(mac, {}).get('status') == 'offline':
+                            self._emit("device_status", dict(self.device_status[mac], mac=mac))
 
-        except Exception as e:
-            log_simple(f"Error checking device timeout: {e}", "ERROR")
+            except Exception as e:
+                log_simple(f"Error checking device timeout: {e}", "ERROR")
 
     def start_status_monitoring(self):
-        """Start device status monitoring thread"""
+        """Start device liveness tracking"""
         if self.monitoring_active:
             return
 
         self.monitoring_active = True
-        self.status_monitor_thread = threading.Thread(target=self._status_monitor_loop, daemon=True)
-        self.status_monitor_thread.start()
+        self.check_device_timeout()
+        self.device_timeouts.start()
         log_simple("Device status monitoring started", "INFO")
 
     def stop_status_monitoring(self):
-        """Stop device status monitoring"""
+        """Stop device liveness tracking"""
         self.monitoring_active = False
-        if self.status_monitor_thread:
-            self.status_monitor_thread.join(timeout=5)
+        self.device_timeouts.stop()
         log_simple("Device status monitoring stopped", "INFO")
 
-    def _status_monitor_loop(self):
-        """Background thread for monitoring device status"""
-        while self.monitoring_active:
-            try:
-                self.check_device_timeout()
-                time.sleep(10)  # Check every 10 seconds
-            except Exception as e:
-                log_simple(f"Error in status monitor loop: {e}", "ERROR")
-                time.sleep(5)
+    def discover_devices(self, window=None, quiet=None):
+        """
+        Send device discovery request via MQTT and collect the announce responses.
+
+        Args:
+            window: Maximum seconds to collect responses (discovery_window if None)
+            quiet: End early after this many seconds without a new device (discovery_quiet if None)
+
+        Returns:
+            DiscoverySession; its future resolves to the aggregated result. A request made
+            while a session is running joins that session.
+        """
+        session, created = self.discovery.start(window, quiet)
+        if not created:
+            return session
 
-    def discover_devices(self):
-        """Send device discovery request via MQTT"""
         try:
             current_time = datetime.now(timezone.utc)
             discovery_payload = {
                 "request": "all",
+                "session": session.id,
                 "timestamp": current_time.isoformat() + "Z"
             }
             success = self.mqtt.publish("device/discovery", discovery_payload)
@@ -274,125 +432,286 @@ class AutomationVoice:
                 log_simple("Device discovery request sent", "INFO")
             else:
                 log_simple("Failed to send device discovery request", "ERROR")
-            return success
+                self.discovery.abort(session, "Failed to send device discovery request")
         except Exception as e:
             log_simple(f"Error sending device discovery: {e}", "ERROR")
-            return False
+            self.discovery.abort(session, str(e))
+        return session
+
+    def _on_discovery_complete(self, session):
+        """Mark the devices that answered a discovery session online with one config write"""
+        if session.devices:
+            with self._config_lock:
+                try:
+                    configurations = self.load_config()
+                    timestamp = datetime.now(timezone.utc).isoformat() + "Z"
+                    changed = set()
+
+                    for config in configurations:
+                        mac = config.get('mac')
+                        if mac in session.devices:
+                            config['status'] = 'online'
+                            config['last_seen'] = timestamp
+                            config['updated_at'] = timestamp
+                            changed.add(mac)
+
+                    if changed and self.save_config(configurations):
+                        for mac in changed:
+                            self.device_status[mac] = {'status': 'online', 'last_seen': timestamp}
+                        self.status_version += 1
+                        for mac in changed:
+                            self._emit("device_status", dict(self.device_status[mac], mac=mac))
+                except Exception as e:
+                    log_simple(f"Error saving discovery results: {e}", "ERROR")
+
+        self._emit("discovery", session.result())
+
+    def _build_router(self, workers):
+        """Build the inbound topic table"""
+        router = TopicRouter(workers=workers, key_func=self._routing_key, name=self.COMPONENT)
+
+        # Device status topics
+        router.route("device/heartbeat/+", self.handle_heartbeat, "heartbeat")
+        router.route("device/announce/+", self.handle_announce, "announce")
+        router.route("device/status/+", self.handle_status, "status")
+
+        # CRUD command topics
+        router.route("command/automation_voice/create", self._command_handler(self.handle_create), "create")
+        router.route("command/automation_voice/read", self._command_handler(self.handle_read), "read")
+        router.route("command/automation_voice/update", self._command_handler(self.handle_update), "update")
+        router.route("command/automation_voice/delete", self._command_handler(self.handle_delete), "delete")
+        router.route("command/automation_voice/+", self._command_handler(self.handle_unknown), "unknown")
+        return router
+
+    def _routing_key(self, msg):
+        """
+        Order device messages per MAC and CRUD commands per configuration id.
+        Commands without an id (create, read) have nothing to stay ordered with
+        and are spread over the workers.
+        """
+        if msg.topic.startswith("device/"):
+            return msg.topic.rsplit("/", 1)[-1]
+        try:
+            payload = json.loads(msg.payload)
+        except ValueError:
+            payload = None
+        config_id = payload.get("id") if isinstance(payload, dict) else None
+        if isinstance(config_id, str) and config_id:
+            return config_id
+        return f"command/{next(self._command_seq)}"
 
     def on_mqtt_message(self, client, userdata, msg):
-        """Handle incoming MQTT messages"""
+        """Handle incoming MQTT messages (runs on the network thread, only enqueues)"""
+        self.router.dispatch(msg)
+
+    def handle_heartbeat(self, msg):
+        """Handle device heartbeat"""
+        payload = self._decode_device_payload(msg)
+        mac_address = msg.topic.split("/")[-1]
+        last_seen = payload.get("timestamp", datetime.now(timezone.utc).isoformat() + "Z")
+
+        self._touch_device(mac_address)
+        self.history.record_heartbeat(mac_address)
+        propagate = self.heartbeats.should_propagate(mac_address)
+        cached = self.device_status.get(mac_address)
+        log_event("heartbeat", "DEBUG", sample=100, mac=mac_address, propagated=propagate)
+        if propagate and (cached is None or cached['status'] != 'online'):
+            self.update_device_status(mac_address, "online", last_seen)
+        elif cached is not None:
+            # Still online: only last_seen moves, in memory (no disk write, event or
+            # status_version bump). Updated in place, so a concurrent offline
+            # transition, which installs a new entry, is never overwritten.
+            if propagate:
+                self.history.record_status(mac_address, 'online')
+            cached['last_seen'] = last_seen
+
+    def handle_announce(self, msg):
+        """Handle device announcements (discovery responses)"""
+        mac_address = msg.topic.split("/")[-1]
+        self._touch_device(mac_address)
+        if self.discovery.record(mac_address, self._decode_device_payload(msg)):
+            # Persisted together with the other responses when the session ends
+            self.history.record_status(mac_address, "online")
+            log_simple("Device announced during discovery: %s", "DEBUG", mac_address)
+            return
+        self.update_device_status(mac_address, "online")
+        log_simple(f"Device announced: {mac_address}", "INFO")
+
+    def handle_status(self, msg):
+        """
+        Handle device status updates.
+        Messages without a "status" field, such as relay confirmations
+        (see ActuationTracker), share the topic and are ignored here.
+        """
+        payload = self._decode_device_payload(msg)
+        mac_address = msg.topic.split("/")[-1]
+        status = payload.get("status")
+        if not isinstance(status, str) or not status:
+            log_simple("Ignoring message without status on %s", "DEBUG", msg.topic)
+            return
+        last_seen = payload.get("timestamp")
+        if status == "online":
+            self._touch_device(mac_address)
+        else:
+            self.device_timeouts.cancel(mac_address)
+            self.heartbeats.forget(mac_address)
+        self.update_device_status(mac_address, status, last_seen)
+
+    def _decode_device_payload(self, msg):
         try:
-            topic = msg.topic
             payload = json.loads(msg.payload.decode())
-
-            log_simple(f"Received MQTT message on topic: {topic}", "INFO")
-
-            # Handle device heartbeat
-            if topic.startswith("device/heartbeat/"):
-                mac_address = topic.split("/")[-1]
-                last_seen = payload.get("timestamp", datetime.now(timezone.utc).isoformat() + "Z")
-                self.update_device_status(mac_address, "online", last_seen)
-                return
-
-            # Handle device announcements (discovery responses)
-            elif topic.startswith("device/announce/"):
-                mac_address = topic.split("/")[-1]
-                self.update_device_status(mac_address, "online")
-                log_simple(f"Device announced: {mac_address}", "INFO")
-                return
-
-            # Handle device status updates
-            elif topic.startswith("device/status/"):
-                mac_address = topic.split("/")[-1]
-                status = payload.get("status", "unknown")
-                last_seen = payload.get("timestamp")
-                self.update_device_status(mac_address, status, last_seen)
-                return
-
-            response_topic = "response/automation_voice/result"
-            response = {}
-
-            if topic == "command/automation_voice/create":
-                response = self.create_configuration(payload)
-            elif topic == "command/automation_voice/read":
-                filters = payload.get("filters", None)
-                response = self.read_configurations(filters)
-            elif topic == "command/automation_voice/update":
-                config_id = payload.get("id")
-                data = payload.get("data", {})
-                if config_id:
-                    response = self.update_configuration(config_id, data)
-                else:
-                    response = {"status": "error", "message": "ID required for update"}
-            elif topic == "command/automation_voice/delete":
-                config_id = payload.get("id")
-                if config_id:
-                    response = self.delete_configuration(config_id)
-                else:
-                    response = {"status": "error", "message": "ID required for delete"}
-            else:
-                response = {"status": "error", "message": "Unknown command"}
-
-            # Publish response
-            self.mqtt.publish(response_topic, response)
-
-        except json.JSONDecodeError:
-            log_simple("Invalid JSON payload received", "ERROR")
-            error_response = {"status": "error", "message": "Invalid JSON payload"}
-            self.mqtt.publish("response/automation_voice/result", error_response)
-        except Exception as e:
-            log_simple(f"Error processing MQTT message: {e}", "ERROR")
-            error_response = {"status": "error", "message": str(e)}
-            self.mqtt.publish("response/automation_voice/result", error_response)
+        except ValueError:
+            log_simple(f"Invalid JSON payload received on {msg.topic}", "ERROR")
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+    def _command_handler(self, action):
+        """Wrap a CRUD action: decode the payload, run it and publish the response"""
+        def handle(msg):
+            correlation_id, reply_to = self._request_properties(msg)
+            try:
+                payload = json.loads(msg.payload.decode())
+                log_simple("Received MQTT message on topic: %s", "DEBUG", msg.topic)
+                if isinstance(payload, dict):
+                    # Envelope fields are not part of the command data
+                    correlation_id = payload.pop("correlation_id", correlation_id)
+                    reply_to = payload.pop("reply_to", reply_to)
+                response = action(payload)
+            except json.JSONDecodeError:
+                log_simple("Invalid JSON payload received", "ERROR")
+                response = {"status": "error", "message": "Invalid JSON payload"}
+            except Exception as e:
+                log_simple(f"Error processing MQTT message: {e}", "ERROR")
+                response = {"status": "error", "message": str(e)}
+
+            if correlation_id is not None:
+                response = dict(response, correlation_id=correlation_id,
+                                command=msg.topic.rsplit("/", 1)[-1])
+
+            # Publish response without waiting for the broker ack
+            self.mqtt.publish_async(self._reply_topic(reply_to), response, callback=self._on_response_published)
+        return handle
+
+    @staticmethod
+    def _request_properties(msg):
+        """Correlation id and reply topic from MQTT v5 CorrelationData/ResponseTopic properties, if any"""
+        properties = getattr(msg, "properties", None)
+        correlation_data = getattr(properties, "CorrelationData", None)
+        if isinstance(correlation_data, (bytes, bytearray)):
+            try:
+                correlation_data = correlation_data.decode()
+            except UnicodeDecodeError:
+                correlation_data = correlation_data.hex()
+        return correlation_data, getattr(properties, "ResponseTopic", None)
+
+    def _reply_topic(self, reply_to):
+        """Requested reply topic, or the shared response topic if none or invalid"""
+        if not reply_to:
+            return self.RESPONSE_TOPIC
+        if not isinstance(reply_to, str) or "+" in reply_to or "#" in reply_to:
+            log_simple(f"Invalid reply topic {reply_to!r}, using {self.RESPONSE_TOPIC}", "WARNING")
+            return self.RESPONSE_TOPIC
+        return reply_to
+
+    def handle_create(self, payload):
+        return self.create_configuration(payload)
+
+    def handle_read(self, payload):
+        filters = payload.get("filters", None)
+        return self.read_configurations(filters)
+
+    def handle_update(self, payload):
+        config_id = payload.get("id")
+        data = payload.get("data", {})
+        if config_id:
+            return self.update_configuration(config_id, data)
+        return {"status": "error", "message": "ID required for update"}
+
+    def handle_delete(self, payload):
+        config_id = payload.get("id")
+        if config_id:
+            return self.delete_configuration(config_id)
+        return {"status": "error", "message": "ID required for delete"}
+
+    def handle_unknown(self, payload):
+        return {"status": "error", "message": "Unknown command"}
+
+    def get_device_history(self, mac_address=None, window=None):
+        """
+        Get uptime, heartbeat jitter and flap statistics.
+
+        Args:
+            mac_address: One device (with its kept transitions); all devices if None
+            window: Only consider the last window seconds
+
+        Returns:
+            Statistics dict (None for an unknown device), or {mac: statistics}
+        """
+        if mac_address is None:
+            return self.history.get_all_stats(window)
+        return self.history.get_stats(mac_address, window, include_events=True)
+
+    def get_router_metrics(self):
+        """Get inbound queue depth, handler latency and heartbeat coalescing metrics"""
+        metrics = self.router.get_metrics()
+        metrics['heartbeats'] = self.heartbeats.get_stats()
+        metrics['device_timeouts'] = self.device_timeouts.get_stats()
+        return metrics
+
+    def _on_response_published(self, future):
+        """Log responses the broker did not accept"""
+        if not future.result():
+            log_simple("Failed to publish automation voice response", "ERROR")
 
     def start(self):
         """Start the automation voice service"""
         log_simple("Starting Automation Voice service", "INFO")
 
-        # Connect to MQTT
-        if not self.mqtt.connect():
-            log_simple("Failed to connect to MQTT broker", "ERROR")
-            return False
+        # Connect to MQTT (keeps retrying in the background if the broker is down)
+        connected = self.mqtt_manager.acquire(self.COMPONENT)
+        if not connected:
+            log_simple("MQTT broker not reachable yet, retrying in background", "WARNING")
+
+        self.router.start()
 
-        # Subscribe to command topics
+        # Subscribe to command topics; unknown commands get an error response
         topics = [
-            "command/automation_voice/create",
-            "command/automation_voice/read",
-            "command/automation_voice/update",
-            "command/automation_voice/delete",
+            "command/automation_voice/+",
             # Device status topics
             "device/heartbeat/+",  # Heartbeat from devices
             "device/announce/+",   # Device announcements
-            "device/status/+",     # Device status updates
-            "device/discovery"     # Discovery requests
+            "device/status/+"      # Device status updates
         ]
 
         for topic in topics:
-            self.mqtt.subscribe(topic)
+            self.mqtt.add_handler(topic, self.on_mqtt_message, self.COMPONENT)
 
         # Start device status monitoring
         self.start_status_monitoring()
 
         log_simple("Automation Voice service started successfully", "SUCCESS")
-        return True
+        return connected
 
     def stop(self):
         """Stop the automation voice service"""
         log_simple("Stopping Automation Voice service", "INFO")
         self.stop_status_monitoring()
-        self.mqtt.disconnect()
+        self.discovery.stop()
+        self.mqtt_manager.release(self.COMPONENT)
+        self.router.stop()
+        self._persist_last_seen()
         log_simple("Automation Voice service stopped", "SUCCESS")
 
 if __name__ == "__main__":
     # Example usage
     automation = AutomationVoice()
 
-    if automation.start():
-        try:
-            # Keep running
-            while True:
-                pass
-        except KeyboardInterrupt:
-            automation.stop()
-    else:
-        log_simple("Failed to start Automation Voice service", "ERROR")
+    if not automation.start():
+        log_simple("Automation Voice service started without MQTT, waiting for broker", "WARNING")
+
+    try:
+        # Keep running
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        automation.stop()
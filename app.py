@@ -1,111 +1,125 @@
 """
 Flask Web Application for Voice Relay Control
 Provides REST API endpoints for managing voice-controlled relay devices.
+
+Routes only talk to a backend object: the in-process BackendService when run
+with ``python app.py``, or an IPCClient of the backend process in the
+multi-worker production setup (see wsgi.py).
 """
 
-from flask import Flask, render_template, request, jsonify
-import json
-import uuid
+from flask import (Blueprint, Flask, Response, abort, current_app, make_response, render_template, request, jsonify,
+                   send_from_directory, stream_with_context, url_for)
 import os
-import threading
+import zlib
 
-from middleware.mqtt_handler import MQTTHandler
 from middleware.logging import setup_logging, log_simple
 from middleware.network_utils import get_active_mac_address
-from AutomationVoice import AutomationVoice
-from voice_control import VoiceControl
+from middleware.static_assets import AssetManifest, gzip_response
 
-app = Flask(__name__)
 logger = setup_logging()
-
-# Global variables for service management
-mqtt_client = None
-automation_voice = None
-available_devices = [
-    # Sample devices for testing
-    {
-        "name": "RelayMini1",
-        "part_number": "RELAYMINI",
-        "address": 37,
-        "device_bus": 0,
-        "mac": "70:f7:54:cb:7a:93"
-    },
-    {
-        "name": "Relay1",
-        "part_number": "RELAY",
-        "address": 38,
-        "device_bus": 0,
-        "mac": "70:f7:54:cb:7a:94"
-    }
-]
-voice_control = None
-voice_thread = None
-
-def init_mqtt():
-    """Initialize MQTT client"""
-    global mqtt_client
-    mqtt_client = MQTTHandler(client_id="automation_voice_frontend")
-
-    # Setup message handler
-    mqtt_client.client.on_message = on_mqtt_message
-
-    if mqtt_client.connect():
-        # Subscribe to available devices topic
-        mqtt_client.subscribe("MODULAR_DEVICE/AVAILABLES")
-        log_simple("Frontend MQTT client connected and subscribed", "SUCCESS")
-        return True
+api = Blueprint('api', __name__)
+
+# Dynamic responses worth gzipping (bundles are precompressed at build time)
+COMPRESS_MIMETYPES = frozenset({'application/json', 'text/html'})
+COMPRESS_MIN_SIZE = 1024
+
+# Fingerprinted bundles never change under the same URL
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+def create_app(backend):
+    """
+    Create the Flask application.
+
+    Args:
+        backend: BackendService, or an IPCClient proxy of one
+    """
+    app = Flask(__name__)
+    app.extensions['voice_relay_backend'] = backend
+    app.extensions['voice_relay_assets'] = AssetManifest(app.static_folder)
+    app.register_blueprint(api)
+    return app
+
+def get_backend():
+    return current_app.extensions['voice_relay_backend']
+
+@api.app_context_processor
+def inject_asset_url():
+    assets = current_app.extensions['voice_relay_assets']
+    return {'asset_url': lambda name: assets.url(name, url_for)}
+
+@api.after_app_request
+def compress_response(response):
+    """Gzip JSON and HTML responses above COMPRESS_MIN_SIZE"""
+    gzip_response(response, request.accept_encodings, COMPRESS_MIN_SIZE, COMPRESS_MIMETYPES)
+    return response
+
+def versioned_etag(prefix, epoch, version, filters=None):
+    """ETag of a versioned backend view: prefix, backend epoch, version and a checksum of the request filters"""
+    etag = f"{prefix}-{epoch}-{version}"
+    if filters:
+        etag += f"-{zlib.crc32(','.join(filters).encode()):08x}"
+    return etag
+
+def conditional_response(etag, body):
+    """304 if the client already has this ETag, otherwise the JSON body"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
     else:
-        log_simple("Failed to connect frontend MQTT client", "ERROR")
-        return False
-
-def on_mqtt_message(client, userdata, msg):
-    """Handle incoming MQTT messages"""
-    global available_devices
-    try:
-        topic = msg.topic
-        payload = json.loads(msg.payload.decode())
-
-        if topic == "MODULAR_DEVICE/AVAILABLES":
-            # Filter devices with part_number RELAYMINI or RELAY
-            filtered_devices = [
-                device for device in payload
-                if device.get('part_number', '').upper() in ['RELAYMINI', 'RELAY']
-            ]
-            available_devices = filtered_devices
-            log_simple(f"Updated available devices: {len(filtered_devices)} devices", "INFO")
-
-    except Exception as e:
-        log_simple(f"Error processing MQTT message: {e}", "ERROR")
+        response = jsonify(body)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
-@app.route('/')
+@api.route('/')
 def index():
-    """Main page"""
-    return render_template('index.html')
-
-@app.route('/api/devices/available')
+    """Main page; revalidated with ETag so new bundle URLs are picked up right away"""
+    response = make_response(render_template('index.html'))
+    response.add_etag(weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@api.route('/assets/<path:filename>')
+def asset(filename):
+    """Fingerprinted dashboard bundle, precompressed variant if the client accepts it"""
+    assets = current_app.extensions['voice_relay_assets']
+    resolved = assets.resolve(filename, request.accept_encodings)
+    if resolved is None:
+        abort(404)
+    path, encoding, mimetype = resolved
+    response = send_from_directory(assets.dist_dir, path, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@api.route('/api/devices/available')
 def get_available_devices():
-    """Get available devices for dropdown"""
-    return jsonify({
-        'status': 'success',
-        'devices': available_devices
-    })
+    """Get available devices for dropdown (?name=, ?mac=, ?part_number=), revalidated with ETag"""
+    try:
+        filters = {field: request.args[field] for field in ('name', 'mac', 'part_number') if request.args.get(field)}
+        view = get_backend().available_devices(filters)
+        etag = versioned_etag('devices', view['epoch'], view['version'],
+                              [f"{k}={v}" for k, v in sorted(filters.items())])
+        return conditional_response(etag, {
+            'status': 'success',
+            'version': view['version'],
+            'devices': view['devices']
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
 
-@app.route('/api/configurations', methods=['GET'])
+@api.route('/api/configurations', methods=['GET'])
 def get_configurations():
     """Get all configurations"""
     try:
-        with open('JSON/automationVoiceConfig.json', 'r') as f:
-            data = json.load(f)
-        # Handle both old format (with configurations key) and new format (direct array)
-        if isinstance(data, dict) and 'configurations' in data:
-            configurations = data['configurations']
-        elif isinstance(data, list):
-            configurations = data
-        else:
-            configurations = []
         return jsonify({
             'status': 'success',
-            'data': configurations
+            'data': get_backend().list_configurations()
         })
     except Exception as e:
         return jsonify({
@@ -113,102 +127,40 @@ def get_configurations():
             'message': str(e)
         })
 
-@app.route('/api/configurations', methods=['POST'])
+@api.route('/api/configurations', methods=['POST'])
 def create_configuration():
     """Create new configuration"""
     try:
-        data = request.get_json()
-
-        # Find selected device
-        device_name = data.get('device_name')
-        selected_device = None
-        for device in available_devices:
-            if device.get('name') == device_name:
-                selected_device = device
-                break
-
-        if not selected_device:
-            return jsonify({
-                'status': 'error',
-                'message': 'Device not found'
-            })
-
-        # Prepare configuration data
-        config_data = {
-            'device_name': device_name,
-            'desc': data.get('desc', ''),
-            'object_name': data.get('objectName', ''),  # This is correct
-            'pin': data.get('pin', ''),
-            'address': str(selected_device.get('address', '0')),
-            'bus': str(selected_device.get('device_bus', '0')),
-            'part_number': selected_device.get('part_number', ''),
-            'mac': selected_device.get('mac', '00:00:00:00:00:00')
-        }
-
-        # Use AutomationVoice to create
-        if automation_voice:
-            result = automation_voice.create_configuration(config_data)
-            return jsonify(result)
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'AutomationVoice service not available'
-            })
-
+        return jsonify(get_backend().create_configuration(request.get_json()))
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         })
 
-@app.route('/api/configurations/<config_id>', methods=['PUT'])
+@api.route('/api/configurations/<config_id>', methods=['PUT'])
 def update_configuration(config_id):
     """Update configuration"""
     try:
-        data = request.get_json()
-
-        update_data = {
-            'device_name': data.get('device_name'),
-            'desc': data.get('desc'),
-            'object_name': data.get('objectName', ''),
-            'pin': data.get('pin')
-        }
-
-        if automation_voice:
-            result = automation_voice.update_configuration(config_id, update_data)
-            return jsonify(result)
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'AutomationVoice service not available'
-            })
-
+        return jsonify(get_backend().update_configuration(config_id, request.get_json()))
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         })
 
-@app.route('/api/configurations/<config_id>', methods=['DELETE'])
+@api.route('/api/configurations/<config_id>', methods=['DELETE'])
 def delete_configuration(config_id):
     """Delete configuration"""
     try:
-        if automation_voice:
-            result = automation_voice.delete_configuration(config_id)
-            return jsonify(result)
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'AutomationVoice service not available'
-            })
-
+        return jsonify(get_backend().delete_configuration(config_id))
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         })
 
-@app.route('/api/pins/<part_number>')
+@api.route('/api/pins/<part_number>')
 def get_pins_for_device(part_number):
     """Get available pins for device type"""
     pins = []
@@ -222,16 +174,11 @@ def get_pins_for_device(part_number):
         'pins': pins
     })
 
-@app.route('/api/voice/start', methods=['POST'])
+@api.route('/api/voice/start', methods=['POST'])
 def start_voice_control():
     """Start voice control"""
-    global voice_control, voice_thread
-
     try:
-        if voice_control is None:
-            voice_control = VoiceControl()
-
-        if voice_control.start_voice_control():
+        if get_backend().start_voice():
             return jsonify({
                 'status': 'success',
                 'message': 'Voice control started'
@@ -248,16 +195,11 @@ def start_voice_control():
             'message': str(e)
         })
 
-@app.route('/api/voice/stop', methods=['POST'])
+@api.route('/api/voice/stop', methods=['POST'])
 def stop_voice_control():
     """Stop voice control"""
-    global voice_control
-
     try:
-        if voice_control:
-            voice_control.stop_voice_control()
-            voice_control = None
-
+        get_backend().stop_voice()
         return jsonify({
             'status': 'success',
             'message': 'Voice control stopped'
@@ -269,7 +211,7 @@ def stop_voice_control():
             'message': str(e)
         })
 
-@app.route('/api/voice/test', methods=['POST'])
+@api.route('/api/voice/test', methods=['POST'])
 def test_voice_command():
     """Test voice command processing"""
     try:
@@ -282,16 +224,8 @@ def test_voice_command():
                 'message': 'Command text is required'
             })
 
-        # Create voice control instance if not exists
-        global voice_control
-        if voice_control is None:
-            voice_control = VoiceControl()
-
-        # Test the command
-        success = voice_control.test_voice_command(command_text)
-
-        # Get detailed result from voice control
-        result_details = voice_control.get_last_command_result()
+        # Test the command and get the detailed result
+        success, result_details = get_backend().test_voice(command_text)
 
         return jsonify({
             'status': 'success' if success else 'warning',
@@ -307,87 +241,196 @@ def test_voice_command():
             'message': str(e)
         })
 
-@app.route('/api/devices/status/<mac>')
+@api.route('/api/devices/status')
+def get_all_device_status():
+    """Get status of all devices (or ?mac=a,b) in one response, revalidated with ETag"""
+    try:
+        macs = request.args.get('mac')
+        macs = sorted(filter(None, macs.split(','))) if macs else None
+        view = get_backend().device_statuses(macs)
+        return conditional_response(versioned_etag('status', view['epoch'], view['version'], macs), {
+            'status': 'success',
+            'version': view['version'],
+            'devices': view['devices']
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+@api.route('/api/devices/status/<mac>')
 def get_device_status(mac):
     """Get status for a specific device"""
     try:
-        if automation_voice:
-            status_info = automation_voice.get_device_status(mac)
-            return jsonify({
-                'status': 'success',
-                'device_status': status_info['status'],
-                'last_seen': status_info['last_seen']
-            })
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'AutomationVoice service not available'
-            })
+        status_info = get_backend().device_status(mac)
+        return jsonify({
+            'status': 'success',
+            'device_status': status_info['status'],
+            'last_seen': status_info['last_seen']
+        })
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         })
 
-@app.route('/api/devices/discover', methods=['POST'])
+@api.route('/api/devices/history')
+@api.route('/api/devices/history/<mac>')
+def get_device_history(mac=None):
+    """Get uptime, heartbeat jitter and flap statistics (?window=seconds)"""
+    try:
+        window = request.args.get('window', type=float)
+        history = get_backend().device_history(mac, window)
+        return jsonify({
+            'status': 'success',
+            'window': window,
+            'history' if mac else 'devices': history
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+@api.route('/api/devices/discover', methods=['POST'])
 def discover_devices():
-    """Trigger device discovery"""
+    """
+    Trigger device discovery and collect the announce responses.
+    Optional JSON body: window (seconds), quiet (seconds), wait (default true).
+    """
     try:
-        if automation_voice:
-            success = automation_voice.discover_devices()
-            return jsonify({
-                'status': 'success' if success else 'error',
-                'message': 'Device discovery initiated' if success else 'Failed to initiate discovery'
-            })
-        else:
+        options = request.get_json(silent=True) or {}
+        wait = options.get('wait', True)
+        result = get_backend().discover(options.get('window'), options.get('quiet'), wait)
+
+        if not wait:
+            # The result follows as a "discovery" event on /api/events
             return jsonify({
-                'status': 'error',
-                'message': 'AutomationVoice service not available'
+                'status': 'success',
+                'message': 'Device discovery initiated',
+                'session_id': result['id']
             })
+
+        return jsonify({
+            'status': 'error' if result['error'] else 'success',
+            'message': result['error'] or f"Discovered {result['count']} devices",
+            'discovery': result
+        })
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         })
 
-@app.route('/api/voice/last-result')
+@api.route('/api/devices/discover/<session_id>')
+def get_discovery_session(session_id):
+    """Get the (possibly still running) result of a discovery session"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'discovery': get_backend().discovery_session(session_id)
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+@api.route('/api/voice/last-result')
 def get_last_voice_result():
     """Get the last voice command result for UI display"""
     try:
-        global voice_control
-        if voice_control is None:
-            return jsonify({
-                'status': 'error',
-                'message': 'Voice control not initialized'
-            })
+        return jsonify({
+            'status': 'success',
+            'result': get_backend().last_voice_result(request.args.get('input'))
+        })
 
-        result = voice_control.get_last_command_result()
+    except Exception as e:
+        # Also "not initialized / no result yet", which the UI polls for
+        log_simple("Error getting last voice result: %s", "DEBUG", e)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+@api.route('/api/voice/noise')
+def get_voice_noise_stats():
+    """Get ambient-noise calibration diagnostics"""
+    try:
         return jsonify({
             'status': 'success',
-            'result': result
+            'noise': get_backend().voice_noise()
         })
 
     except Exception as e:
-        log_simple(f"Error getting last voice result: {e}", "ERROR")
+        log_simple(f"Error getting noise stats: {e}", "ERROR")
         return jsonify({
             'status': 'error',
             'message': str(e)
         })
 
-@app.route('/api/status/mqtt')
-def get_mqtt_status():
-    """Get MQTT connection status"""
+@api.route('/api/metrics/router')
+def get_router_metrics():
+    """Get inbound MQTT router queue depth and handler latency"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'metrics': get_backend().router_metrics()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+@api.route('/api/metrics/commands')
+def get_command_metrics():
+    """Get outbound relay write coalescing counters"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'metrics': get_backend().command_metrics()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+@api.route('/api/events')
+def stream_events():
+    """Server-Sent Events stream of voice results, device status, config changes and MQTT state"""
     try:
-        # Check both MQTT clients
-        frontend_connected = mqtt_client.connected if mqtt_client else False
-        backend_connected = automation_voice.mqtt.connected if automation_voice and hasattr(automation_voice, 'mqtt') else False
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+
+    stream = get_backend().event_stream(last_event_id)
+    return Response(stream_with_context(stream), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+    })
 
+@api.route('/api/metrics/mqtt')
+def get_mqtt_metrics():
+    """Get MQTT publish/receive counters and publish-to-ack latency per topic"""
+    try:
         return jsonify({
             'status': 'success',
-            'mqtt_connected': frontend_connected or backend_connected,
-            'frontend_connected': frontend_connected,
-            'backend_connected': backend_connected
+            'metrics': get_backend().mqtt_metrics()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
         })
+
+@api.route('/api/status/mqtt')
+def get_mqtt_status():
+    """Get MQTT connection status"""
+    try:
+        return jsonify(dict(get_backend().mqtt_status(), status='success'))
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -396,22 +439,12 @@ def get_mqtt_status():
         })
 
 if __name__ == '__main__':
-    # Initialize AutomationVoice service
-    try:
-        automation_voice = AutomationVoice()
-        # Start the backend MQTT service
-        if automation_voice.start():
-            log_simple("AutomationVoice service initialized and started", "SUCCESS")
-        else:
-            log_simple("AutomationVoice service initialized but MQTT failed", "WARNING")
-    except Exception as e:
-        log_simple(f"Failed to initialize AutomationVoice: {e}", "ERROR")
-        automation_voice = None
+    # Development mode: backend service and dev server in one process
+    from backend import BackendService
 
-    # Initialize MQTT for frontend (optional for testing)
-    mqtt_connected = init_mqtt()
-    if not mqtt_connected:
-        log_simple("MQTT not available, continuing without MQTT features", "WARNING")
+    backend = BackendService()
+    backend.start()
+    app = create_app(backend)
 
     # Use port 8000 by default to avoid conflicts
     port = int(os.environ.get('PORT', 8000))
@@ -424,4 +457,4 @@ if __name__ == '__main__':
 
     log_simple(f"Starting Flask application on {host}:{port} (debug={debug_mode})", "INFO")
     log_simple(f"Access from other devices: http://{get_active_mac_address() or 'your-ip'}:{port}", "INFO")
-    app.run(debug=debug_mode, host=host, port=port)
+    app.run(debug=debug_mode, host=host, port=port, threaded=True)  # SSE streams hold a thread each
@@ -0,0 +1,335 @@
+"""
+Backend Service for Voice Relay System
+Owns the MQTT connection, AutomationVoice, VoiceControl and the device registry.
+
+For development the service runs inside the Flask process (python app.py).
+In production it runs once as its own process (python backend.py, started by
+gunicorn.conf.py) and the stateless HTTP workers call it over IPC.
+"""
+
+import json
+import os
+import signal
+import sys
+import threading
+import uuid
+
+from middleware.mqtt_manager import get_connection_manager
+from middleware.logging import setup_logging, log_simple
+from middleware.event_bus import EventBus
+from middleware.device_registry import DeviceRegistry
+from middleware.ipc import IPCServer, get_authkey
+from AutomationVoice import AutomationVoice
+from voice_control import VoiceControl
+
+CONFIG_FILE = 'JSON/automationVoiceConfig.json'
+
+# Upper bound of a discovery window, so waiting requests cannot hold a worker for long
+MAX_DISCOVERY_WINDOW = 60.0
+
+SAMPLE_DEVICES = [
+    # Sample devices for testing
+    {
+        "name": "RelayMini1",
+        "part_number": "RELAYMINI",
+        "address": 37,
+        "device_bus": 0,
+        "mac": "70:f7:54:cb:7a:93"
+    },
+    {
+        "name": "Relay1",
+        "part_number": "RELAY",
+        "address": 38,
+        "device_bus": 0,
+        "mac": "70:f7:54:cb:7a:94"
+    }
+]
+
+class ServiceError(Exception):
+    """Expected failure of a backend operation; the message is returned to API clients"""
+
+class BackendService:
+    """
+    All long-lived state of the gateway behind one API.
+
+    Methods return plain, picklable data so they can be called in-process or
+    through IPCClient; only the methods in RPC_METHODS are served over IPC.
+    """
+
+    RPC_METHODS = frozenset({
+        'available_devices', 'list_configurations', 'create_configuration', 'update_configuration',
+        'delete_configuration', 'start_voice', 'stop_voice', 'test_voice', 'last_voice_result',
+        'voice_noise', 'device_statuses', 'device_status', 'device_history', 'discover',
+        'discovery_session', 'router_metrics', 'command_metrics', 'mqtt_metrics', 'mqtt_status'
+    })
+
+    def __init__(self):
+        # Distinguishes cache versions of different backend lifetimes in ETags
+        self.epoch = uuid.uuid4().hex[:8]
+        self.logger = setup_logging()
+
+        # One MQTT connection shared by the frontend, AutomationVoice and VoiceControl
+        self.mqtt_manager = get_connection_manager(
+            client_id="voice_relay_gateway",
+            offline_queue_path=os.environ.get('MQTT_OFFLINE_QUEUE')
+        )
+        self.mqtt_client = None
+        self.automation_voice = None
+        self.voice_control = None
+        self._voice_lock = threading.Lock()
+
+        # Push channel for the web UI (voice results, device status, config changes, MQTT state)
+        self.event_bus = EventBus()
+        # Devices announced on MODULAR_DEVICE/AVAILABLES, indexed and swapped atomically
+        self.device_registry = DeviceRegistry(SAMPLE_DEVICES, part_numbers=('RELAYMINI', 'RELAY'))
+        self.device_registry.add_listener(self.event_bus.listener('devices'))
+        self.mqtt_manager.handler.add_state_listener(
+            lambda state: self.event_bus.publish('mqtt', self.mqtt_status_event(state)))
+
+    def start(self):
+        """Start AutomationVoice and the frontend MQTT subscriptions"""
+        try:
+            self.automation_voice = AutomationVoice(mqtt_manager=self.mqtt_manager)
+            self.automation_voice.add_event_listener(self.event_bus.publish)
+            # Start the backend MQTT service
+            if self.automation_voice.start():
+                log_simple("AutomationVoice service initialized and started", "SUCCESS")
+            else:
+                log_simple("AutomationVoice service initialized but MQTT failed", "WARNING")
+        except Exception as e:
+            log_simple(f"Failed to initialize AutomationVoice: {e}", "ERROR")
+            self.automation_voice = None
+
+        # Initialize MQTT for frontend (optional for testing)
+        if not self.init_mqtt():
+            log_simple("MQTT not available, continuing without MQTT features", "WARNING")
+
+    def stop(self):
+        """Stop voice control and AutomationVoice"""
+        with self._voice_lock:
+            if self.voice_control:
+                self.voice_control.stop_voice_control()
+                self.voice_control = None
+        if self.automation_voice:
+            self.automation_voice.stop()
+        self.mqtt_manager.release("frontend")
+
+    def init_mqtt(self):
+        """Initialize MQTT client"""
+        self.mqtt_client = self.mqtt_manager.handler
+
+        connected = self.mqtt_manager.acquire("frontend")
+
+        # Subscribe to available devices topic (restored automatically on reconnect)
+        self.mqtt_client.add_handler("MODULAR_DEVICE/AVAILABLES", self.on_mqtt_message, "frontend")
+        if connected:
+            log_simple("Frontend MQTT client connected and subscribed", "SUCCESS")
+        else:
+            log_simple("Frontend MQTT not connected yet, retrying in background", "WARNING")
+        return connected
+
+    def on_mqtt_message(self, client, userdata, msg):
+        """Handle incoming MQTT messages"""
+        try:
+            topic = msg.topic
+            payload = json.loads(msg.payload.decode())
+
+            if topic == "MODULAR_DEVICE/AVAILABLES":
+                # The registry keeps only RELAYMINI/RELAY devices
+                diff = self.device_registry.replace(payload)
+                log_simple("Updated available devices: %d devices (+%d -%d ~%d)", "DEBUG", len(self.device_registry),
+                           len(diff['added']), len(diff['removed']), len(diff['changed']))
+
+        except Exception as e:
+            log_simple(f"Error processing MQTT message: {e}", "ERROR")
+
+    def mqtt_status_event(self, state=None):
+        """MQTT connection summary pushed to the UI"""
+        handler = self.mqtt_manager.handler
+        return {
+            'mqtt_connected': handler.connected,
+            'state': (state or handler.state_info).get('state')
+        }
+
+    def event_stream(self, last_event_id=None):
+        """SSE chunks of the event bus, starting with the MQTT state"""
+        return self.event_bus.stream(last_event_id, initial={'mqtt': self.mqtt_status_event()})
+
+    def _automation(self):
+        if not self.automation_voice:
+            raise ServiceError('AutomationVoice service not available')
+        return self.automation_voice
+
+    def _voice(self, create=False):
+        with self._voice_lock:
+            if self.voice_control is None:
+                if not create:
+                    raise ServiceError('Voice control not initialized')
+                self.voice_control = VoiceControl(mqtt_manager=self.mqtt_manager)
+                self.voice_control.add_result_listener(self.event_bus.listener('voice_result'))
+            return self.voice_control
+
+    # Devices and configurations
+
+    def available_devices(self, filters=None):
+        """Available devices matching name/mac/part_number filters, with the registry version"""
+        snapshot = self.device_registry.snapshot
+        return {
+            'epoch': self.epoch,
+            'version': snapshot.version,
+            'devices': snapshot.filter(**(filters or {}))
+        }
+
+    def list_configurations(self):
+        """All configurations from the configuration file"""
+        with open(CONFIG_FILE, 'r') as f:
+            data = json.load(f)
+        # Handle both old format (with configurations key) and new format (direct array)
+        if isinstance(data, dict) and 'configurations' in data:
+            return data['configurations']
+        elif isinstance(data, list):
+            return data
+        return []
+
+    def create_configuration(self, data):
+        """Create a configuration for an available device"""
+        # Find selected device
+        device_name = data.get('device_name')
+        selected_device = self.device_registry.get(device_name)
+        if not selected_device:
+            raise ServiceError('Device not found')
+
+        # Prepare configuration data
+        config_data = {
+            'device_name': device_name,
+            'desc': data.get('desc', ''),
+            'object_name': data.get('objectName', ''),  # This is correct
+            'pin': data.get('pin', ''),
+            'address': str(selected_device.get('address', '0')),
+            'bus': str(selected_device.get('device_bus', '0')),
+            'part_number': selected_device.get('part_number', ''),
+            'mac': selected_device.get('mac', '00:00:00:00:00:00')
+        }
+        return self._automation().create_configuration(config_data)
+
+    def update_configuration(self, config_id, data):
+        update_data = {
+            'device_name': data.get('device_name'),
+            'desc': data.get('desc'),
+            'object_name': data.get('objectName', ''),
+            'pin': data.get('pin')
+        }
+        return self._automation().update_configuration(config_id, update_data)
+
+    def delete_configuration(self, config_id):
+        return self._automation().delete_configuration(config_id)
+
+    # Voice control
+
+    def start_voice(self):
+        return self._voice(create=True).start_voice_control()
+
+    def stop_voice(self):
+        with self._voice_lock:
+            if self.voice_control:
+                self.voice_control.stop_voice_control()
+                self.voice_control = None
+
+    def test_voice(self, command_text):
+        """Process a command text; returns (success, result details)"""
+        voice_control = self._voice(create=True)
+        success = voice_control.test_voice_command(command_text)
+        return success, voice_control.get_last_command_result()
+
+    def last_voice_result(self, input_name=None):
+        result = self._voice().get_last_command_result(input_name)
+        if result is None:
+            raise ServiceError(f'No result for input: {input_name}')
+        return result
+
+    def voice_noise(self):
+        return self._voice().get_noise_stats()
+
+    # Device status
+
+    def device_statuses(self, macs=None):
+        """Status of all (or the given) devices with the status cache version"""
+        version, devices = self._automation().get_all_device_status(macs)
+        return {'epoch': self.epoch, 'version': version, 'devices': devices}
+
+    def device_status(self, mac):
+        return self._automation().get_device_status(mac)
+
+    def device_history(self, mac=None, window=None):
+        history = self._automation().get_device_history(mac, window)
+        if history is None:
+            raise ServiceError(f'No history for device {mac}')
+        return history
+
+    def discover(self, window=None, quiet=None, wait=True):
+        """Run a discovery session; returns its result, or only its id with wait=False"""
+        window = min(float(window), MAX_DISCOVERY_WINDOW) if window else None
+        quiet = float(quiet) if quiet else None
+        session = self._automation().discover_devices(window=window, quiet=quiet)
+        if not wait:
+            return {'id': session.id}
+        return session.future.result(timeout=session.window + 5)
+
+    def discovery_session(self, session_id):
+        session = self._automation().discovery.get(session_id)
+        if session is None:
+            raise ServiceError(f'Discovery session {session_id} not found')
+        return session.result()
+
+    # Metrics
+
+    def router_metrics(self):
+        return self._automation().get_router_metrics()
+
+    def command_metrics(self):
+        return self._voice().get_command_stats()
+
+    def mqtt_metrics(self):
+        return self.mqtt_manager.handler.get_metrics()
+
+    def mqtt_status(self):
+        # Check both MQTT clients
+        frontend_connected = self.mqtt_client.connected if self.mqtt_client else False
+        backend_connected = self.automation_voice.mqtt.connected if self.automation_voice else False
+        return {
+            'mqtt_connected': frontend_connected or backend_connected,
+            'frontend_connected': frontend_connected,
+            'backend_connected': backend_connected,
+            'components': self.mqtt_manager.components,
+            'connection': self.mqtt_manager.handler.get_connection_state()
+        }
+
+def main():
+    """Run the backend service as its own process, serving HTTP workers over IPC"""
+    try:
+        authkey = get_authkey()
+    except RuntimeError as e:
+        # gunicorn.conf.py generates a key when it starts the backend itself
+        log_simple(f"Refusing to start backend service: {e}", "ERROR")
+        sys.exit(1)
+
+    service = BackendService()
+    service.start()
+
+    server = IPCServer(service, BackendService.RPC_METHODS, authkey=authkey, event_bus=service.event_bus,
+                       initial_events=lambda: {'mqtt': service.mqtt_status_event()})
+    server.start()
+
+    stopped = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopped.set())
+    log_simple("Backend service running", "SUCCESS")
+    while not stopped.wait(1):
+        pass
+
+    log_simple("Stopping backend service", "INFO")
+    server.stop()
+    service.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Gunicorn configuration for the Voice Relay web service.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The master process starts the backend service (MQTT, AutomationVoice, voice
+listener) exactly once and stops it on exit; the HTTP workers are stateless
+and reach it over IPC. Set BACKEND_EXTERNAL=1 when the backend is run
+separately, e.g. as its own systemd unit.
+
+Environment:
+    PORT / FLASK_HOST   Bind address (8000 / 0.0.0.0)
+    WEB_WORKERS         Worker processes (CPU count)
+    WEB_THREADS         Threads per worker; every open SSE stream holds one (8)
+    BACKEND_ADDRESS     Unix socket path or host:port of the backend IPC channel
+    BACKEND_AUTHKEY     Shared IPC secret; generated for this run if unset, required with BACKEND_EXTERNAL=1
+    LOG_PROCESS         Log file tag of the master and workers (web); the backend
+                        keeps the size-rotated voice_relay_<date>.log to itself
+"""
+
+import multiprocessing
+import os
+import secrets
+import subprocess
+import sys
+import time
+
+# Before any middleware import: master and workers share logs/voice_relay_web_<date>.log
+os.environ.setdefault('LOG_PROCESS', 'web')
+
+from middleware.ipc import IPCClient, RemoteError
+from middleware.static_assets import build_assets
+
+bind = f"{os.environ.get('FLASK_HOST', '0.0.0.0')}:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get('WEB_THREADS', 8))
+# Discovery requests wait up to a minute for announce responses
+timeout = 90
+graceful_timeout = 10
+keepalive = 5
+accesslog = "-"
+
+_backend_process = None
+
+def on_starting(server):
+    """Build the dashboard bundles and start the backend service process before any worker is forked"""
+    global _backend_process
+    build_assets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+
+    if os.environ.get('BACKEND_EXTERNAL') == '1':
+        # The workers must use the key the separately started backend was given
+        if not os.environ.get('BACKEND_AUTHKEY'):
+            raise RuntimeError("BACKEND_EXTERNAL=1 requires BACKEND_AUTHKEY, set to the key of the running backend.py")
+        return
+
+    # Generated only when this process starts the backend; inherited by it and the workers
+    os.environ.setdefault('BACKEND_AUTHKEY', secrets.token_hex(32))
+
+    # The backend is the only writer of the rotated main log
+    backend_env = {key: value for key, value in os.environ.items() if key != 'LOG_PROCESS'}
+    _backend_process = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), 'backend.py')],
+                                        cwd=os.path.dirname(os.path.abspath(__file__)), env=backend_env)
+    client = IPCClient(timeout=5)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if _backend_process.poll() is not None:
+            raise RuntimeError(f"Backend service exited with code {_backend_process.returncode}")
+        try:
+            client.mqtt_status()
+            client.close()
+            server.log.info("Backend service ready (pid %s)", _backend_process.pid)
+            return
+        except RemoteError:
+            time.sleep(0.5)
+    server.log.warning("Backend service not answering yet; workers will retry on each request")
+
+def on_exit(server):
+    """Stop the backend service process"""
+    if _backend_process is not None and _backend_process.poll() is None:
+        _backend_process.terminate()
+        try:
+            _backend_process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _backend_process.kill()
@@ -0,0 +1,211 @@
+"""
+Actuation Tracking Module
+Matches published relay writes to device confirmations and measures command-to-actuation latency.
+"""
+
+import heapq
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional, Dict, Any
+
+from .logging import log_simple
+
+class _Command:
+    """One tracked relay write"""
+
+    __slots__ = ('key', 'data', 'issued', 'future')
+
+    def __init__(self, key, data, issued):
+        self.key = key
+        self.data = data
+        self.issued = issued
+        self.future = Future()
+
+class ActuationTracker:
+    """
+    Tracks relay writes until the device confirms them.
+
+    A command is registered with ``track()`` before it is published and is
+    identified by (mac, address, pin). A confirmation from the device resolves
+    every outstanding command of that pin whose expected value it reports, so
+    writes coalesced into one publish are all confirmed together. Commands not
+    confirmed within the timeout resolve as timed out.
+
+    Confirmations are read from device status messages such as::
+
+        {"mac": "...", "address": 37, "value": {"pin": 1, "data": 1}}
+        {"address": 37, "pin": 1, "data": 1}
+
+    The MAC defaults to the last topic level (``device/status/<mac>``).
+    Confirmations carry no ``status`` field, so AutomationVoice does not treat
+    them as status changes.
+    """
+
+    def __init__(self, timeout: float = 5.0, history_size: int = 1000):
+        """
+        Initialize tracker.
+
+        Args:
+            timeout: Seconds to wait for a confirmation before a command counts as timed out
+            history_size: Number of recent latencies kept for percentiles
+        """
+        self.timeout = timeout
+        self._pending = {}
+        self._deadlines = []
+        self._latencies = deque(maxlen=history_size)
+        self._condition = threading.Condition()
+        self._thread = None
+        self.tracked = 0
+        self.confirmed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    @staticmethod
+    def _key(mac, address, pin):
+        return (str(mac).lower(), int(address), int(pin))
+
+    def track(self, mac: str, address: int, pin: int, data: int) -> Future:
+        """
+        Register a write before publishing it.
+
+        Returns:
+            Future resolving to {'confirmed', 'timed_out', 'latency_ms'}
+        """
+        command = _Command(self._key(mac, address, pin), data, time.monotonic())
+        with self._condition:
+            self.tracked += 1
+            self._pending.setdefault(command.key, []).append(command)
+            heapq.heappush(self._deadlines, (command.issued + self.timeout, id(command), command))
+            self._ensure_thread()
+            self._condition.notify()
+        return command.future
+
+    def cancel(self, future: Future) -> None:
+        """Stop tracking a write whose publish failed"""
+        with self._condition:
+            for key, commands in list(self._pending.items()):
+                for command in commands:
+                    if command.future is future:
+                        commands.remove(command)
+                        if not commands:
+                            del self._pending[key]
+                        self.cancelled += 1
+                        break
+        if not future.done():
+            future.set_result({'confirmed': False, 'timed_out': False, 'latency_ms': None})
+
+    def confirm(self, mac: str, address: int, pin: int, data: Optional[int] = None) -> int:
+        """
+        Record a device confirmation.
+
+        Args:
+            data: Reported relay value; None confirms any outstanding value
+
+        Returns:
+            Number of commands confirmed
+        """
+        now = time.monotonic()
+        key = self._key(mac, address, pin)
+        matched = []
+        with self._condition:
+            commands = self._pending.get(key)
+            if not commands:
+                return 0
+            remaining = []
+            for command in commands:
+                (matched if data is None or command.data == data else remaining).append(command)
+            if remaining:
+                self._pending[key] = remaining
+            else:
+                del self._pending[key]
+            for command in matched:
+                self._latencies.append((now - command.issued) * 1000)
+            self.confirmed += len(matched)
+
+        for command in matched:
+            command.future.set_result({
+                'confirmed': True,
+                'timed_out': False,
+                'latency_ms': round((now - command.issued) * 1000, 3)
+            })
+        return len(matched)
+
+    def on_message(self, client, userdata, msg) -> None:
+        """paho-style callback for device status/confirmation topics"""
+        try:
+            payload = json.loads(msg.payload.decode())
+        except ValueError:
+            return
+        if not isinstance(payload, dict):
+            return
+
+        value = payload.get('value')
+        value = value if isinstance(value, dict) else payload
+        pin = value.get('pin')
+        address = payload.get('address')
+        if pin is None or address is None:
+            return
+        mac = payload.get('mac') or msg.topic.rsplit('/', 1)[-1]
+        try:
+            self.confirm(mac, address, pin, value.get('data'))
+        except (TypeError, ValueError):
+            log_simple(f"Invalid actuation confirmation on {msg.topic}", "WARNING")
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._timeout_loop, name="actuation_tracker", daemon=True)
+            self._thread.start()
+
+    def _timeout_loop(self):
+        while True:
+            with self._condition:
+                while not self._deadlines:
+                    self._condition.wait()
+                deadline, _, command = self._deadlines[0]
+                now = time.monotonic()
+                if deadline > now:
+                    self._condition.wait(deadline - now)
+                    continue
+                heapq.heappop(self._deadlines)
+
+                commands = self._pending.get(command.key)
+                if not commands or command not in commands:
+                    # Already confirmed or cancelled
+                    continue
+                commands.remove(command)
+                if not commands:
+                    del self._pending[command.key]
+                self.timed_out += 1
+
+            log_simple(f"No actuation confirmation for {command.key} within {self.timeout}s", "WARNING")
+            command.future.set_result({'confirmed': False, 'timed_out': True, 'latency_ms': None})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get confirmation counters and command-to-actuation latency percentiles"""
+        with self._condition:
+            latencies = sorted(self._latencies)
+            stats = {
+                'timeout': self.timeout,
+                'tracked': self.tracked,
+                'confirmed': self.confirmed,
+                'timed_out': self.timed_out,
+                'cancelled': self.cancelled,
+                'pending': sum(len(commands) for commands in self._pending.values())
+            }
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 3)
+
+        stats['latency_ms'] = {
+            'samples': len(latencies),
+            'p50': percentile(0.5),
+            'p90': percentile(0.9),
+            'p99': percentile(0.99),
+            'max': round(latencies[-1], 3) if latencies else None
+        }
+        return stats
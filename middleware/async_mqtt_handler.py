@@ -0,0 +1,395 @@
+"""
+Async MQTT Handler Module
+asyncio-native MQTT client: paho's socket driven by the event loop instead of a network thread.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Optional, Any, Dict
+
+import paho.mqtt.client as mqtt
+
+from .logging import log_simple
+from .payload_codec import get_codec
+
+class AsyncMQTTHandler:
+    """
+    MQTT client for asyncio applications.
+
+    paho's socket is registered with the running event loop (add_reader /
+    add_writer) and its housekeeping runs as a task, so no network thread is
+    started; only opening the socket briefly runs in the default executor. Every
+    publish awaits its own acknowledgement, so thousands of messages can be
+    in flight on a single loop. All methods must be called from the loop the
+    handler was connected on.
+    """
+
+    def __init__(self, broker: str = "localhost", port: int = 1884, client_id: str = "voice_relay_async",
+                 max_inflight: Optional[int] = None, publish_timeout: float = 10.0,
+                 reconnect_min_delay: float = 0.5, reconnect_max_delay: float = 30.0,
+                 message_queue_size: int = 1000):
+        """
+        Initialize MQTT client.
+
+        Args:
+            broker: MQTT broker address
+            port: MQTT broker port
+            client_id: Unique client identifier
+            max_inflight: Optional bound on unacknowledged publishes; publish waits for a slot
+            publish_timeout: Seconds publish waits for the connection and the broker acknowledgement
+            reconnect_min_delay: Lower bound of the reconnect backoff in seconds
+            reconnect_max_delay: Upper bound of the reconnect backoff in seconds
+            message_queue_size: Capacity of each messages() iterator; messages are dropped when full
+        """
+        self.broker = broker
+        self.port = port
+        self.client_id = client_id
+        # Use VERSION1 for better compatibility with MQTT X
+        self.client = mqtt.Client(client_id=client_id, callback_api_version=mqtt.CallbackAPIVersion.VERSION1)
+        self.connected = False
+        self.started = False
+        self.publish_timeout = publish_timeout
+        self.reconnect_min_delay = reconnect_min_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.message_queue_size = message_queue_size
+        self.state = "disconnected"
+        self.state_info = {'state': self.state, 'timestamp': time.time(), 'attempt': 0}
+        self.dropped_messages = 0
+
+        self._loop = None
+        self._loop_thread = None
+        self._max_inflight = max_inflight
+        self._inflight = None
+        self._connected_event = None
+        self._misc_task = None
+        self._reconnect_task = None
+        self._stopping = False
+        self._connect_attempt = 0
+
+        # Subscription registry, re-applied on every connect
+        self._subscriptions = {}
+        # Publish completion tracking: mid -> asyncio.Future, resolved from on_publish
+        self._pending = {}
+        # Active messages() iterators: (topic filter, asyncio.Queue)
+        self._listeners = []
+
+        if max_inflight:
+            self.client.max_inflight_messages_set(max_inflight)
+
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_message = self.on_message
+        self.client.on_publish = self.on_publish
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    # Event loop integration
+
+    def _on_loop(self, callback, *args):
+        """Run a socket registration on the event loop; reconnect() opens the socket from an executor thread"""
+        if threading.get_ident() == self._loop_thread:
+            callback(*args)
+        else:
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    def _on_socket_open(self, client, userdata, sock):
+        self._on_loop(self._watch_socket, sock)
+
+    def _watch_socket(self, sock):
+        self._loop.add_reader(sock, self.client.loop_read)
+        if self._misc_task is None or self._misc_task.done():
+            self._misc_task = self._loop.create_task(self._misc_loop())
+
+    def _on_socket_close(self, client, userdata, sock):
+        self._on_loop(self._unwatch_socket, sock)
+
+    def _unwatch_socket(self, sock):
+        self._loop.remove_reader(sock)
+        self._loop.remove_writer(sock)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._on_loop(self._loop.add_writer, sock, self.client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._on_loop(self._loop.remove_writer, sock)
+
+    async def _misc_loop(self):
+        """Keepalive pings and timeout detection, normally done by paho's network thread"""
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+    # paho callbacks (run on the event loop)
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            self.connected = True
+            self._connect_attempt = 0
+            self._connected_event.set()
+            log_simple(f"Connected to MQTT broker {self.broker}:{self.port}", "SUCCESS")
+
+            # Announce ourselves and restore every registered subscription
+            self.client.publish("client/status", "online", qos=1, retain=True)
+            if self._subscriptions:
+                self.client.subscribe(list(self._subscriptions.items()))
+                log_simple(f"Restored {len(self._subscriptions)} subscription(s)", "INFO")
+            self._set_state("connected")
+        else:
+            log_simple(f"Failed to connect to MQTT broker, return code {rc}", "ERROR")
+            self._set_state("refused", error=f"return code {rc}")
+
+    def on_disconnect(self, client, userdata, rc, properties=None, reasoncodes=None):
+        self.connected = False
+        self._connected_event.clear()
+        if self._stopping:
+            self._set_state("disconnected")
+            return
+        log_simple("Disconnected from MQTT broker", "WARNING")
+        self._start_reconnect(f"connection lost (rc={rc})")
+
+    def on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        """Resolve the future of an acknowledged publish"""
+        future = self._pending.pop(mid, None)
+        if future is not None and not future.done():
+            future.set_result(True)
+
+    def on_message(self, client, userdata, msg):
+        """Fan the message out to every matching messages() iterator"""
+        for topic_filter, message_queue in self._listeners:
+            if topic_filter is None or mqtt.topic_matches_sub(topic_filter, msg.topic):
+                try:
+                    message_queue.put_nowait(msg)
+                except asyncio.QueueFull:
+                    self.dropped_messages += 1
+                    log_simple(f"Async message queue full, dropping message on {msg.topic}", "WARNING")
+
+    # Connection lifecycle
+
+    def _set_state(self, state, **info):
+        event = {'state': state, 'timestamp': time.time(), 'attempt': self._connect_attempt}
+        event.update(info)
+        self.state = state
+        self.state_info = event
+
+    def get_connection_state(self) -> Dict[str, Any]:
+        """Get the current connection state and registered subscriptions"""
+        info = dict(self.state_info)
+        info['connected'] = self.connected
+        info['subscriptions'] = sorted(self._subscriptions)
+        info['inflight'] = len(self._pending)
+        info['dropped_messages'] = self.dropped_messages
+        return info
+
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with full jitter"""
+        ceiling = min(self.reconnect_max_delay, self.reconnect_min_delay * (2 ** min(attempt + 1, 16)))
+        return random.uniform(self.reconnect_min_delay, max(self.reconnect_min_delay, ceiling))
+
+    def _start_reconnect(self, reason):
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self._loop.create_task(self._reconnect_loop(reason))
+
+    async def _reconnect_loop(self, reason):
+        while not self._stopping and not self.connected:
+            delay = self._backoff_delay(self._connect_attempt)
+            self._connect_attempt += 1
+            log_simple(f"MQTT {reason}, reconnecting in {delay:.1f}s (attempt {self._connect_attempt})", "WARNING")
+            self._set_state("reconnecting", error=reason, retry_in=round(delay, 2))
+            await asyncio.sleep(delay)
+            if self._stopping:
+                return
+            try:
+                await self._open()
+                return
+            except OSError as e:
+                reason = f"connection attempt failed ({e})"
+
+    async def _open(self):
+        """Open the broker socket; only this short call runs off the loop (DNS and TCP handshake)"""
+        await self._loop.run_in_executor(None, self.client.reconnect)
+
+    async def connect(self, timeout: float = 10.0) -> bool:
+        """
+        Connect to the broker and wait up to timeout for the session to come up.
+        If the broker is unreachable, reconnect attempts continue in the background
+        with jittered exponential backoff; subscriptions are restored on every connect.
+        """
+        if self.started:
+            return await self._wait_connected(timeout)
+
+        self.started = True
+        self._loop = asyncio.get_running_loop()
+        self._connected_event = asyncio.Event()
+        if self._max_inflight:
+            self._inflight = asyncio.Semaphore(self._max_inflight)
+        self._stopping = False
+        self._loop_thread = threading.get_ident()
+        self.client.will_set("client/status", "offline", qos=1, retain=True)
+        self.client.connect_async(self.broker, self.port, keepalive=30)  # Reduced keepalive for compatibility
+        self._set_state("connecting")
+
+        try:
+            await self._open()
+        except OSError as e:
+            log_simple(f"Error connecting to MQTT broker: {e}", "ERROR")
+            self._start_reconnect(f"connection attempt failed ({e})")
+        return await self._wait_connected(timeout)
+
+    async def _wait_connected(self, timeout):
+        try:
+            await asyncio.wait_for(self._connected_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def disconnect(self) -> None:
+        """Disconnect from MQTT broker and stop reconnecting"""
+        if not self.started:
+            return
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self.connected:
+            self.client.disconnect()
+            # Let the loop flush the DISCONNECT packet and close the socket
+            for _ in range(20):
+                if self.client.socket() is None:
+                    break
+                await asyncio.sleep(0.05)
+        if self._misc_task is not None:
+            self._misc_task.cancel()
+        self.started = False
+        self.connected = False
+        self._connected_event.clear()
+        self._set_state("disconnected")
+
+        # Nothing will acknowledge the outstanding publishes any more
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_result(False)
+
+    # Publishing and subscribing
+
+    async def publish(self, topic, payload, qos=1, retain=False,
+                      timeout: Optional[float] = None, codec=None) -> bool:
+        """
+        Publish and await the broker acknowledgement.
+        While disconnected the call waits for the connection to come back.
+
+        Args:
+            topic: Topic to publish to
+            payload: dict/list (encoded with codec, JSON by default), str, bytes or other value (sent as str)
+            qos: Quality of service level
+            retain: Retain flag
+            timeout: Seconds to wait for connection, in-flight slot and acknowledgement (publish_timeout if None)
+            codec: Codec for dict/list payloads
+
+        Returns:
+            True when the publish was acknowledged, False on failure or timeout
+        """
+        timeout = self.publish_timeout if timeout is None else timeout
+        try:
+            if isinstance(payload, (dict, list)):
+                payload = (codec or get_codec()).encode(payload)
+            elif not isinstance(payload, (str, bytes, bytearray)):
+                payload = str(payload)
+        except Exception as e:
+            log_simple(f"Error encoding payload for {topic}: {e}", "ERROR")
+            return False
+
+        try:
+            return await asyncio.wait_for(self._publish(topic, payload, qos, retain), timeout)
+        except asyncio.TimeoutError:
+            log_simple(f"Timed out waiting for publish acknowledgement on {topic}", "ERROR")
+            return False
+
+    async def _publish(self, topic, payload, qos, retain):
+        if not self.started:
+            log_simple("Not connected to MQTT broker", "ERROR")
+            return False
+        if self._inflight is not None:
+            await self._inflight.acquire()
+        try:
+            if not self.connected:
+                await self._connected_event.wait()
+            result = self.client.publish(topic, payload, qos=qos, retain=retain)
+            if result.rc == mqtt.MQTT_ERR_NO_CONN and qos > 0:
+                # Connection dropped before on_disconnect ran; paho keeps the message
+                # and resends it after the reconnect, so only its acknowledgement is awaited
+                log_simple("Connection lost, %s will be sent on reconnect", "DEBUG", topic)
+            elif result.rc != mqtt.MQTT_ERR_SUCCESS:
+                # Includes QoS 0 on a lost connection, which paho does not keep
+                log_simple(f"Failed to publish to {topic}, error code: {result.rc}", "ERROR")
+                return False
+            else:
+                log_simple("Published to %s: %s", "DEBUG", topic, payload)
+
+            # Acknowledgements are only processed on this loop, so the mid is
+            # always registered before on_publish can run for it
+            future = self._loop.create_future()
+            self._pending[result.mid] = future
+            try:
+                return await future
+            finally:
+                self._pending.pop(result.mid, None)
+        finally:
+            if self._inflight is not None:
+                self._inflight.release()
+
+    async def subscribe(self, topic, qos=1) -> bool:
+        """
+        Subscribe to topic.
+        The subscription is registered and re-applied on every (re)connect, so it
+        can also be made before the broker is reachable.
+        """
+        self._subscriptions[topic] = qos
+        if not self.connected:
+            log_simple(f"Not connected to MQTT broker, {topic} will be subscribed on connect", "WARNING")
+            return True
+
+        result = self.client.subscribe(topic, qos)
+        if result[0] == mqtt.MQTT_ERR_SUCCESS:
+            log_simple(f"Subscribed to {topic}", "SUCCESS")
+            return True
+        log_simple(f"Failed to subscribe to {topic}, error code: {result[0]}", "ERROR")
+        return False
+
+    async def unsubscribe(self, topic) -> bool:
+        """Unsubscribe from topic"""
+        self._subscriptions.pop(topic, None)
+        if not self.connected:
+            return True
+
+        result = self.client.unsubscribe(topic)
+        if result[0] == mqtt.MQTT_ERR_SUCCESS:
+            log_simple(f"Unsubscribed from {topic}", "SUCCESS")
+            return True
+        log_simple(f"Failed to unsubscribe from {topic}, error code: {result[0]}", "ERROR")
+        return False
+
+    async def messages(self, topic_filter: Optional[str] = None):
+        """
+        Iterate over received messages.
+
+            async for msg in handler.messages("device/heartbeat/+"):
+                ...
+
+        Args:
+            topic_filter: Only yield messages matching this filter (all messages if None);
+                          the filter is not subscribed automatically
+
+        Yields:
+            paho MQTTMessage objects, in arrival order
+        """
+        listener = (topic_filter, asyncio.Queue(maxsize=self.message_queue_size))
+        self._listeners.append(listener)
+        try:
+            while True:
+                yield await listener[1].get()
+        finally:
+            self._listeners.remove(listener)
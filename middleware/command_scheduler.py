@@ -0,0 +1,208 @@
+"""
+Outbound Command Scheduler Module
+Collapses duplicate and superseded relay writes per relay pin.
+"""
+
+import heapq
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, Hashable
+
+from .logging import log_simple
+
+class _PinState:
+    """Send history and pending write of one relay pin"""
+
+    __slots__ = ('sent_value', 'sent_future', 'window_end', 'pending_value',
+                 'pending_topic', 'pending_payload', 'pending_future')
+
+    def __init__(self):
+        self.sent_value = None
+        self.sent_future = None
+        self.window_end = 0.0
+        self.pending_value = None
+        self.pending_topic = None
+        self.pending_payload = None
+        self.pending_future = None
+
+class OutboundCommandScheduler:
+    """
+    Per-key write coalescer for relay commands.
+
+    The first write for a key is published immediately and opens a window.
+    Writes arriving inside that window are not published right away: repeats
+    of the value just sent are dropped, and the latest differing value is
+    published once when the window closes. Every caller gets a Future for the
+    publish that carries its desired value.
+
+    Publishes run outside the lock, but those of one key are handed to the
+    publish function in the order their windows opened, so a publish waiting
+    for an in-flight slot is never overtaken by the newer value.
+    """
+
+    def __init__(self, publish: Callable[[str, Any], Future], window: float = 0.3):
+        """
+        Initialize scheduler.
+
+        Args:
+            publish: Non-blocking publish function, called as publish(topic, payload) -> Future
+            window: Seconds after a write during which further writes are coalesced
+        """
+        self.publish = publish
+        self.window = window
+        self._states = {}
+        self._deadlines = []
+        # key -> [tickets issued, tickets handed to publish] while publishes are outstanding
+        self._tickets = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self.submitted = 0
+        self.published = 0
+        self.suppressed = 0
+
+    def submit(self, key: Hashable, topic: str, payload: Any, value: Any) -> Future:
+        """
+        Schedule a write.
+
+        Args:
+            key: Relay identity, e.g. (mac, address, device_bus, pin)
+            topic: Topic to publish to
+            payload: Payload to publish
+            value: Desired relay value, used to detect duplicates
+
+        Returns:
+            Future resolving to True once the effective write is acknowledged
+        """
+        with self._condition:
+            self.submitted += 1
+            now = time.monotonic()
+            state = self._states.get(key)
+
+            if state is not None and now < state.window_end:
+                if state.pending_future is not None:
+                    # Superseded: keep only the latest desired value
+                    self.suppressed += 1
+                    state.pending_value = value
+                    state.pending_topic = topic
+                    state.pending_payload = payload
+                    return state.pending_future
+
+                if value == state.sent_value:
+                    # Duplicate of the write just sent
+                    self.suppressed += 1
+                    return state.sent_future
+
+                state.pending_value = value
+                state.pending_topic = topic
+                state.pending_payload = payload
+                state.pending_future = Future()
+                return state.pending_future
+
+            state = state or self._states.setdefault(key, _PinState())
+            future, ticket = self._open_window(key, state, value, now)
+
+        self._publish(key, ticket, topic, payload, future)
+        return future
+
+    def _open_window(self, key, state, value, now):
+        """
+        Record a write as sent and open its coalescing window (called with the lock held).
+
+        Returns:
+            (future of the write, its publish ticket for the key)
+        """
+        future = Future()
+        self.published += 1
+        state.sent_value = value
+        state.sent_future = future
+        state.window_end = now + self.window
+        heapq.heappush(self._deadlines, (state.window_end, id(state), key))
+        tickets = self._tickets.setdefault(key, [0, 0])
+        tickets[0] += 1
+        self._ensure_thread()
+        # Wakes the flush loop as well as publishes waiting for their turn
+        self._condition.notify_all()
+        return future, tickets[0]
+
+    def _publish(self, key, ticket, topic, payload, future):
+        """
+        Publish a write outside the lock, since publish may wait for an in-flight slot.
+        Waits until the previous write of the key has been handed off.
+        """
+        with self._condition:
+            tickets = self._tickets[key]
+            while tickets[1] != ticket - 1:
+                self._condition.wait()
+        try:
+            self._chain(self.publish(topic, payload), future)
+        except Exception as e:
+            log_simple(f"Error publishing command to {topic}: {e}", "ERROR")
+            future.set_result(False)
+        finally:
+            with self._condition:
+                tickets[1] = ticket
+                if tickets[1] == tickets[0]:
+                    del self._tickets[key]
+                self._condition.notify_all()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._flush_loop, name="command_scheduler", daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            with self._condition:
+                while not self._deadlines:
+                    self._condition.wait()
+                deadline, _, key = self._deadlines[0]
+                now = time.monotonic()
+                if deadline > now:
+                    self._condition.wait(deadline - now)
+                    continue
+                heapq.heappop(self._deadlines)
+
+                state = self._states.get(key)
+                if state is None or state.window_end > now:
+                    continue
+                if state.pending_future is None:
+                    # Quiet window: forget the pin
+                    del self._states[key]
+                    continue
+
+                pending_future = state.pending_future
+                state.pending_future = None
+                send = state.pending_value != state.sent_value
+                if send:
+                    topic, payload = state.pending_topic, state.pending_payload
+                    future, ticket = self._open_window(key, state, state.pending_value, now)
+                else:
+                    # Flipped back to what was already sent
+                    self.suppressed += 1
+                    future = state.sent_future
+
+            if send:
+                self._publish(key, ticket, topic, payload, future)
+            self._chain(future, pending_future)
+
+    @staticmethod
+    def _chain(source: Future, target: Future) -> None:
+        def copy_result(done):
+            try:
+                target.set_result(done.result())
+            except Exception as e:
+                log_simple(f"Coalesced command failed: {e}", "ERROR")
+                target.set_result(False)
+        source.add_done_callback(copy_result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get submitted/published/suppressed counters"""
+        with self._condition:
+            return {
+                'window': self.window,
+                'tracked_pins': len(self._states),
+                'submitted': self.submitted,
+                'published': self.published,
+                'suppressed': self.suppressed
+            }
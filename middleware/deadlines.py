@@ -0,0 +1,128 @@
+"""
+Deadline Scheduler Module
+Per-key expiry timers on a single min-heap, used for device liveness timeouts.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Hashable, Iterable, Dict, Any
+
+from .logging import log_simple
+
+class DeadlineScheduler:
+    """
+    Keyed deadline heap.
+
+    ``touch`` (re)schedules a key's deadline in O(log n); superseded heap
+    entries are skipped lazily when they surface. A single thread sleeps until
+    the earliest deadline and hands all keys expiring together to
+    ``on_expire`` in one call, so the work done is proportional to the number
+    of expired keys, not to the number of tracked keys.
+    """
+
+    def __init__(self, on_expire: Callable[[list], None], name: str = "deadlines"):
+        """
+        Initialize scheduler.
+
+        Args:
+            on_expire: Called with the list of expired keys, outside the scheduler lock
+            name: Thread name
+        """
+        self.on_expire = on_expire
+        self.name = name
+        self._heap = []
+        self._current = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self.running = False
+        self.expired = 0
+
+    def start(self) -> None:
+        """Start the expiry thread"""
+        with self._condition:
+            if self.running:
+                return
+            self.running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """Stop the expiry thread; scheduled deadlines are kept"""
+        with self._condition:
+            self.running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def touch(self, key: Hashable, timeout: float) -> None:
+        """(Re)schedule a key to expire timeout seconds from now"""
+        self.schedule(key, time.monotonic() + timeout)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """(Re)schedule a key to expire at a time.monotonic() deadline"""
+        with self._condition:
+            sequence = next(self._sequence)
+            self._current[key] = sequence
+            earliest = self._heap[0][0] if self._heap else None
+            heapq.heappush(self._heap, (deadline, sequence, key))
+            self._compact()
+            if earliest is None or deadline < earliest:
+                self._condition.notify()
+
+    def schedule_many(self, items: Iterable[tuple]) -> None:
+        """Schedule (key, deadline) pairs in one heapify, e.g. when seeding at start"""
+        with self._condition:
+            for key, deadline in items:
+                sequence = next(self._sequence)
+                self._current[key] = sequence
+                self._heap.append((deadline, sequence, key))
+            heapq.heapify(self._heap)
+            self._condition.notify()
+
+    def cancel(self, key: Hashable) -> None:
+        """Forget a key's deadline"""
+        with self._condition:
+            self._current.pop(key, None)
+
+    def _compact(self):
+        """Drop superseded entries once they dominate the heap (called with the lock held)"""
+        if len(self._heap) > 64 and len(self._heap) > 4 * len(self._current):
+            self._heap = [entry for entry in self._heap if self._current.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                expired = []
+                while self.running and not expired:
+                    now = time.monotonic()
+                    while self._heap and self._heap[0][0] <= now:
+                        _, sequence, key = heapq.heappop(self._heap)
+                        if self._current.get(key) == sequence:
+                            del self._current[key]
+                            expired.append(key)
+                    if expired:
+                        break
+                    self._condition.wait(self._heap[0][0] - now if self._heap else None)
+                if not self.running:
+                    return
+                self.expired += len(expired)
+
+            try:
+                self.on_expire(expired)
+            except Exception as e:
+                log_simple(f"Error in {self.name} expiry handler: {e}", "ERROR")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracked key count, heap size and expiry counter"""
+        with self._condition:
+            return {
+                'tracked': len(self._current),
+                'heap_size': len(self._heap),
+                'expired': self.expired,
+                'next_wakeup_in': round(max(0.0, self._heap[0][0] - time.monotonic()), 3) if self._heap else None
+            }
@@ -0,0 +1,224 @@
+"""
+Device History Module
+Fixed-size per-device ring buffers of heartbeat arrivals and status transitions.
+"""
+
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+STATE_CODES = {'offline': 0, 'online': 1}
+STATE_NAMES = {0: 'offline', 1: 'online', -1: 'unknown'}
+
+class _DeviceRing:
+    """Heartbeat and transition rings of one device, preallocated typed arrays"""
+
+    __slots__ = ('heartbeats', 'heartbeat_next', 'heartbeat_count',
+                 'transition_times', 'transition_states', 'transition_next', 'transition_count',
+                 'total_heartbeats', 'total_transitions')
+
+    def __init__(self, heartbeat_capacity, transition_capacity):
+        self.heartbeats = array('d', bytes(8 * heartbeat_capacity))
+        self.heartbeat_next = 0
+        self.heartbeat_count = 0
+        self.transition_times = array('d', bytes(8 * transition_capacity))
+        self.transition_states = array('b', bytes(transition_capacity))
+        self.transition_next = 0
+        self.transition_count = 0
+        self.total_heartbeats = 0
+        self.total_transitions = 0
+
+    def add_heartbeat(self, timestamp):
+        capacity = len(self.heartbeats)
+        self.heartbeats[self.heartbeat_next] = timestamp
+        self.heartbeat_next = (self.heartbeat_next + 1) % capacity
+        if self.heartbeat_count < capacity:
+            self.heartbeat_count += 1
+        self.total_heartbeats += 1
+
+    def last_state(self):
+        if not self.transition_count:
+            return None
+        return self.transition_states[(self.transition_next - 1) % len(self.transition_states)]
+
+    def add_transition(self, timestamp, state):
+        capacity = len(self.transition_times)
+        self.transition_times[self.transition_next] = timestamp
+        self.transition_states[self.transition_next] = state
+        self.transition_next = (self.transition_next + 1) % capacity
+        if self.transition_count < capacity:
+            self.transition_count += 1
+        self.total_transitions += 1
+
+    def ordered_heartbeats(self):
+        capacity = len(self.heartbeats)
+        start = (self.heartbeat_next - self.heartbeat_count) % capacity
+        return [self.heartbeats[(start + i) % capacity] for i in range(self.heartbeat_count)]
+
+    def ordered_transitions(self):
+        capacity = len(self.transition_times)
+        start = (self.transition_next - self.transition_count) % capacity
+        return [(self.transition_times[(start + i) % capacity], self.transition_states[(start + i) % capacity])
+                for i in range(self.transition_count)]
+
+class DeviceHistory:
+    """
+    Per-MAC heartbeat and status history.
+
+    Recording writes one float (and one byte for transitions) into
+    preallocated arrays, so the hot heartbeat path allocates nothing per
+    event. Uptime, heartbeat jitter and flap counts are computed only when
+    statistics are requested.
+
+    Anyone able to publish on the heartbeat topic can invent MACs, so at most
+    max_devices are tracked; the least recently heard one is evicted first.
+    """
+
+    def __init__(self, heartbeat_capacity: int = 256, transition_capacity: int = 64, max_devices: int = 10000):
+        """
+        Initialize history.
+
+        Args:
+            heartbeat_capacity: Heartbeat arrival times kept per device
+            transition_capacity: Status transitions kept per device
+            max_devices: Devices tracked at most (about 2.7 KB each with the default capacities)
+        """
+        self.heartbeat_capacity = heartbeat_capacity
+        self.transition_capacity = transition_capacity
+        self.max_devices = max_devices
+        self.evicted = 0
+        self._devices = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ring(self, mac_address):
+        ring = self._devices.get(mac_address)
+        if ring is None:
+            ring = self._devices[mac_address] = _DeviceRing(self.heartbeat_capacity, self.transition_capacity)
+            if len(self._devices) > self.max_devices:
+                self._devices.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._devices.move_to_end(mac_address)
+        return ring
+
+    def record_heartbeat(self, mac_address: str, timestamp: Optional[float] = None) -> None:
+        """Record a heartbeat arrival (epoch seconds, now if None)"""
+        with self._lock:
+            self._ring(mac_address).add_heartbeat(timestamp or time.time())
+
+    def record_status(self, mac_address: str, status: str, timestamp: Optional[float] = None) -> bool:
+        """
+        Record a device status; only changes are stored.
+
+        Returns:
+            True if the status differs from the last recorded one
+        """
+        state = STATE_CODES.get(status, -1)
+        with self._lock:
+            ring = self._ring(mac_address)
+            if ring.last_state() == state:
+                return False
+            ring.add_transition(timestamp or time.time(), state)
+            return True
+
+    def forget(self, mac_address: str) -> None:
+        """Drop a device's history, e.g. when its configuration is deleted"""
+        with self._lock:
+            self._devices.pop(mac_address, None)
+
+    def get_stats(self, mac_address: str, window: Optional[float] = None,
+                  include_events: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Compute uptime, heartbeat jitter and flaps of one device.
+
+        Args:
+            mac_address: Device MAC
+            window: Only consider the last window seconds (whole kept history if None)
+            include_events: Add the kept transitions to the result
+
+        Returns:
+            Statistics dict, None for an unknown device
+        """
+        with self._lock:
+            ring = self._devices.get(mac_address)
+            if ring is None:
+                return None
+            heartbeats = ring.ordered_heartbeats()
+            transitions = ring.ordered_transitions()
+            totals = (ring.total_heartbeats, ring.total_transitions)
+
+        now = time.time()
+        since = now - window if window else None
+        stats = {
+            'mac': mac_address,
+            'status': STATE_NAMES[transitions[-1][1]] if transitions else 'unknown',
+            'total_heartbeats': totals[0],
+            'total_transitions': totals[1]
+        }
+        stats.update(self._uptime(transitions, since, now))
+        stats.update(self._jitter(heartbeats, since))
+        if include_events:
+            stats['transitions'] = [
+                {'timestamp': timestamp, 'status': STATE_NAMES[state]}
+                for timestamp, state in transitions
+                if since is None or timestamp >= since
+            ]
+        return stats
+
+    def get_all_stats(self, window: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Compute statistics for every tracked device"""
+        with self._lock:
+            macs = list(self._devices)
+        return {mac: self.get_stats(mac, window) for mac in macs}
+
+    @staticmethod
+    def _uptime(transitions, since, now):
+        """Share of the observed time spent online, and online→offline flaps"""
+        if not transitions:
+            return {'uptime_percent': None, 'observed_seconds': 0.0, 'flaps': 0}
+
+        start = transitions[0][0] if since is None else max(since, transitions[0][0])
+        online_seconds = 0.0
+        flaps = 0
+        previous_state = None
+        for index, (timestamp, state) in enumerate(transitions):
+            end = transitions[index + 1][0] if index + 1 < len(transitions) else now
+            if end <= start:
+                previous_state = state
+                continue
+            if state == 1:
+                online_seconds += end - max(timestamp, start)
+            if previous_state == 1 and state == 0 and timestamp >= start:
+                flaps += 1
+            previous_state = state
+
+        observed = now - start
+        return {
+            'uptime_percent': round(100.0 * online_seconds / observed, 2) if observed > 0 else None,
+            'observed_seconds': round(observed, 1),
+            'flaps': flaps
+        }
+
+    @staticmethod
+    def _jitter(heartbeats, since):
+        """Heartbeat inter-arrival mean, standard deviation (jitter) and extremes in seconds"""
+        if since is not None:
+            heartbeats = [timestamp for timestamp in heartbeats if timestamp >= since]
+        intervals = [later - earlier for earlier, later in zip(heartbeats, heartbeats[1:])]
+        if not intervals:
+            return {'heartbeats': len(heartbeats), 'interval_avg': None, 'jitter': None,
+                    'interval_min': None, 'interval_max': None, 'last_heartbeat': heartbeats[-1] if heartbeats else None}
+
+        mean = sum(intervals) / len(intervals)
+        variance = sum((interval - mean) ** 2 for interval in intervals) / len(intervals)
+        return {
+            'heartbeats': len(heartbeats),
+            'interval_avg': round(mean, 3),
+            'jitter': round(math.sqrt(variance), 3),
+            'interval_min': round(min(intervals), 3),
+            'interval_max': round(max(intervals), 3),
+            'last_heartbeat': heartbeats[-1]
+        }
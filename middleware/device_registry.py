@@ -0,0 +1,140 @@
+"""
+Device Registry Module
+Indexed, copy-on-write view of the modular devices announced on MODULAR_DEVICE/AVAILABLES.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .logging import log_simple
+
+class DeviceSnapshot:
+    """
+    Immutable device list with lookup indexes.
+
+    A snapshot is never modified after construction, so readers can use it
+    without locking while the MQTT thread builds and swaps in the next one.
+    """
+
+    __slots__ = ('version', 'devices', 'by_name', 'by_mac', 'by_part_number')
+
+    def __init__(self, version: int, devices: Iterable[Dict[str, Any]]):
+        self.version = version
+        self.devices = tuple(devices)
+        self.by_name = {}
+        self.by_mac = {}
+        self.by_part_number = {}
+        for device in self.devices:
+            self.by_name.setdefault(device.get('name'), device)
+            self.by_mac.setdefault(str(device.get('mac', '')).lower(), []).append(device)
+            self.by_part_number.setdefault(str(device.get('part_number', '')).upper(), []).append(device)
+
+    def filter(self, name: Optional[str] = None, mac: Optional[str] = None,
+               part_number: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Devices matching every given field (MAC and part number are case-insensitive)"""
+        if name is not None:
+            candidates = [self.by_name[name]] if name in self.by_name else []
+        elif mac is not None:
+            candidates = self.by_mac.get(mac.lower(), [])
+        elif part_number is not None:
+            candidates = self.by_part_number.get(part_number.upper(), [])
+        else:
+            return list(self.devices)
+
+        return [
+            device for device in candidates
+            if (mac is None or str(device.get('mac', '')).lower() == mac.lower())
+            and (part_number is None or str(device.get('part_number', '')).upper() == part_number.upper())
+        ]
+
+class DeviceRegistry:
+    """
+    Registry of available devices.
+
+    ``replace`` builds a new indexed snapshot from a full device list and
+    swaps it in atomically; listeners receive the difference (devices added,
+    removed or changed, keyed by name). The snapshot version only changes when
+    the content does, so it can be used as a cache validator.
+    """
+
+    def __init__(self, devices: Optional[Iterable[Dict[str, Any]]] = None,
+                 part_numbers: Optional[Iterable[str]] = None):
+        """
+        Initialize registry.
+
+        Args:
+            devices: Initial device list
+            part_numbers: Only keep devices of these part numbers (all if None)
+        """
+        self.part_numbers = {p.upper() for p in part_numbers} if part_numbers else None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._snapshot = DeviceSnapshot(0, self._accept(devices or []))
+
+    def _accept(self, devices):
+        return [
+            device for device in devices
+            if isinstance(device, dict)
+            and (self.part_numbers is None or str(device.get('part_number', '')).upper() in self.part_numbers)
+        ]
+
+    @property
+    def snapshot(self) -> DeviceSnapshot:
+        """Current snapshot (lock-free read)"""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a callback for non-empty diffs: {'version', 'added', 'removed', 'changed'}"""
+        self._listeners.append(callback)
+
+    def replace(self, devices: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Swap in a new full device list.
+
+        Returns:
+            Diff against the previous snapshot
+        """
+        devices = self._accept(devices)
+        with self._lock:
+            previous = self._snapshot
+            incoming = {}
+            for device in devices:
+                incoming.setdefault(device.get('name'), device)
+
+            added = [device for name, device in incoming.items() if name not in previous.by_name]
+            removed = [device for name, device in previous.by_name.items() if name not in incoming]
+            changed = [
+                device for name, device in incoming.items()
+                if name in previous.by_name and previous.by_name[name] != device
+            ]
+            diff = {'added': added, 'removed': removed, 'changed': changed}
+            if added or removed or changed or len(devices) != len(previous.devices):
+                self._snapshot = DeviceSnapshot(previous.version + 1, devices)
+            diff['version'] = self._snapshot.version
+
+        if added or removed or changed:
+            for listener in list(self._listeners):
+                try:
+                    listener(diff)
+                except Exception as e:
+                    log_simple(f"Error in device registry listener: {e}", "ERROR")
+        return diff
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Device by name"""
+        return self._snapshot.by_name.get(name)
+
+    def get_by_mac(self, mac: str) -> List[Dict[str, Any]]:
+        """Devices behind one controller MAC"""
+        return list(self._snapshot.by_mac.get(mac.lower(), []))
+
+    def filter(self, **fields) -> List[Dict[str, Any]]:
+        """Devices of the current snapshot matching name/mac/part_number"""
+        return self._snapshot.filter(**fields)
+
+    def __len__(self) -> int:
+        return len(self._snapshot.devices)
@@ -0,0 +1,170 @@
+"""
+Discovery Module
+Timed device discovery sessions that collect announce responses and finish as one result.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .deadlines import DeadlineScheduler
+from .logging import log_simple
+
+class DiscoverySession:
+    """Announce responses collected for one discovery request"""
+
+    def __init__(self, window: float, quiet: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.window = window
+        self.quiet = quiet
+        self.started = time.time()
+        self.finished = None
+        self.reason = None
+        self.error = None
+        self.devices = {}
+        self.future = Future()
+
+    @property
+    def active(self) -> bool:
+        return self.finished is None
+
+    def add(self, mac_address: str, payload: Dict[str, Any]) -> bool:
+        """Collect one announce; returns False for a MAC already seen in this session"""
+        if mac_address in self.devices:
+            return False
+        self.devices[mac_address] = {
+            'mac': mac_address,
+            'name': payload.get('name'),
+            'part_number': payload.get('part_number'),
+            'timestamp': payload.get('timestamp'),
+            'response_ms': round((time.time() - self.started) * 1000, 1)
+        }
+        return True
+
+    def result(self) -> Dict[str, Any]:
+        """Aggregated session result"""
+        return {
+            'id': self.id,
+            'active': self.active,
+            'started': self.started,
+            'finished': self.finished,
+            'reason': self.reason,
+            'error': self.error,
+            'window': self.window,
+            'quiet': self.quiet,
+            'count': len(self.devices),
+            'devices': list(self.devices.values())
+        }
+
+class DiscoveryCoordinator:
+    """
+    Runs at most one discovery session at a time.
+
+    A session collects announce responses until its window ends or no new
+    device has answered for the quiet period, whichever comes first; both are
+    deadlines on a DeadlineScheduler, the quiet one pushed back by every new
+    device. ``on_complete`` then receives the session once, so its devices can
+    be persisted in a single write. Requests arriving while a session is
+    running join it instead of flooding the devices with another request.
+    """
+
+    def __init__(self, on_complete: Callable[[DiscoverySession], None], window: float = 5.0,
+                 quiet: float = 1.5, history_size: int = 20):
+        """
+        Initialize coordinator.
+
+        Args:
+            on_complete: Called with the finished session, before its future resolves
+            window: Default maximum session length in seconds
+            quiet: Default seconds without a new device after which the session ends
+            history_size: Finished sessions kept for lookup by id
+        """
+        self.on_complete = on_complete
+        self.window = window
+        self.quiet = quiet
+        self.history_size = history_size
+        self._active = None
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._deadlines = DeadlineScheduler(self._on_deadline, name="discovery")
+
+    def start(self, window: Optional[float] = None, quiet: Optional[float] = None) -> Tuple[DiscoverySession, bool]:
+        """
+        Start a session, or join the running one.
+
+        Returns:
+            (session, created)
+        """
+        with self._lock:
+            if self._active is not None:
+                return self._active, False
+            session = DiscoverySession(window or self.window, quiet or self.quiet)
+            self._active = session
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.history_size:
+                self._sessions.popitem(last=False)
+
+        self._deadlines.start()
+        self._deadlines.touch((session.id, 'window'), session.window)
+        self._deadlines.touch((session.id, 'quiet'), session.quiet)
+        log_simple(f"Discovery session {session.id} started (window {session.window}s, quiet {session.quiet}s)", "INFO")
+        return session, True
+
+    def record(self, mac_address: str, payload: Dict[str, Any]) -> bool:
+        """
+        Offer an announce to the running session.
+
+        Returns:
+            True if a session is collecting (the caller should not persist the announce itself)
+        """
+        with self._lock:
+            session = self._active
+            if session is None:
+                return False
+            new = session.add(mac_address, payload)
+        if new:
+            self._deadlines.touch((session.id, 'quiet'), session.quiet)
+        return True
+
+    def abort(self, session: DiscoverySession, error: str) -> None:
+        """End a session without waiting for responses, e.g. when the request could not be sent"""
+        session.error = error
+        self._finish(session, "error")
+
+    def get(self, session_id: str) -> Optional[DiscoverySession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def stop(self) -> None:
+        """Finish a running session and stop the deadline thread"""
+        session = self._active
+        if session is not None:
+            self._finish(session, "stopped")
+        self._deadlines.stop()
+
+    def _on_deadline(self, keys):
+        for session_id, reason in keys:
+            session = self.get(session_id)
+            if session is not None:
+                self._finish(session, reason)
+
+    def _finish(self, session, reason):
+        with self._lock:
+            if not session.active:
+                return
+            session.finished = time.time()
+            session.reason = reason
+            if self._active is session:
+                self._active = None
+        self._deadlines.cancel((session.id, 'window'))
+        self._deadlines.cancel((session.id, 'quiet'))
+
+        log_simple(f"Discovery session {session.id} finished ({reason}): {len(session.devices)} devices", "INFO")
+        try:
+            self.on_complete(session)
+        except Exception as e:
+            log_simple(f"Error completing discovery session {session.id}: {e}", "ERROR")
+        session.future.set_result(session.result())
@@ -0,0 +1,143 @@
+"""
+Event Bus Module
+In-process publish/subscribe of UI events, streamed to browsers as Server-Sent Events.
+"""
+
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+from .logging import log_simple
+
+class EventBus:
+    """
+    Fan-out of application events to any number of stream subscribers.
+
+    ``publish`` never blocks: each subscriber has a bounded queue and a
+    subscriber that falls too far behind is dropped (its browser reconnects
+    and resumes). Recent events are kept so a reconnecting EventSource can
+    resume from its ``Last-Event-ID`` without missing transitions.
+    """
+
+    def __init__(self, history_size: int = 200, subscriber_queue_size: int = 500):
+        """
+        Initialize bus.
+
+        Args:
+            history_size: Number of recent events kept for resuming streams
+            subscriber_queue_size: Pending events per subscriber before it is dropped
+        """
+        self.subscriber_queue_size = subscriber_queue_size
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def publish(self, event_type: str, data: Any) -> None:
+        """
+        Publish an event to all subscribers.
+
+        Args:
+            event_type: SSE event name (e.g. "voice_result", "device_status")
+            data: JSON-serializable payload
+        """
+        with self._lock:
+            event = (next(self._ids), event_type, data)
+            self._history.append(event)
+            self.published += 1
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                with self._lock:
+                    self._subscribers.discard(subscriber)
+                    self.dropped_subscribers += 1
+                log_simple("Event stream subscriber too slow, disconnecting it", "WARNING")
+
+    def listener(self, event_type: str):
+        """Callback that publishes its single argument as an event of the given type"""
+        return lambda data: self.publish(event_type, data)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> queue.Queue:
+        """
+        Register a subscriber queue.
+
+        Args:
+            last_event_id: Replay the kept events after this id into the queue
+        """
+        subscriber = queue.Queue(maxsize=self.subscriber_queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event[0] > last_event_id:
+                        subscriber.put_nowait(event)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def is_subscribed(self, subscriber: queue.Queue) -> bool:
+        """False once a subscriber was dropped for falling behind"""
+        with self._lock:
+            return subscriber in self._subscribers
+
+    def stream(self, last_event_id: Optional[int] = None, initial: Optional[Dict[str, Any]] = None,
+               keepalive: float = 15.0) -> Iterator[str]:
+        """
+        Generate an SSE stream.
+
+        Args:
+            last_event_id: Resume after this event id
+            initial: Events sent first as {event_type: data}, e.g. a state snapshot
+            keepalive: Seconds between comment lines that keep proxies from closing the stream
+
+        Yields:
+            SSE-formatted chunks
+        """
+        subscriber = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            for event_type, data in (initial or {}).items():
+                yield self.format(None, event_type, data)
+            while True:
+                try:
+                    event_id, event_type, data = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    if not self.is_subscribed(subscriber):
+                        # Dropped as too slow; the browser reconnects and resumes
+                        return
+                    yield f": keepalive {int(time.time())}\n\n"
+                    continue
+                yield self.format(event_id, event_type, data)
+        finally:
+            self.unsubscribe(subscriber)
+
+    @staticmethod
+    def format(event_id: Optional[int], event_type: str, data: Any) -> str:
+        """Format one SSE message"""
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event_type}")
+        lines.append(f"data: {json.dumps(data, default=str)}")
+        return "\n".join(lines) + "\n\n"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get subscriber and event counters"""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'dropped_subscribers': self.dropped_subscribers,
+                'history': len(self._history)
+            }
@@ -0,0 +1,62 @@
+"""
+Heartbeat Ingestion Module
+Coalesces device heartbeats so only state transitions reach the persistent store.
+"""
+
+import threading
+from typing import Dict, Any
+
+class HeartbeatCoalescer:
+    """
+    Per-MAC heartbeat debouncer.
+
+    Only the first heartbeat of a device that is not known to be online is
+    propagated downstream (status update + disk write). Every later heartbeat
+    is absorbed and only counted; the caller keeps ``last_seen`` in memory for
+    it. Call forget() whenever a device is marked offline, so its next
+    heartbeat is propagated as a transition again.
+
+    The coalescer tracks the online devices itself, so it also covers devices
+    the status cache does not hold (MACs without a configuration).
+    """
+
+    def __init__(self):
+        self._online = set()
+        self._lock = threading.Lock()
+        self.received = 0
+        self.propagated = 0
+        self.coalesced = 0
+
+    def should_propagate(self, mac_address: str) -> bool:
+        """
+        Record a heartbeat and decide whether it must be propagated.
+
+        Args:
+            mac_address: Device MAC
+
+        Returns:
+            True for the first heartbeat since the device was last marked offline, False if coalesced
+        """
+        with self._lock:
+            self.received += 1
+            if mac_address in self._online:
+                self.coalesced += 1
+                return False
+            self._online.add(mac_address)
+            self.propagated += 1
+            return True
+
+    def forget(self, mac_address: str) -> None:
+        """Drop a device after it was marked offline, so its next heartbeat propagates"""
+        with self._lock:
+            self._online.discard(mac_address)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get heartbeat ingestion counters"""
+        with self._lock:
+            return {
+                'devices': len(self._online),
+                'received': self.received,
+                'propagated': self.propagated,
+                'coalesced': self.coalesced
+            }
@@ -0,0 +1,264 @@
+"""
+IPC Module
+Calls and event streaming between HTTP worker processes and the backend service process.
+
+Uses multiprocessing.connection over a Unix socket (or local TCP port) with
+HMAC authentication, so workers hold no MQTT connections or device state of
+their own.
+"""
+
+import functools
+import os
+import queue
+import tempfile
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from .event_bus import EventBus
+from .logging import log_simple
+
+def default_address() -> str:
+    """Unix socket in a per-user directory: $XDG_RUNTIME_DIR/voice_relay, else <tmp>/voice_relay-<uid>"""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'voice_relay', 'backend.sock')
+    return os.path.join(tempfile.gettempdir(), f"voice_relay-{os.getuid()}", 'backend.sock')
+
+def parse_address(value: Optional[str] = None):
+    """
+    Backend address from a string (BACKEND_ADDRESS by default).
+
+    "host:port" selects TCP, anything else is a Unix socket path.
+    """
+    value = value or os.environ.get('BACKEND_ADDRESS') or default_address()
+    if not value.startswith('/') and ':' in value:
+        host, port = value.rsplit(':', 1)
+        return host or '127.0.0.1', int(port)
+    return value
+
+def get_authkey() -> bytes:
+    """
+    Shared secret of the IPC channel (BACKEND_AUTHKEY).
+
+    There is deliberately no default: requests are unpickled, so whoever knows
+    the key can run code in the backend process.
+    """
+    key = os.environ.get('BACKEND_AUTHKEY')
+    if not key:
+        raise RuntimeError("BACKEND_AUTHKEY is not set; generate one with "
+                           "python -c \"import secrets; print(secrets.token_hex(32))\"")
+    return key.encode()
+
+def _private_socket_dir(path: str) -> None:
+    """Create the socket's directory (0700) and refuse one other users could write to"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o022:
+        raise RuntimeError(f"Socket directory {directory} must be owned by this user and not "
+                           f"writable by group or others")
+
+class RemoteError(Exception):
+    """Error raised by the backend for a call, or the backend being unreachable"""
+
+class IPCServer:
+    """
+    Serves a whitelist of methods of one service object.
+
+    Every client connection gets its own thread. A connection either makes
+    any number of ("call", name, args, kwargs) requests, each answered with
+    ("ok", value) or ("error", message), or turns into an event stream with
+    ("events", last_event_id, keepalive).
+    """
+
+    def __init__(self, service: Any, methods: Iterable[str], address=None, authkey: Optional[bytes] = None,
+                 event_bus: Optional[EventBus] = None,
+                 initial_events: Optional[Callable[[], Dict[str, Any]]] = None):
+        """
+        Initialize server.
+
+        Args:
+            service: Object whose methods are called
+            methods: Names of the methods clients may call
+            address: Unix socket path or (host, port); parse_address() if None
+            authkey: Shared secret; get_authkey() if None
+            event_bus: Bus streamed to "events" connections
+            initial_events: Returns {event_type: data} sent first on every event stream
+        """
+        self.service = service
+        self.methods = frozenset(methods)
+        self.address = address or parse_address()
+        self.authkey = authkey or get_authkey()
+        self.event_bus = event_bus
+        self.initial_events = initial_events
+        self.running = False
+        self._listener = None
+        self._thread = None
+
+    def start(self) -> None:
+        """Listen and accept connections in a background thread"""
+        if isinstance(self.address, str):
+            _private_socket_dir(self.address)
+            if os.path.exists(self.address):
+                # Left over from a previous run
+                os.unlink(self.address)
+            # Socket created 0600: only this user may connect
+            umask = os.umask(0o177)
+            try:
+                self._listener = Listener(self.address, authkey=self.authkey)
+            finally:
+                os.umask(umask)
+        else:
+            if self.address[0] not in ('127.0.0.1', 'localhost', '::1'):
+                log_simple(f"Backend IPC listening on {self.address[0]}, reachable beyond this host", "WARNING")
+            self._listener = Listener(self.address, authkey=self.authkey)
+        self.running = True
+        self._thread = threading.Thread(target=self._accept_loop, name="ipc_server", daemon=True)
+        self._thread.start()
+        log_simple(f"Backend IPC listening on {self.address}", "INFO")
+
+    def stop(self) -> None:
+        self.running = False
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                connection = self._listener.accept()
+            except Exception as e:
+                if self.running:
+                    log_simple(f"Rejected IPC connection: {e}", "WARNING")
+                continue
+            threading.Thread(target=self._serve, args=(connection,), name="ipc_connection", daemon=True).start()
+
+    def _serve(self, connection):
+        try:
+            while True:
+                request = connection.recv()
+                if request[0] == 'events':
+                    self._stream(connection, request[1], request[2])
+                    return
+                _, name, args, kwargs = request
+                if name not in self.methods:
+                    connection.send(('error', f"Unknown backend method: {name}"))
+                    continue
+                try:
+                    reply = ('ok', getattr(self.service, name)(*args, **kwargs))
+                except Exception as e:
+                    reply = ('error', str(e))
+                connection.send(reply)
+        except (EOFError, OSError):
+            # Worker closed the connection
+            pass
+        finally:
+            connection.close()
+
+    def _stream(self, connection, last_event_id, keepalive):
+        subscriber = self.event_bus.subscribe(last_event_id)
+        try:
+            for event_type, data in (self.initial_events() if self.initial_events else {}).items():
+                connection.send((None, event_type, data))
+            while True:
+                try:
+                    event = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    if not self.event_bus.is_subscribed(subscriber):
+                        # Dropped as too slow; the browser reconnects and resumes
+                        return
+                    # Keepalive; also detects workers that went away
+                    event = None
+                connection.send(event)
+        finally:
+            self.event_bus.unsubscribe(subscriber)
+
+class IPCClient:
+    """
+    Proxy for a service served by IPCServer.
+
+    ``client.name(*args)`` calls the remote method. Each thread keeps its own
+    connection; a connection found broken (e.g. after a backend restart) is
+    reopened once.
+    """
+
+    def __init__(self, address=None, authkey: Optional[bytes] = None, timeout: float = 90.0):
+        """
+        Initialize client.
+
+        Args:
+            address: Unix socket path or (host, port); parse_address() if None
+            authkey: Shared secret; get_authkey() if None
+            timeout: Seconds to wait for a reply
+        """
+        self.address = address or parse_address()
+        self.authkey = authkey or get_authkey()
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        try:
+            return Client(self.address, authkey=self.authkey)
+        except AuthenticationError:
+            raise RemoteError(f"Backend service at {self.address} rejected BACKEND_AUTHKEY")
+        except (OSError, EOFError) as e:
+            raise RemoteError(f"Backend service not reachable at {self.address}: {e}")
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        """Call a backend method and return its result"""
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            reused = connection is not None
+            if connection is None:
+                connection = self._local.connection = self._connect()
+            try:
+                connection.send(('call', name, args, kwargs))
+                if not connection.poll(self.timeout):
+                    self._drop()
+                    raise RemoteError(f"Backend did not answer {name} within {self.timeout}s")
+                status, value = connection.recv()
+                break
+            except (EOFError, OSError):
+                self._drop()
+                if not reused or attempt:
+                    raise RemoteError("Backend service connection lost")
+        if status == 'error':
+            raise RemoteError(value)
+        return value
+
+    def close(self) -> None:
+        """Close this thread's connection"""
+        self._drop()
+
+    def _drop(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            connection.close()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return functools.partial(self.call, name)
+
+    def event_stream(self, last_event_id: Optional[int] = None, keepalive: float = 15.0) -> Iterator[str]:
+        """SSE chunks of the backend event bus, on a dedicated connection"""
+        connection = self._connect()
+        try:
+            connection.send(('events', last_event_id, keepalive))
+            yield "retry: 3000\n\n"
+            while True:
+                event = connection.recv()
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield EventBus.format(*event)
+        except (EOFError, OSError):
+            # Backend gone; the browser reconnects
+            return
+        finally:
+            connection.close()
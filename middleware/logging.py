@@ -1,76 +1,223 @@
 """
 Logging Module for Voice Relay System
 Provides centralized logging configuration and utilities.
+
+Records are handed to a queue on the calling thread and formatted/written by a
+background listener, so file and console I/O never run on MQTT, audio or
+request threads.
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
 from datetime import datetime
 from typing import Optional
 
-def setup_logging(log_level: int = logging.INFO) -> logging.Logger:
+LOGGER_NAME = 'voice_relay'
+
+LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+    "SUCCESS": logging.INFO  # Treat SUCCESS as INFO
+}
+
+_listener = None
+_setup_lock = threading.Lock()
+_sample_counts = {}
+
+class StructuredFormatter(logging.Formatter):
+    """Text formatter that appends the structured fields of log_event() as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including the structured fields of log_event()"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record as-is.
+    The stock handler formats the message on the calling thread; the queue
+    never leaves the process, so formatting is left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def setup_logging(log_level: Optional[int] = None) -> logging.Logger:
     """
     Setup logging configuration with file and console handlers.
 
+    The level defaults to the LOG_LEVEL environment variable (INFO). The log
+    file rotates at LOG_MAX_BYTES (10 MB) keeping LOG_BACKUP_COUNT (5) backups;
+    LOG_FORMAT=json writes one JSON object per line.
+
+    Processes that share a log file with their siblings (the gunicorn master
+    and workers) set LOG_PROCESS: they write voice_relay_<LOG_PROCESS>_<date>.log
+    through a WatchedFileHandler, since size rotation is only safe with a
+    single writer. That file is left to an external logrotate.
+
     Args:
         log_level: Logging level (e.g., logging.INFO, logging.DEBUG)
 
     Returns:
         Configured logger instance
     """
-    # Create logs directory if it doesn't exist
-    log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-    os.makedirs(log_dir, exist_ok=True)
+    global _listener
+
+    if log_level is None:
+        log_level = LEVELS.get(os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
 
     # Create logger
-    logger = logging.getLogger('voice_relay')
+    logger = logging.getLogger(LOGGER_NAME)
     logger.setLevel(log_level)
 
-    # Avoid duplicate handlers
-    if logger.handlers:
-        return logger
+    with _setup_lock:
+        # Avoid duplicate handlers
+        if logger.handlers:
+            return logger
+
+        # Create logs directory if it doesn't exist
+        log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
+        os.makedirs(log_dir, exist_ok=True)
 
-    # Create formatters
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+        # Create formatters
+        if os.environ.get('LOG_FORMAT', '').lower() == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = StructuredFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-    # Create file handler
-    log_file = os.path.join(log_dir, f'voice_relay_{datetime.now().strftime("%Y%m%d")}.log')
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(log_level)
-    file_handler.setFormatter(formatter)
+        date = datetime.now().strftime("%Y%m%d")
+        process = os.environ.get('LOG_PROCESS')
+        if process:
+            # Shared by several processes: append only, reopened after external rotation
+            log_file = os.path.join(log_dir, f'voice_relay_{process}_{date}.log')
+            file_handler = logging.handlers.WatchedFileHandler(log_file)
+        else:
+            # Create size-rotated file handler
+            log_file = os.path.join(log_dir, f'voice_relay_{date}.log')
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=_env_int('LOG_MAX_BYTES', 10 * 1024 * 1024),
+                backupCount=_env_int('LOG_BACKUP_COUNT', 5)
+            )
+        file_handler.setFormatter(formatter)
 
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(log_level)
-    console_handler.setFormatter(formatter)
+        # Create console handler
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
 
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+        # Callers only enqueue; the listener thread formats and writes
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+        _listener.start()
+        atexit.register(shutdown_logging)
 
+        logger.addHandler(_DeferredQueueHandler(log_queue))
+        logger.propagate = False
+
+    return logger
+
+def _reinit_after_fork() -> None:
+    """
+    Rebuild the queue and listener in a forked child (e.g. a gunicorn worker).
+    The child inherits the queue handler but not the listener thread, so its
+    records would pile up in a queue nobody drains.
+    """
+    global _listener, _setup_lock
+    _setup_lock = threading.Lock()
+    _listener = None
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        return
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    setup_logging(logger.level)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def _get_logger() -> logging.Logger:
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        logger = setup_logging()
     return logger
 
-def log_simple(message: str, level: str = "INFO") -> None:
+def log_simple(message: str, level: str = "INFO", *args) -> None:
     """
     Simple logging function for backward compatibility.
+    Extra positional arguments are %-merged into the message only if the
+    level is enabled, and only on the listener thread.
 
     Args:
-        message: Log message
+        message: Log message, optionally with %-style placeholders
         level: Log level string (DEBUG, INFO, WARNING, ERROR, CRITICAL, SUCCESS)
+        *args: Lazily formatted message arguments
     """
-    logger = logging.getLogger('voice_relay')
-    if not logger.handlers:
-        logger = setup_logging()
+    logger = _get_logger()
+    level_no = LEVELS.get(level.upper(), logging.INFO)
+    if logger.isEnabledFor(level_no):
+        logger.log(level_no, message, *args)
 
-    level_map = {
-        "DEBUG": logging.DEBUG,
-        "INFO": logging.INFO,
-        "WARNING": logging.WARNING,
-        "ERROR": logging.ERROR,
-        "CRITICAL": logging.CRITICAL,
-        "SUCCESS": logging.INFO  # Treat SUCCESS as INFO
-    }
+def log_event(event: str, level: str = "INFO", sample: int = 1, **fields) -> None:
+    """
+    Log a structured event.
 
-    logger.log(level_map.get(level.upper(), logging.INFO), message)
+    Args:
+        event: Event name, used as the message
+        level: Log level string
+        sample: Log only every n-th occurrence of this event (for high-frequency
+                events such as heartbeats); the count is added as ``sampled``
+        **fields: Structured fields, formatted as key=value (or JSON keys)
+    """
+    logger = _get_logger()
+    level_no = LEVELS.get(level.upper(), logging.INFO)
+    if not logger.isEnabledFor(level_no):
+        return
+    if sample > 1:
+        count = _sample_counts.get(event, 0) + 1
+        _sample_counts[event] = count
+        if count % sample:
+            return
+        fields['sampled'] = f"1/{sample}"
+    logger.log(level_no, event, extra={'fields': fields})
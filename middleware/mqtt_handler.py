@@ -3,12 +3,18 @@ MQTT Handler Module
 Provides MQTT client functionality for publishing and subscribing to topics.
 """
 
-import json
 import paho.mqtt.client as mqtt
+import random
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from typing import Optional, Callable, Any
 
 from .logging import log_simple
+from .mqtt_metrics import MQTTMetrics
+from .offline_queue import OfflineQueue
+from .payload_codec import get_codec
 
 class MQTTHandler:
     """
@@ -16,7 +22,14 @@ class MQTTHandler:
     Manages connection, publishing, and subscribing to MQTT topics.
     """
 
-    def __init__(self, broker: str = "localhost", port: int = 1884, client_id: str = "voice_relay"):
+    # Acknowledgements seen before their publish() returned, kept for matching
+    MAX_EARLY_ACKS = 1024
+
+    def __init__(self, broker: str = "localhost", port: int = 1884, client_id: str = "voice_relay",
+                 max_inflight: Optional[int] = None, publish_timeout: float = 10.0,
+                 offline_queue: Optional[OfflineQueue] = None,
+                 reconnect_min_delay: float = 0.5, reconnect_max_delay: float = 30.0,
+                 max_metric_topics: int = 256):
         """
         Initialize MQTT client.
 
@@ -24,6 +37,13 @@ class MQTTHandler:
             broker: MQTT broker address
             port: MQTT broker port
             client_id: Unique client identifier
+            max_inflight: Optional bound on unacknowledged publishes; publish_async waits for a slot
+            publish_timeout: Seconds the blocking publish() waits for the broker acknowledgement
+            offline_queue: Queue buffering publishes while disconnected; None for an
+                           in-memory default, False to fail publishes while disconnected
+            reconnect_min_delay: Lower bound of the reconnect backoff in seconds
+            reconnect_max_delay: Upper bound of the reconnect backoff in seconds
+            max_metric_topics: Maximum number of topics with individual publish metrics
         """
         self.broker = broker
         self.port = port
@@ -31,86 +51,430 @@ class MQTTHandler:
         # Use VERSION1 for better compatibility with MQTT X
         self.client = mqtt.Client(client_id=client_id, callback_api_version=mqtt.CallbackAPIVersion.VERSION1)
         self.connected = False
+        self.publish_timeout = publish_timeout
+
+        # Managed connection lifecycle
+        self.started = False
+        self.reconnect_min_delay = reconnect_min_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.state = "disconnected"
+        self.state_info = {'state': self.state, 'timestamp': time.time(), 'attempt': 0}
+        self._stopping = False
+        self._connect_attempt = 0
+        self._connected_event = threading.Event()
+        self._state_listeners = []
+
+        # Payload codecs negotiated per device (MAC) or per topic filter; JSON otherwise
+        self._device_codecs = {}
+        self._topic_codecs = []
+        self._codec_cache = {}
+
+        # Subscription registry, re-applied on every connect
+        self._subscriptions = {}
+        self._subscriptions_lock = threading.Lock()
+
+        # Publish completion tracking: mid -> Future, resolved from on_publish
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        # mid -> monotonic time of acknowledgements that arrived before registration
+        self._early_acks = OrderedDict()
+        self._inflight = threading.BoundedSemaphore(max_inflight) if max_inflight else None
+        if max_inflight:
+            self.client.max_inflight_messages_set(max_inflight)
+
+        # Publishes made while disconnected are buffered and replayed on reconnect
+        if offline_queue is None:
+            offline_queue = OfflineQueue()
+        self.offline_queue = offline_queue if offline_queue is not False else None
+        self._replay_lock = threading.Lock()
+        self._replaying = False
+
+        # Per-topic publish/receive counters and publish-to-PUBACK latency
+        self.metrics = MQTTMetrics(max_topics=max_metric_topics)
+
+        # Per-component message handlers: topic filter -> {component: callback}
+        self._handlers = {}
+        self._handlers_lock = threading.Lock()
 
         # Setup callbacks
         self.client.on_connect = self.on_connect
         self.client.on_disconnect = self.on_disconnect
+        self.client.on_connect_fail = self.on_connect_fail
         self.client.on_message = self.on_message
+        self.client.on_publish = self.on_publish
 
     def on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
-            self.connected = True
+            with self._replay_lock:
+                self.connected = True
+                if self.offline_queue is not None and len(self.offline_queue):
+                    self._replaying = True
+            self._connect_attempt = 0
+            self._connected_event.set()
             log_simple(f"Connected to MQTT broker {self.broker}:{self.port}", "SUCCESS")
+
+            # Announce ourselves and restore every registered subscription
+            self.client.publish("client/status", "online", qos=1, retain=True)
+            self._restore_subscriptions()
+            self._set_state("connected")
+
+            if self._replaying:
+                # Replay off the network thread so acknowledgements keep flowing
+                threading.Thread(target=self._replay_offline, name="mqtt_replay", daemon=True).start()
         else:
             log_simple(f"Failed to connect to MQTT broker, return code {rc}", "ERROR")
+            self._set_state("refused", error=f"return code {rc}")
 
     def on_disconnect(self, client, userdata, rc, properties=None, reasoncodes=None):
         self.connected = False
+        self._connected_event.clear()
+        if self._stopping:
+            self._set_state("disconnected")
+            return
         log_simple("Disconnected from MQTT broker", "WARNING")
+        self._schedule_reconnect(f"connection lost (rc={rc})")
+
+    def on_connect_fail(self, client, userdata):
+        """Called by paho when a (re)connection attempt could not open the socket"""
+        self._schedule_reconnect("connection attempt failed")
+
+    def _schedule_reconnect(self, reason):
+        """Pick the next jittered backoff delay and hand it to paho's reconnect loop"""
+        delay = self._backoff_delay(self._connect_attempt)
+        self._connect_attempt += 1
+        self.client.reconnect_delay_set(min_delay=delay, max_delay=delay)
+        log_simple(f"MQTT {reason}, reconnecting in {delay:.1f}s (attempt {self._connect_attempt})", "WARNING")
+        self._set_state("reconnecting", error=reason, retry_in=round(delay, 2))
+
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with full jitter"""
+        ceiling = min(self.reconnect_max_delay, self.reconnect_min_delay * (2 ** min(attempt + 1, 16)))
+        return random.uniform(self.reconnect_min_delay, max(self.reconnect_min_delay, ceiling))
+
+    def _set_state(self, state, **info):
+        """Record a connection state change and notify listeners"""
+        event = {'state': state, 'timestamp': time.time(), 'attempt': self._connect_attempt}
+        event.update(info)
+        self.state = state
+        self.state_info = event
+        for listener in list(self._state_listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                log_simple(f"Error in MQTT state listener: {e}", "ERROR")
+
+    def add_state_listener(self, callback: Callable[[dict], Any]):
+        """
+        Register a callback for connection state events.
+
+        Args:
+            callback: Called with a dict holding state ("connecting", "connected",
+                      "reconnecting", "refused", "disconnected"), timestamp, attempt
+                      and optional error/retry_in keys
+        """
+        self._state_listeners.append(callback)
+
+    def get_connection_state(self):
+        """Get the current connection state and registered subscriptions"""
+        info = dict(self.state_info)
+        info['connected'] = self.connected
+        info['subscriptions'] = sorted(self._subscriptions)
+        return info
+
+    def _restore_subscriptions(self):
+        with self._subscriptions_lock:
+            topics = list(self._subscriptions.items())
+        if not topics:
+            return
+        result = self.client.subscribe(topics)
+        if result[0] == mqtt.MQTT_ERR_SUCCESS:
+            log_simple(f"Restored {len(topics)} subscription(s)", "INFO")
+        else:
+            log_simple(f"Failed to restore subscriptions, error code: {result[0]}", "ERROR")
+
+    def on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        """Resolve the future of an acknowledged publish"""
+        with self._pending_lock:
+            future = self._pending.pop(mid, None)
+            if future is None:
+                # Either publish() has not returned the mid yet, or the message was
+                # published directly on the paho client (e.g. client/status)
+                self._early_acks[mid] = time.monotonic()
+                if len(self._early_acks) > self.MAX_EARLY_ACKS:
+                    self._early_acks.popitem(last=False)
+        if future is not None:
+            self._complete(future, True)
+
+    def _complete(self, future, success):
+        if self._inflight is not None:
+            self._inflight.release()
+        future.set_result(success)
 
     def on_message(self, client, userdata, msg):
         """Default message handler - can be overridden"""
-        log_simple(f"Received message on topic {msg.topic}: {msg.payload.decode()}", "INFO")
+        log_simple("Received message on topic %s: %r", "DEBUG", msg.topic, msg.payload)
+
+    def connect(self, timeout: float = 10.0):
+        """
+        Start the managed connection and wait up to timeout for it to come up.
+        If the broker is unreachable, paho keeps retrying in the background with
+        jittered exponential backoff; subscriptions are restored on every connect.
+        """
+        if self.started:
+            return self._connected_event.wait(timeout) if timeout else self.connected
 
-    def connect(self):
-        """Connect to MQTT broker"""
         try:
+            self._stopping = False
             # Set additional connection options for better compatibility
             self.client.will_set("client/status", "offline", qos=1, retain=True)
-            self.client.connect(self.broker, self.port, keepalive=30)  # Reduced keepalive for compatibility
+            self.client.reconnect_delay_set(min_delay=self.reconnect_min_delay, max_delay=self.reconnect_min_delay)
+            self.client.connect_async(self.broker, self.port, keepalive=30)  # Reduced keepalive for compatibility
             self.client.loop_start()
-
-            # Publish online status
-            if self.connected:
-                self.client.publish("client/status", "online", qos=1, retain=True)
+            self.started = True
+            self._set_state("connecting")
 
             # Wait for connection
-            timeout = 10
-            while not self.connected and timeout > 0:
-                time.sleep(0.1)
-                timeout -= 0.1
-            return self.connected
+            return self._connected_event.wait(timeout)
         except Exception as e:
             log_simple(f"Error connecting to MQTT broker: {e}", "ERROR")
             return False
 
     def disconnect(self):
-        """Disconnect from MQTT broker"""
-        if self.connected:
-            self.client.loop_stop()
+        """Disconnect from MQTT broker and stop reconnecting"""
+        if self.started:
+            self._stopping = True
             self.client.disconnect()
+            self.client.loop_stop()
+            self.started = False
             self.connected = False
+            self._connected_event.clear()
+            self._set_state("disconnected")
 
-    def publish(self, topic, payload, qos=1, retain=False):
-        """Publish message to topic with structured payload"""
-        if not self.connected:
-            log_simple("Not connected to MQTT broker", "ERROR")
+        # Nothing will acknowledge the outstanding publishes any more
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            self._complete(future, False)
+
+    def publish(self, topic, payload, qos=1, retain=False, ttl=None):
+        """
+        Publish message to topic with structured payload and wait for the broker acknowledgement.
+        Returns True when the message was acknowledged or buffered in the offline queue.
+        """
+        future = self.publish_async(topic, payload, qos=qos, retain=retain, ttl=ttl)
+
+        # Buffered for replay; nothing to wait for until the broker is back
+        if not future.done() and self.is_buffering():
+            return True
+
+        # Waiting on the network thread would block the PUBACK we are waiting for
+        if threading.current_thread() is getattr(self.client, '_thread', None):
+            return not future.done() or future.result()
+
+        try:
+            return future.result(timeout=self.publish_timeout)
+        except Exception:
+            log_simple(f"Timed out waiting for publish acknowledgement on {topic}", "ERROR")
             return False
 
+    def publish_async(self, topic, payload, qos=1, retain=False,
+                      callback: Optional[Callable[[Future], Any]] = None,
+                      timeout: Optional[float] = None, ttl: Optional[float] = None,
+                      codec=None) -> Future:
+        """
+        Publish without waiting for the broker acknowledgement.
+        While disconnected the message is buffered in the offline queue and
+        replayed in order on reconnect.
+
+        Args:
+            topic: Topic to publish to
+            payload: dict (sent as JSON), str or other value (sent as str)
+            qos: Quality of service level
+            retain: Retain flag
+            callback: Optional done-callback, called with the future once it resolves
+            timeout: Seconds to wait for an in-flight slot when max_inflight is set
+            ttl: Seconds a buffered message stays valid for replay (offline queue default if None)
+            codec: Codec for dict/list payloads, overriding the one negotiated for the topic
+
+        Returns:
+            Future resolving to True when the publish is acknowledged, False on failure
+        """
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+
         try:
-            # Ensure payload is JSON string
-            if isinstance(payload, dict):
-                payload = json.dumps(payload)
-            elif not isinstance(payload, str):
+            # Structured payloads use the negotiated codec (JSON unless configured)
+            if isinstance(payload, (dict, list)):
+                payload = (codec or self.codec_for(topic)).encode(payload)
+            elif not isinstance(payload, (str, bytes, bytearray)):
                 payload = str(payload)
+        except Exception as e:
+            log_simple(f"Error encoding payload for {topic}: {e}", "ERROR")
+            self.metrics.record_result(topic, False)
+            future.set_result(False)
+            return future
+
+        with self._replay_lock:
+            if self.is_buffering():
+                return self._buffer(topic, payload, qos, retain, ttl, future)
 
+        self._send(topic, payload, qos, retain, future, timeout, ttl)
+        return future
+
+    def is_buffering(self):
+        """Whether new publishes must go to the offline queue (disconnected or replay running)"""
+        return self.offline_queue is not None and (not self.connected or self._replaying)
+
+    def _buffer(self, topic, payload, qos, retain, ttl, future):
+        self.offline_queue.put(topic, payload, qos, retain, ttl, future)
+        self.metrics.record_buffered(topic)
+        log_simple(f"Not connected, queued message to {topic} for replay", "WARNING")
+        return future
+
+    def _send(self, topic, payload, qos, retain, future, timeout=None, ttl=None):
+        """Hand an encoded message to paho and track its acknowledgement"""
+        if not self.connected and self.offline_queue is None:
+            log_simple("Not connected to MQTT broker", "ERROR")
+            self.metrics.record_result(topic, False)
+            future.set_result(False)
+            return
+
+        if self._inflight is not None and not self._inflight.acquire(timeout=timeout):
+            log_simple(f"Publish window full, dropping message to {topic}", "ERROR")
+            self.metrics.record_result(topic, False)
+            future.set_result(False)
+            return
+
+        started = time.perf_counter()
+        sent_at = time.monotonic()
+        try:
             result = self.client.publish(topic, payload, qos=qos, retain=retain)
-            result.wait_for_publish()
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                log_simple(f"Published to {topic}: {payload}", "INFO")
-                return True
-            else:
-                log_simple(f"Failed to publish to {topic}, error code: {result.rc}", "ERROR")
-                return False
         except Exception as e:
             log_simple(f"Error publishing to {topic}: {e}", "ERROR")
-            return False
+            self.metrics.record_result(topic, False)
+            self._complete(future, False)
+            return
+
+        if result.rc == mqtt.MQTT_ERR_NO_CONN and qos == 0 and self.offline_queue is not None:
+            # Connection dropped before on_disconnect ran; paho does not keep QoS 0 messages
+            if self._inflight is not None:
+                self._inflight.release()
+            self._buffer(topic, payload, qos, retain, ttl, future)
+            return
+
+        if result.rc == mqtt.MQTT_ERR_NO_CONN and qos > 0:
+            # Connection dropped before on_disconnect ran; paho keeps the message and
+            # resends it after the reconnect (without the offline queue's TTL), so only
+            # its acknowledgement is awaited
+            log_simple("Connection lost, %s will be sent on reconnect", "DEBUG", topic)
+        elif result.rc != mqtt.MQTT_ERR_SUCCESS:
+            log_simple(f"Failed to publish to {topic}, error code: {result.rc}", "ERROR")
+            self.metrics.record_result(topic, False)
+            self._complete(future, False)
+            return
+        else:
+            log_simple("Published to %s: %s", "DEBUG", topic, payload)
+
+        self.metrics.record_publish(topic, self._payload_size(payload))
+        future.add_done_callback(
+            lambda done: self.metrics.record_result(topic, done.result(), (time.perf_counter() - started) * 1000))
+
+        # The acknowledgement can be handled on the network thread before publish()
+        # returns; only one recorded after this publish started can belong to it, an
+        # older one is left over from a message that had the same mid before it wrapped
+        with self._pending_lock:
+            acked_at = self._early_acks.pop(result.mid, None)
+            acked = acked_at is not None and acked_at >= sent_at
+            if not acked:
+                self._pending[result.mid] = future
+        if acked:
+            self._complete(future, True)
+
+    @staticmethod
+    def _payload_size(payload):
+        if isinstance(payload, str):
+            return len(payload) if payload.isascii() else len(payload.encode())
+        return len(payload)
+
+    def get_metrics(self):
+        """
+        Get publish/receive counters and latency histograms per topic,
+        plus in-flight and offline queue depth.
+        """
+        snapshot = self.metrics.snapshot()
+        with self._pending_lock:
+            snapshot['inflight'] = len(self._pending)
+        snapshot['offline_queue'] = self.offline_queue.get_stats() if self.offline_queue is not None else None
+        snapshot['connected'] = self.connected
+        return snapshot
+
+    def _replay_offline(self):
+        """Drain the offline queue in order after a reconnect"""
+        replayed = 0
+        while True:
+            with self._replay_lock:
+                batch = self.offline_queue.drain()
+                if not batch or not self.connected:
+                    self._replaying = False
+                    if batch:
+                        # Lost the connection again; put the batch back in order
+                        for entry, future in batch:
+                            self.offline_queue.put(entry['topic'], entry['payload'], entry['qos'],
+                                                   entry['retain'], entry['ttl'], future)
+                    break
+
+            for entry, future in batch:
+                self._send(entry['topic'], entry['payload'], entry['qos'], entry['retain'],
+                           future or Future(), ttl=entry['ttl'])
+                replayed += 1
+
+        if replayed:
+            log_simple(f"Replayed {replayed} buffered message(s)", "INFO")
+
+    def set_codec(self, codec, topic=None, device=None):
+        """
+        Negotiate a payload codec for a device or a topic filter.
+
+        Args:
+            codec: Codec instance or name ("json", "msgpack", "cbor")
+            topic: Topic filter the codec applies to (wildcards allowed)
+            device: Device MAC the codec applies to
+        """
+        if isinstance(codec, str):
+            codec = get_codec(codec)
+        if device:
+            self._device_codecs[device.lower()] = codec
+        if topic:
+            self._topic_codecs = [(f, c) for f, c in self._topic_codecs if f != topic] + [(topic, codec)]
+            self._codec_cache = {}
+
+    def codec_for(self, topic, device=None):
+        """Resolve the codec for a publish: device setting, then topic filter, then JSON"""
+        if device:
+            codec = self._device_codecs.get(device.lower())
+            if codec is not None:
+                return codec
+
+        codec = self._codec_cache.get(topic)
+        if codec is None:
+            codec = next((c for f, c in self._topic_codecs if mqtt.topic_matches_sub(f, topic)), None)
+            codec = self._codec_cache[topic] = codec or get_codec()
+        return codec
 
     def subscribe(self, topic, qos=1):
-        """Subscribe to topic"""
+        """
+        Subscribe to topic.
+        The subscription is registered and re-applied on every (re)connect, so it
+        can also be made before the broker is reachable.
+        """
+        with self._subscriptions_lock:
+            self._subscriptions[topic] = qos
+
         if not self.connected:
-            log_simple("Not connected to MQTT broker", "ERROR")
-            return False
+            log_simple(f"Not connected to MQTT broker, {topic} will be subscribed on connect", "WARNING")
+            return True
 
         try:
             result = self.client.subscribe(topic, qos)
@@ -126,9 +490,11 @@ class MQTTHandler:
 
     def unsubscribe(self, topic):
         """Unsubscribe from topic"""
+        with self._subscriptions_lock:
+            self._subscriptions.pop(topic, None)
+
         if not self.connected:
-            log_simple("Not connected to MQTT broker", "ERROR")
-            return False
+            return True
 
         try:
             result = self.client.unsubscribe(topic)
@@ -141,3 +507,51 @@ class MQTTHandler:
         except Exception as e:
             log_simple(f"Error unsubscribing from {topic}: {e}", "ERROR")
             return False
+
+    def add_handler(self, topic, callback, component="default", qos=1):
+        """
+        Register a component's message handler for a topic filter and subscribe to it.
+        Several components can register the same filter; each of them receives the message.
+
+        Args:
+            topic: Topic filter, MQTT wildcards allowed
+            callback: paho-style callback(client, userdata, msg)
+            component: Name of the registering component
+            qos: Subscription QoS
+        """
+        with self._handlers_lock:
+            callbacks = self._handlers.get(topic)
+            first = callbacks is None
+            if first:
+                callbacks = self._handlers[topic] = {}
+            callbacks[component] = callback
+
+        if first:
+            self.client.message_callback_add(topic, self._make_dispatcher(topic))
+        return self.subscribe(topic, qos)
+
+    def remove_handlers(self, component):
+        """Remove all handlers registered by a component, unsubscribing filters nobody uses any more"""
+        unused = []
+        with self._handlers_lock:
+            for topic, callbacks in list(self._handlers.items()):
+                if callbacks.pop(component, None) is not None and not callbacks:
+                    del self._handlers[topic]
+                    unused.append(topic)
+
+        for topic in unused:
+            self.client.message_callback_remove(topic)
+            self.unsubscribe(topic)
+
+    def _make_dispatcher(self, topic):
+        def dispatch(client, userdata, msg):
+            # Counted per subscription filter, not per concrete (e.g. per-device) topic
+            self.metrics.record_received(topic, len(msg.payload))
+            with self._handlers_lock:
+                callbacks = list(self._handlers.get(topic, {}).items())
+            for component, callback in callbacks:
+                try:
+                    callback(client, userdata, msg)
+                except Exception as e:
+                    log_simple(f"Error in {component} handler for {msg.topic}: {e}", "ERROR")
+        return dispatch
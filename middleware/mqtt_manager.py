@@ -0,0 +1,91 @@
+"""
+MQTT Connection Manager Module
+Shares one MQTT connection between all in-process components.
+"""
+
+import threading
+from typing import Optional
+
+from .mqtt_handler import MQTTHandler
+from .offline_queue import OfflineQueue
+from .logging import log_simple
+
+class MQTTConnectionManager:
+    """
+    Owns a single MQTTHandler used by several components.
+    The connection is opened by the first component that acquires it and
+    closed when the last one releases it.
+    """
+
+    def __init__(self, broker: str = "localhost", port: int = 1884, client_id: str = "voice_relay",
+                 offline_queue_path: Optional[str] = None):
+        """
+        Initialize connection manager.
+
+        Args:
+            broker: MQTT broker address
+            port: MQTT broker port
+            client_id: Client identifier of the shared connection
+            offline_queue_path: Optional file persisting publishes buffered while disconnected
+        """
+        offline_queue = OfflineQueue(path=offline_queue_path) if offline_queue_path else None
+        self.handler = MQTTHandler(broker=broker, port=port, client_id=client_id, offline_queue=offline_queue)
+        self._components = set()
+        self._lock = threading.Lock()
+
+    def acquire(self, component: str) -> bool:
+        """
+        Register a component as a user of the connection, starting it if needed.
+        Handlers can be registered even when this returns False; they become
+        active once the background reconnect succeeds.
+
+        Args:
+            component: Component name, also used for handler registration
+
+        Returns:
+            True if the shared connection is up
+        """
+        with self._lock:
+            self._components.add(component)
+            if self.handler.started:
+                # Already connected or reconnecting in the background
+                return self.handler.connected
+            connected = self.handler.connect()
+        if connected:
+            log_simple(f"Component '{component}' using shared MQTT connection {self.handler.client_id}", "INFO")
+        return connected
+
+    def release(self, component: str) -> None:
+        """
+        Remove a component's handlers and disconnect once no component uses the connection.
+
+        Args:
+            component: Component name passed to acquire()
+        """
+        self.handler.remove_handlers(component)
+        with self._lock:
+            self._components.discard(component)
+            if self._components:
+                return
+            self.handler.disconnect()
+
+    @property
+    def components(self):
+        """Names of components currently using the connection"""
+        with self._lock:
+            return sorted(self._components)
+
+_shared_manager = None
+_shared_lock = threading.Lock()
+
+def get_connection_manager(broker: str = "localhost", port: int = 1884, client_id: str = "voice_relay",
+                           offline_queue_path: Optional[str] = None) -> MQTTConnectionManager:
+    """
+    Get the process-wide connection manager, creating it on first use.
+    Arguments only apply to the first call.
+    """
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = MQTTConnectionManager(broker, port, client_id, offline_queue_path)
+        return _shared_manager
@@ -0,0 +1,177 @@
+"""
+MQTT Metrics Module
+Per-topic publish counters and publish-to-acknowledgement latency histograms.
+"""
+
+import bisect
+import threading
+from typing import Dict, Any, Optional
+
+# Upper bucket bounds in milliseconds; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+OTHER_TOPICS = "_other"
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; recording is a bisect and two additions"""
+
+    __slots__ = ('counts', 'total', 'sum_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)] += 1
+        self.total += 1
+        self.sum_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of samples (max for the last bucket)"""
+        if not self.total:
+            return None
+        rank = fraction * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 3)
+        return round(self.max_ms, 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            'count': self.total,
+            'avg_ms': round(self.sum_ms / self.total, 3) if self.total else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': buckets
+        }
+
+class TopicStats:
+    """Counters of one topic"""
+
+    __slots__ = ('published', 'acked', 'failed', 'buffered', 'bytes_out',
+                 'received', 'bytes_in', 'latency')
+
+    def __init__(self):
+        self.published = 0
+        self.acked = 0
+        self.failed = 0
+        self.buffered = 0
+        self.bytes_out = 0
+        self.received = 0
+        self.bytes_in = 0
+        self.latency = LatencyHistogram()
+
+    def merge(self, other: "TopicStats") -> None:
+        for name in self.__slots__[:-1]:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.latency.merge(other.latency)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'published': self.published,
+            'acked': self.acked,
+            'failed': self.failed,
+            'buffered': self.buffered,
+            'bytes_out': self.bytes_out,
+            'received': self.received,
+            'bytes_in': self.bytes_in,
+            'latency': self.latency.snapshot()
+        }
+
+class MQTTMetrics:
+    """
+    Per-topic MQTT counters.
+
+    Every recording takes one short lock and touches a handful of integers, so
+    the metrics can stay on in production. The number of tracked topics is
+    capped; further topics are counted under ``_other`` so per-device topics
+    cannot grow the table without bound.
+    """
+
+    def __init__(self, max_topics: int = 256):
+        """
+        Initialize metrics.
+
+        Args:
+            max_topics: Maximum number of individually tracked topics
+        """
+        self.max_topics = max_topics
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, topic):
+        stats = self._topics.get(topic)
+        if stats is None:
+            if len(self._topics) >= self.max_topics:
+                topic = OTHER_TOPICS
+                stats = self._topics.get(topic)
+            if stats is None:
+                stats = self._topics[topic] = TopicStats()
+        return stats
+
+    def record_publish(self, topic: str, size: int) -> None:
+        """A message was handed to the client library"""
+        with self._lock:
+            stats = self._stats(topic)
+            stats.published += 1
+            stats.bytes_out += size
+
+    def record_result(self, topic: str, success: bool, latency_ms: Optional[float] = None) -> None:
+        """A publish was acknowledged (with its publish-to-ack latency) or failed"""
+        with self._lock:
+            stats = self._stats(topic)
+            if success:
+                stats.acked += 1
+                if latency_ms is not None:
+                    stats.latency.record(latency_ms)
+            else:
+                stats.failed += 1
+
+    def record_buffered(self, topic: str) -> None:
+        """A publish went to the offline queue"""
+        with self._lock:
+            self._stats(topic).buffered += 1
+
+    def record_received(self, topic: str, size: int) -> None:
+        """A message was received"""
+        with self._lock:
+            stats = self._stats(topic)
+            stats.received += 1
+            stats.bytes_in += size
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get totals and per-topic counters with latency percentiles"""
+        totals = TopicStats()
+        with self._lock:
+            topics = {}
+            for topic, stats in self._topics.items():
+                totals.merge(stats)
+                topics[topic] = stats.snapshot()
+        return {
+            'totals': totals.snapshot(),
+            'topics': topics,
+            'tracked_topics': len(topics),
+            'max_topics': self.max_topics
+        }
+
+    def reset(self) -> None:
+        """Clear all counters"""
+        with self._lock:
+            self._topics = {}
@@ -0,0 +1,194 @@
+"""
+Noise Floor Module
+Provides continuous ambient-noise calibration for the speech recognizer.
+"""
+
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Callable, Optional, Dict, Any
+
+try:
+    import audioop
+except ImportError:  # Python 3.13+ without the audioop-lts backport
+    audioop = None
+
+from .logging import log_simple
+
+def frame_energy(buffer: bytes, sample_width: int) -> float:
+    """
+    Compute the RMS energy of a raw PCM frame.
+
+    Args:
+        buffer: Raw audio bytes as read from the microphone stream
+        sample_width: Bytes per sample (1, 2 or 4)
+
+    Returns:
+        RMS energy, on the same scale as ``audioop.rms``
+    """
+    if audioop is not None:
+        return audioop.rms(buffer, sample_width)
+
+    typecode = {1: 'b', 2: 'h', 4: 'i'}.get(sample_width)
+    if typecode is None or not buffer:
+        return 0.0
+    samples = array(typecode)
+    samples.frombytes(buffer[:len(buffer) - (len(buffer) % sample_width)])
+    if not samples:
+        return 0.0
+    return (sum(s * s for s in samples) / len(samples)) ** 0.5
+
+class NoiseFloorEstimator:
+    """
+    Rolling noise-floor estimator that keeps a recognizer's energy threshold
+    in step with the room.
+
+    Frames below the current threshold are treated as non-speech and feed a
+    rolling window; the threshold is re-derived from the window median at a
+    fixed interval. Sustained loud audio (longer than any spoken phrase) is
+    treated as a new noise level so the threshold can also move upwards.
+    """
+
+    def __init__(self, recognizer=None, window_seconds: float = 3.0,
+                 update_interval: float = 0.5, ratio: Optional[float] = None,
+                 min_threshold: float = 50.0, max_threshold: float = 4000.0,
+                 sustained_seconds: float = 8.0, history_size: int = 120):
+        """
+        Initialize the estimator.
+
+        Args:
+            recognizer: ``speech_recognition.Recognizer`` whose ``energy_threshold`` is updated
+            window_seconds: Amount of non-speech audio kept in the rolling window
+            update_interval: Seconds between threshold updates
+            ratio: Threshold/noise-floor ratio (defaults to the recognizer's ``dynamic_energy_ratio``)
+            min_threshold: Lower bound for the computed threshold
+            max_threshold: Upper bound for the computed threshold
+            sustained_seconds: Loud audio lasting longer than this is treated as noise
+            history_size: Number of threshold updates kept for diagnostics
+        """
+        self.recognizer = recognizer
+        self.window_seconds = window_seconds
+        self.update_interval = update_interval
+        self.ratio = ratio if ratio is not None else getattr(recognizer, 'dynamic_energy_ratio', 1.5)
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.sustained_seconds = sustained_seconds
+
+        self._lock = threading.Lock()
+        self._energies = deque()
+        self._window_frames = None
+        self._loud_run = []
+        self._loud_seconds = 0.0
+        self._last_update = 0.0
+        self.noise_floor = 0.0
+        self.threshold = float(getattr(recognizer, 'energy_threshold', min_threshold))
+        self.frames_seen = 0
+        self.frames_used = 0
+        self.history = deque(maxlen=history_size)
+
+    def feed(self, buffer: bytes, sample_width: int, seconds_per_buffer: float) -> None:
+        """
+        Feed one raw audio frame into the estimator.
+
+        Args:
+            buffer: Raw audio bytes
+            sample_width: Bytes per sample
+            seconds_per_buffer: Duration of the frame in seconds
+        """
+        energy = frame_energy(buffer, sample_width)
+        with self._lock:
+            if self._window_frames is None:
+                self._window_frames = max(1, int(self.window_seconds / seconds_per_buffer))
+            self.frames_seen += 1
+
+            if energy <= self.threshold:
+                self._loud_run.clear()
+                self._loud_seconds = 0.0
+                self._add_energy(energy)
+            else:
+                # Speech candidate; only adopt it as noise once it outlasts any phrase
+                self._loud_run.append(energy)
+                self._loud_seconds += seconds_per_buffer
+                if self._loud_seconds >= self.sustained_seconds:
+                    for loud in self._loud_run:
+                        self._add_energy(loud)
+                    self._loud_run.clear()
+                    self._loud_seconds = 0.0
+
+            now = time.monotonic()
+            if now - self._last_update >= self.update_interval and self._energies:
+                self._last_update = now
+                self._update_threshold()
+
+    def _add_energy(self, energy: float) -> None:
+        self._energies.append(energy)
+        self.frames_used += 1
+        while len(self._energies) > self._window_frames:
+            self._energies.popleft()
+
+    def _update_threshold(self) -> None:
+        ordered = sorted(self._energies)
+        self.noise_floor = ordered[len(ordered) // 2]
+        threshold = min(self.max_threshold, max(self.min_threshold, self.noise_floor * self.ratio))
+        self.threshold = threshold
+        if self.recognizer is not None:
+            self.recognizer.energy_threshold = threshold
+        self.history.append({
+            'timestamp': time.time(),
+            'noise_floor': round(self.noise_floor, 1),
+            'threshold': round(threshold, 1)
+        })
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current threshold, noise floor and update history for diagnostics"""
+        with self._lock:
+            return {
+                'threshold': round(self.threshold, 1),
+                'noise_floor': round(self.noise_floor, 1),
+                'ratio': self.ratio,
+                'frames_seen': self.frames_seen,
+                'frames_used': self.frames_used,
+                'history': list(self.history)
+            }
+
+class TappedAudioStream:
+    """
+    Wraps a microphone stream and passes every frame read by the recognizer
+    to a tap callback, so calibration runs on the same audio without pausing
+    listening.
+    """
+
+    def __init__(self, stream, tap: Callable[[bytes], None]):
+        self._stream = stream
+        self._tap = tap
+
+    def read(self, size):
+        buffer = self._stream.read(size)
+        try:
+            self._tap(buffer)
+        except Exception as e:
+            log_simple(f"Noise floor tap error: {e}", "ERROR")
+        return buffer
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def attach_noise_estimator(source, estimator: NoiseFloorEstimator) -> None:
+    """
+    Attach an estimator to an entered ``speech_recognition`` audio source.
+
+    Args:
+        source: Audio source inside its ``with`` block
+        estimator: Estimator to feed with every frame read from the source
+    """
+    if estimator.recognizer is not None:
+        # Start from whatever the initial calibration produced
+        estimator.threshold = float(estimator.recognizer.energy_threshold)
+
+    seconds_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+    sample_width = source.SAMPLE_WIDTH
+    source.stream = TappedAudioStream(
+        source.stream,
+        lambda buffer: estimator.feed(buffer, sample_width, seconds_per_buffer)
+    )
@@ -0,0 +1,175 @@
+"""
+Offline Queue Module
+Buffers outbound MQTT messages while the broker is unreachable.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any
+
+from .logging import log_simple
+
+class OfflineQueue:
+    """
+    Bounded FIFO of publishes made while disconnected.
+
+    Entries carry a TTL so stale actuations are dropped instead of replayed.
+    With a ``path`` the queue is mirrored to a JSON-lines file and reloaded on
+    start, so buffered messages also survive a process restart.
+    """
+
+    def __init__(self, max_size: int = 1000, default_ttl: Optional[float] = 30.0, path: Optional[str] = None):
+        """
+        Initialize queue.
+
+        Args:
+            max_size: Maximum number of buffered messages; the oldest is dropped when full
+            default_ttl: Seconds a message stays valid when no TTL is given (None = forever)
+            path: Optional JSON-lines file used to persist the queue
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.path = path
+        self._entries = deque()
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.replayed = 0
+        self.expired = 0
+        self.overflowed = 0
+
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, topic: str, payload: str, qos: int = 1, retain: bool = False,
+            ttl: Optional[float] = None, future=None) -> None:
+        """
+        Buffer a message.
+
+        Args:
+            topic: Topic to publish to
+            payload: Encoded payload
+            qos: Quality of service level
+            retain: Retain flag
+            ttl: Seconds the message stays valid, defaults to default_ttl
+            future: Optional Future resolved when the message is replayed or dropped
+        """
+        entry = {
+            'topic': topic,
+            'payload': payload,
+            'qos': qos,
+            'retain': retain,
+            'created': time.time(),
+            'ttl': ttl if ttl is not None else self.default_ttl
+        }
+        dropped = None
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                dropped = self._entries.popleft()
+                self.overflowed += 1
+            self._entries.append((entry, future))
+            self.enqueued += 1
+            if self.path:
+                if dropped:
+                    self._rewrite()
+                else:
+                    self._append(entry)
+
+        if dropped:
+            log_simple(f"Offline queue full, dropped oldest message to {dropped[0]['topic']}", "WARNING")
+            if dropped[1] is not None:
+                dropped[1].set_result(False)
+
+    def drain(self) -> List[tuple]:
+        """
+        Take all buffered messages, oldest first, discarding expired ones.
+
+        Returns:
+            List of (entry, future) tuples still valid for replay
+        """
+        now = time.time()
+        valid, expired = [], []
+        with self._lock:
+            while self._entries:
+                entry, future = self._entries.popleft()
+                ttl = entry.get('ttl')
+                if ttl is not None and now - entry['created'] > ttl:
+                    expired.append((entry, future))
+                else:
+                    valid.append((entry, future))
+            self.expired += len(expired)
+            self.replayed += len(valid)
+            if self.path:
+                self._rewrite()
+
+        for entry, future in expired:
+            log_simple(f"Dropping expired offline message to {entry['topic']}", "WARNING")
+            if future is not None:
+                future.set_result(False)
+        return valid
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and counters"""
+        with self._lock:
+            return {
+                'depth': len(self._entries),
+                'max_size': self.max_size,
+                'enqueued': self.enqueued,
+                'replayed': self.replayed,
+                'expired': self.expired,
+                'overflowed': self.overflowed,
+                'persistent': bool(self.path)
+            }
+
+    def _append(self, entry):
+        try:
+            with open(self.path, 'a') as f:
+                f.write(self._serialize(entry))
+        except OSError as e:
+            log_simple(f"Error persisting offline queue: {e}", "ERROR")
+
+    @staticmethod
+    def _serialize(entry):
+        """One JSON line per entry; binary payloads are stored base64-encoded"""
+        if isinstance(entry['payload'], (bytes, bytearray)):
+            entry = dict(entry, payload=base64.b64encode(entry['payload']).decode(), binary=True)
+        return json.dumps(entry) + '\n'
+
+    @staticmethod
+    def _deserialize(line):
+        entry = json.loads(line)
+        if entry.pop('binary', False):
+            entry['payload'] = base64.b64decode(entry['payload'])
+        return entry
+
+    def _rewrite(self):
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                for entry, _ in self._entries:
+                    f.write(self._serialize(entry))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log_simple(f"Error persisting offline queue: {e}", "ERROR")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._entries.append((self._deserialize(line), None))
+            while len(self._entries) > self.max_size:
+                self._entries.popleft()
+            if self._entries:
+                log_simple(f"Loaded {len(self._entries)} buffered message(s) from {self.path}", "INFO")
+        except (OSError, ValueError) as e:
+            log_simple(f"Error loading offline queue: {e}", "ERROR")
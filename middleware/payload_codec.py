@@ -0,0 +1,193 @@
+"""
+Payload Codec Module
+Pluggable payload encodings (JSON, MessagePack, CBOR) and precomputed command templates.
+"""
+
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+class JsonCodec:
+    """JSON text encoding (the default, readable by MQTT X and the existing firmware)"""
+
+    name = "json"
+
+    def encode(self, obj: Any) -> str:
+        return json.dumps(obj)
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data.decode() if isinstance(data, (bytes, bytearray)) else data)
+
+    def map_start(self, size: int) -> str:
+        return "{"
+
+    def map_entry(self, key: str, value: Any, first: bool = False) -> str:
+        return ("" if first else ", ") + json.dumps(key) + ": " + json.dumps(value)
+
+    def map_end(self) -> str:
+        return "}"
+
+class MsgPackCodec:
+    """MessagePack binary encoding (requires the msgpack package)"""
+
+    name = "msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("msgpack is not installed; pip install msgpack")
+
+    def encode(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+    def map_start(self, size: int) -> bytes:
+        if size < 16:
+            return bytes([0x80 | size])
+        return b"\xde" + size.to_bytes(2, "big")
+
+    def map_entry(self, key: str, value: Any, first: bool = False) -> bytes:
+        return self.encode(key) + self.encode(value)
+
+    def map_end(self) -> bytes:
+        return b""
+
+class CborCodec:
+    """CBOR binary encoding (requires the cbor2 package)"""
+
+    name = "cbor"
+
+    def __init__(self):
+        if cbor2 is None:
+            raise ImportError("cbor2 is not installed; pip install cbor2")
+
+    def encode(self, obj: Any) -> bytes:
+        return cbor2.dumps(obj)
+
+    def decode(self, data: bytes) -> Any:
+        return cbor2.loads(data)
+
+    def map_start(self, size: int) -> bytes:
+        if size < 24:
+            return bytes([0xa0 | size])
+        return bytes([0xb8, size])
+
+    def map_entry(self, key: str, value: Any, first: bool = False) -> bytes:
+        return self.encode(key) + self.encode(value)
+
+    def map_end(self) -> bytes:
+        return b""
+
+CODECS = {
+    "json": JsonCodec,
+    "msgpack": MsgPackCodec,
+    "cbor": CborCodec
+}
+
+_instances = {}
+
+def get_codec(name: Optional[str] = None):
+    """
+    Get a codec instance by name.
+
+    Args:
+        name: "json", "msgpack" or "cbor"; None selects JSON
+
+    Raises:
+        ValueError: Unknown codec name
+        ImportError: Codec library not installed
+    """
+    name = (name or "json").lower()
+    codec = _instances.get(name)
+    if codec is None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown payload codec: {name}")
+        codec = _instances[name] = CODECS[name]()
+    return codec
+
+_timestamp_cache = [0, ""]
+
+def current_timestamp() -> str:
+    """Local "YYYY-mm-dd HH:MM:SS" timestamp, formatted at most once per second"""
+    now = int(time.time())
+    if now != _timestamp_cache[0]:
+        _timestamp_cache[1] = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+        _timestamp_cache[0] = now
+    return _timestamp_cache[1]
+
+class ModularCommandTemplate:
+    """
+    Pre-encoded write command for one relay configuration.
+
+    Everything except the relay data value and the timestamp is static per
+    configuration, so it is encoded once; rendering a command only joins the
+    static prefix, one of the pre-encoded value fragments and the timestamp.
+    """
+
+    def __init__(self, config: Dict[str, Any], codec=None):
+        """
+        Initialize template.
+
+        Args:
+            config: Configuration entry (mac, part_number, pin, address, device_bus)
+            codec: Payload codec, JSON if None
+        """
+        self.codec = codec or get_codec()
+        self.pin = config.get('pin', 1)
+        static = [
+            ("mac", config.get('mac', '00:00:00:00:00:00')),
+            ("protocol_type", "Modular"),
+            ("device", config.get('part_number', 'RELAY')),
+            ("function", "write"),
+            ("address", config.get('address', 0)),
+            ("device_bus", config.get('device_bus', 0))
+        ]
+        self.fields = dict(static)
+
+        codec = self.codec
+        parts = [codec.map_start(len(static) + 2)]
+        for index, (key, value) in enumerate(static):
+            parts.append(codec.map_entry(key, value, first=index == 0))
+        self._prefix = parts[0][:0].join(parts)
+        self._values = {
+            data: codec.map_entry("value", {"pin": self.pin, "data": data})
+            for data in (0, 1)
+        }
+        self._end = codec.map_end()
+
+    def render(self, data_value: int, timestamp: Optional[str] = None):
+        """
+        Encode a write command.
+
+        Args:
+            data_value: Relay data value (1 = on, 0 = off)
+            timestamp: Timestamp string, current local time if None
+
+        Returns:
+            Encoded payload (str for JSON, bytes for binary codecs)
+        """
+        value = self._values.get(data_value)
+        if value is None:
+            value = self.codec.map_entry("value", {"pin": self.pin, "data": data_value})
+        return (self._prefix + value
+                + self.codec.map_entry("Timestamp", timestamp or current_timestamp())
+                + self._end)
+
+    def as_dict(self, data_value: int, timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """Plain dict form of a command, for logging and UI display"""
+        payload = dict(self.fields)
+        payload["value"] = {"pin": self.pin, "data": data_value}
+        payload["Timestamp"] = timestamp or current_timestamp()
+        return payload
@@ -0,0 +1,175 @@
+"""
+Static Assets Module
+Fingerprinted, precompressed dashboard bundles and compression of dynamic responses.
+
+scripts/build_assets.py copies each source in ASSET_SOURCES to
+static/dist/<name>.<hash>.<ext> next to gzip (and, with the brotli package,
+brotli) variants, and records the mapping in static/dist/manifest.json. Since a
+bundle's name changes with its content, bundles are served as immutable.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .logging import log_simple
+
+# Bundle name -> source file below the static folder
+ASSET_SOURCES = {
+    'dashboard.css': 'css/dashboard.css',
+    'dashboard.js': 'js/dashboard.js',
+}
+DIST_DIR = 'dist'
+MANIFEST_FILE = 'manifest.json'
+
+# Precompressed variants, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def _write_if_changed(path: str, data: bytes) -> None:
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def build_assets(static_dir: str) -> Dict[str, str]:
+    """
+    Build the fingerprinted bundles and their compressed variants.
+
+    Args:
+        static_dir: Flask static folder
+
+    Returns:
+        Manifest {bundle name: fingerprinted file name}
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    os.makedirs(dist_dir, exist_ok=True)
+
+    manifest = {}
+    for name, source in ASSET_SOURCES.items():
+        with open(os.path.join(static_dir, source), 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(name)
+        filename = f"{stem}.{_digest(data)}{ext}"
+        path = os.path.join(dist_dir, filename)
+
+        _write_if_changed(path, data)
+        # mtime=0 keeps the gzip output identical between builds
+        _write_if_changed(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write_if_changed(path + '.br', brotli.compress(data, quality=11))
+        manifest[name] = filename
+        log_simple(f"Built {filename} ({len(data)} bytes)", "INFO")
+
+    if brotli is None:
+        log_simple("brotli not installed, built gzip variants only", "WARNING")
+
+    _write_if_changed(os.path.join(dist_dir, MANIFEST_FILE), json.dumps(manifest, indent=2).encode())
+
+    # Drop bundles of previous builds
+    current = set(manifest.values())
+    for entry in os.listdir(dist_dir):
+        base = entry
+        for _, suffix in ENCODINGS:
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+        if entry != MANIFEST_FILE and base not in current:
+            os.remove(os.path.join(dist_dir, entry))
+    return manifest
+
+class AssetManifest:
+    """
+    URLs of the dashboard bundles.
+
+    Uses the built bundles when the manifest matches the current sources;
+    otherwise (no build yet, or sources edited since) links the sources from
+    the static folder, which are served without long-lived caching.
+    """
+
+    def __init__(self, static_dir: str):
+        self.static_dir = static_dir
+        self.dist_dir = os.path.join(static_dir, DIST_DIR)
+        self.files = self._load()
+
+    def _load(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST_FILE), 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            log_simple("No static asset build found, serving unbundled sources (run scripts/build_assets.py)",
+                       "WARNING")
+            return {}
+
+        files = {}
+        for name, source in ASSET_SOURCES.items():
+            filename = manifest.get(name)
+            try:
+                with open(os.path.join(self.static_dir, source), 'rb') as f:
+                    current = f.read()
+            except OSError:
+                continue
+            stem, ext = os.path.splitext(name)
+            if filename == f"{stem}.{_digest(current)}{ext}" and os.path.exists(os.path.join(self.dist_dir, filename)):
+                files[name] = filename
+            else:
+                log_simple(f"Static asset build of {name} is stale, serving its source", "WARNING")
+        return files
+
+    def url(self, name: str, url_for) -> str:
+        """URL of a bundle, given Flask's url_for"""
+        filename = self.files.get(name)
+        if filename:
+            return url_for('api.asset', filename=filename)
+        return url_for('static', filename=ASSET_SOURCES[name])
+
+    def resolve(self, filename: str, accept_encoding) -> Optional[tuple]:
+        """
+        File to send for a bundle request.
+
+        Args:
+            filename: Fingerprinted file name
+            accept_encoding: werkzeug Accept of the request's Accept-Encoding
+
+        Returns:
+            (file name in dist dir, content encoding or None, mimetype), or None if unknown
+        """
+        if filename not in self.files.values():
+            return None
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in ENCODINGS:
+            if accept_encoding[encoding] and os.path.exists(os.path.join(self.dist_dir, filename + suffix)):
+                return filename + suffix, encoding, mimetype
+        return filename, None, mimetype
+
+def gzip_response(response, accept_encoding, min_size: int, compressible: frozenset, level: int = 6) -> None:
+    """
+    Gzip a buffered response body in place when it is worth it.
+
+    Only touches the given mimetypes; skips streamed and already encoded
+    responses, bodies below min_size and clients that do not accept gzip.
+    """
+    if response.mimetype not in compressible:
+        return
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or not accept_encoding['gzip']):
+        return
+    data = response.get_data()
+    if len(data) < min_size:
+        return
+    response.set_data(gzip.compress(data, compresslevel=level))
+    response.headers['Content-Encoding'] = 'gzip'
@@ -0,0 +1,222 @@
+"""
+Text Command Intake Module
+Feeds text commands from MQTT, a local UNIX socket and stdin into a shared queue.
+"""
+
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+from typing import Callable, Optional
+
+from .logging import log_simple
+
+_STOP = object()
+
+class TextCommandIntake:
+    """
+    Event-driven intake for text commands.
+    Every source pushes into one queue; worker threads block on it and call the handler.
+    """
+
+    def __init__(self, handler: Callable[[str, str], bool], workers: int = 2, max_queue: int = 100):
+        """
+        Initialize the intake.
+
+        Args:
+            handler: Called as handler(text, source) for every command; returns success
+            workers: Number of worker threads consuming the queue
+            max_queue: Maximum number of queued commands before new ones are dropped
+        """
+        self.handler = handler
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.running = False
+        self._threads = []
+        self._socket = None
+        self._socket_path = None
+
+    def start(self):
+        """Start worker threads"""
+        if self.running:
+            return
+        self.running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"text_intake_{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        log_simple(f"Text command intake started with {self.workers} worker(s)", "INFO")
+
+    def stop(self):
+        """Stop workers and close the socket listener"""
+        if not self.running:
+            return
+        self.running = False
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        self._threads = []
+
+        if self._socket:
+            try:
+                # shutdown() wakes the thread blocked in accept()
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+            self._socket = None
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        log_simple("Text command intake stopped", "INFO")
+
+    def submit(self, text: str, source: str = "api", reply: Optional[Callable[[bool], None]] = None) -> bool:
+        """
+        Queue a text command.
+
+        Args:
+            text: Command text
+            source: Name of the source, passed to the handler to tag the result
+            reply: Optional callback receiving the handler's result
+
+        Returns:
+            True if queued, False if not a non-empty string or the queue is full
+        """
+        if not isinstance(text, str):
+            log_simple(f"Ignoring non-text command from {source}", "WARNING")
+            return False
+        text = text.strip()
+        if not text:
+            return False
+        try:
+            self.queue.put_nowait((text, source, reply))
+            return True
+        except queue.Full:
+            log_simple(f"Text command queue full, dropping command from {source}", "WARNING")
+            return False
+
+    def _worker_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            text, source, reply = item
+            try:
+                success = self.handler(text, source)
+            except Exception as e:
+                log_simple(f"Error processing text command from {source}: {e}", "ERROR")
+                success = False
+            if reply:
+                try:
+                    reply(success)
+                except Exception as e:
+                    log_simple(f"Error replying to {source}: {e}", "WARNING")
+
+    def attach_mqtt(self, mqtt_handler, topic: str = "voice/text", component: str = "text_intake") -> bool:
+        """
+        Accept commands published to an MQTT topic.
+        Payload is either plain text or JSON {"text": ..., "input": ...}.
+
+        Args:
+            mqtt_handler: Connected MQTTHandler instance
+            topic: Topic to subscribe to
+            component: Component name the handler is registered under
+        """
+        def on_text_message(client, userdata, msg):
+            raw = msg.payload.decode(errors='replace')
+            text, source = raw, "mqtt"
+            try:
+                data = json.loads(raw)
+                if isinstance(data, dict):
+                    text = data.get('text', '')
+                    if isinstance(data.get('input'), str) and data['input']:
+                        source = data['input']
+            except ValueError:
+                pass
+            self.submit(text, source)
+
+        return mqtt_handler.add_handler(topic, on_text_message, component)
+
+    def start_unix_socket(self, path: str) -> bool:
+        """
+        Accept newline-delimited commands on a local UNIX socket.
+        Each non-blank line gets an "OK" or "FAIL" line back once processed,
+        in the order the lines were sent.
+
+        Args:
+            path: Filesystem path of the socket
+        """
+        try:
+            if os.path.exists(path):
+                os.unlink(path)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(path)
+            server.listen(8)
+        except OSError as e:
+            log_simple(f"Failed to open text command socket {path}: {e}", "ERROR")
+            return False
+
+        self._socket = server
+        self._socket_path = path
+        threading.Thread(target=self._accept_loop, args=(server,), daemon=True).start()
+        log_simple(f"Listening for text commands on {path}", "INFO")
+        return True
+
+    def _accept_loop(self, server):
+        while self.running:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        answered = threading.Condition()
+        # Workers finish out of order; results wait here until all earlier lines are answered
+        done = {}
+        next_reply = [0]
+
+        def replier(seq):
+            def reply(success):
+                with answered:
+                    done[seq] = success
+                    while next_reply[0] in done:
+                        success = done.pop(next_reply[0])
+                        next_reply[0] += 1
+                        try:
+                            conn.sendall(b"OK\n" if success else b"FAIL\n")
+                        except OSError:
+                            pass
+                    answered.notify_all()
+            return reply
+
+        with conn, conn.makefile('r', encoding='utf-8', errors='replace') as reader:
+            seq = 0
+            for line in reader:
+                if not line.strip():
+                    continue
+                reply = replier(seq)
+                seq += 1
+                if not self.submit(line, "socket", reply):
+                    reply(False)
+            # Keep the connection open until every queued line has been answered
+            with answered:
+                while self.running and not answered.wait_for(lambda: next_reply[0] == seq, timeout=1.0):
+                    pass
+
+    def start_stdin(self, stream=None):
+        """
+        Accept one command per line from stdin (or another text stream).
+
+        Args:
+            stream: Stream to read from, defaults to sys.stdin
+        """
+        stream = stream or sys.stdin
+        threading.Thread(target=self._read_stream, args=(stream,), daemon=True).start()
+        log_simple("Reading text commands from stdin", "INFO")
+
+    def _read_stream(self, stream):
+        for line in stream:
+            if not self.running:
+                break
+            self.submit(line, "stdin")
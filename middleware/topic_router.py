@@ -0,0 +1,215 @@
+"""
+Topic Router Module
+Dispatches MQTT messages from a precompiled topic table to handlers on a worker pool.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Optional, Dict, Any
+
+from .logging import log_simple
+
+_STOP = object()
+
+def last_topic_level(msg) -> str:
+    """Default ordering key: last topic level (the MAC for device/<kind>/<mac> topics)"""
+    return msg.topic.rsplit('/', 1)[-1]
+
+class RouteStats:
+    """Handler call statistics for one route"""
+
+    __slots__ = ('count', 'errors', 'total_ms', 'max_ms', 'total_wait_ms')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.total_wait_ms = 0.0
+
+    def record(self, elapsed_ms: float, wait_ms: float, failed: bool) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.total_wait_ms += wait_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        if failed:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'avg_queue_wait_ms': round(self.total_wait_ms / self.count, 3) if self.count else 0.0
+        }
+
+class TopicRouter:
+    """
+    Table-driven MQTT topic router.
+
+    Routes are compiled into a level trie supporting the ``+`` and ``#``
+    wildcards. ``dispatch`` only matches the topic and enqueues the message,
+    so it is cheap enough to run on paho's network thread; handlers run on a
+    bounded pool of workers. Messages with the same ordering key (by default
+    the MAC at the end of the topic) always go to the same worker and are
+    handled in arrival order.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 1000,
+                 key_func: Callable[[Any], str] = last_topic_level, name: str = "router"):
+        """
+        Initialize router.
+
+        Args:
+            workers: Number of worker threads
+            max_queue: Queue capacity per worker; messages are dropped when full
+            key_func: Returns the ordering key of a message
+            name: Name used for worker threads and log lines
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.key_func = key_func
+        self.name = name
+        self._trie = {}
+        self._queues = [queue.Queue(maxsize=max_queue) for _ in range(workers)]
+        self._threads = []
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self.dispatched = 0
+        self.dropped = 0
+        self.unmatched = 0
+        self.running = False
+
+    def route(self, pattern: str, handler: Callable[[Any], None], name: Optional[str] = None) -> None:
+        """
+        Register a handler for a topic filter.
+
+        Args:
+            pattern: Topic filter, MQTT wildcards allowed
+            handler: Called with the paho message on a worker thread
+            name: Route name used in metrics, defaults to the pattern
+        """
+        node = self._trie
+        for level in pattern.split('/'):
+            node = node.setdefault(level, {})
+        node[None] = (name or pattern, handler)
+        self._stats.setdefault(name or pattern, RouteStats())
+
+    def match(self, topic: str):
+        """
+        Find the route for a topic.
+        Exact levels win over ``+``, which wins over ``#``.
+
+        Returns:
+            (route_name, handler) tuple or None
+        """
+        return self._match(self._trie, topic.split('/'), 0)
+
+    def _match(self, node, levels, index):
+        if index == len(levels):
+            if None in node:
+                return node[None]
+            # "a/#" also matches "a"
+            tail = node.get('#')
+            return tail.get(None) if tail else None
+
+        level = levels[index]
+        for key in (level, '+'):
+            child = node.get(key)
+            if child is not None:
+                found = self._match(child, levels, index + 1)
+                if found:
+                    return found
+
+        tail = node.get('#')
+        if tail is not None:
+            return tail.get(None)
+        return None
+
+    def start(self) -> None:
+        """Start worker threads"""
+        if self.running:
+            return
+        self.running = True
+        for i, work_queue in enumerate(self._queues):
+            thread = threading.Thread(target=self._worker_loop, args=(work_queue,),
+                                      name=f"{self.name}_{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5) -> None:
+        """Stop worker threads after the queued messages are handled"""
+        if not self.running:
+            return
+        self.running = False
+        for work_queue in self._queues:
+            work_queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def dispatch(self, msg) -> bool:
+        """
+        Route a message to its worker queue. Never blocks.
+
+        Args:
+            msg: paho MQTTMessage (or any object with ``topic`` and ``payload``)
+
+        Returns:
+            True if the message was queued
+        """
+        route = self.match(msg.topic)
+        if route is None:
+            self.unmatched += 1
+            return False
+
+        work_queue = self._queues[hash(self.key_func(msg)) % self.workers]
+        try:
+            work_queue.put_nowait((route, msg, time.perf_counter()))
+        except queue.Full:
+            self.dropped += 1
+            log_simple(f"{self.name} queue full, dropping message on {msg.topic}", "WARNING")
+            return False
+        self.dispatched += 1
+        return True
+
+    def on_message(self, client, userdata, msg) -> None:
+        """paho-style callback wrapper around dispatch()"""
+        self.dispatch(msg)
+
+    def _worker_loop(self, work_queue):
+        while True:
+            item = work_queue.get()
+            if item is _STOP:
+                break
+            (route_name, handler), msg, queued_at = item
+            started = time.perf_counter()
+            failed = False
+            try:
+                handler(msg)
+            except Exception as e:
+                failed = True
+                log_simple(f"Error in handler '{route_name}' for {msg.topic}: {e}", "ERROR")
+            finished = time.perf_counter()
+            with self._stats_lock:
+                self._stats[route_name].record((finished - started) * 1000,
+                                               (started - queued_at) * 1000, failed)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue depths, drop counters and per-route handler latency"""
+        with self._stats_lock:
+            routes = {name: stats.snapshot() for name, stats in self._stats.items()}
+        depths = [work_queue.qsize() for work_queue in self._queues]
+        return {
+            'workers': self.workers,
+            'queue_depths': depths,
+            'queue_depth_total': sum(depths),
+            'queue_capacity': self.max_queue,
+            'dispatched': self.dispatched,
+            'dropped': self.dropped,
+            'unmatched': self.unmatched,
+            'routes': routes
+        }
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Build the fingerprinted dashboard bundles.
+
+Writes static/dist/dashboard.<hash>.css/.js with gzip (and, if the brotli
+package is installed, brotli) variants plus manifest.json. Run it after
+editing static/css or static/js; the web service links the bundles on its
+next start. gunicorn.conf.py runs the build automatically.
+
+Example:
+    python scripts/build_assets.py
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from middleware.logging import setup_logging, log_simple
+from middleware.static_assets import build_assets
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--static-dir", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                             "static"),
+                        help="Flask static folder")
+    args = parser.parse_args()
+
+    setup_logging()
+    manifest = build_assets(args.static_dir)
+    log_simple("Asset manifest:\n%s", "SUCCESS", json.dumps(manifest, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,138 +1,396 @@
 #!/usr/bin/env python3
 """
-Test script to simulate device heartbeats for testing device status monitoring.
-This script simulates devices sending periodic heartbeats via MQTT.
+Device fleet simulator for load testing device status monitoring.
+
+Emulates any number of devices from a single asyncio process over one MQTT
+connection: periodic heartbeats with jitter, churn (devices going silent and
+coming back), announce storms and relay confirmations for commands published
+on the "modular" topic.
+
+With --api the simulator also polls the web service and reports the heartbeat
+ingestion rate AutomationVoice sustains and how long it takes to notice devices
+going offline or coming back. Status transitions are read from
+/api/devices/history, so the simulator and the service must share a clock
+(e.g. run on the same host).
+
+Simulated MACs have no configuration unless --configured is given, which
+makes the first devices use the MACs of the configuration file so the
+configured path (status cache and configuration writes) is loaded as well.
+
+Examples:
+    python scripts/test_device_heartbeat.py
+    python scripts/test_device_heartbeat.py --devices 20000 --interval 30 --jitter 0.2 \\
+        --churn 0.02 --storm-every 300 --relay-ack --configured --api http://localhost:8000 --duration 600
 """
 
+import argparse
+import asyncio
+import heapq
 import json
+import os
+import random
+import sys
 import time
-import threading
-from datetime import datetime
+import urllib.request
+from array import array
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from middleware.mqtt_handler import MQTTHandler
+from middleware.async_mqtt_handler import AsyncMQTTHandler
+from middleware.payload_codec import get_codec
 from middleware.logging import setup_logging, log_simple
 
-class DeviceHeartbeatSimulator:
-    def __init__(self):
-        self.mqtt = MQTTHandler(client_id="device_simulator")
-        self.devices = [
-            {
-                "mac": "70:f7:54:cb:7a:93",
-                "name": "RelayMini1",
-                "part_number": "RELAYMINI",
-                "heartbeat_interval": 30
-            },
-            {
-                "mac": "70:f7:54:cb:7a:94",
-                "name": "Relay1",
-                "part_number": "RELAY",
-                "heartbeat_interval": 30
-            }
-        ]
+_timestamp_cache = [0, ""]
+
+def load_configured_macs(path):
+    """Distinct device MACs of an AutomationVoice configuration file, in file order"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('configurations', [])
+    macs = (entry.get('mac') for entry in data if isinstance(entry, dict))
+    return list(dict.fromkeys(mac for mac in macs if mac))
+
+def utc_timestamp():
+    """ISO 8601 UTC timestamp, formatted at most once per second"""
+    now = int(time.time())
+    if now != _timestamp_cache[0]:
+        _timestamp_cache[1] = datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        _timestamp_cache[0] = now
+    return _timestamp_cache[1]
+
+def percentiles(values):
+    """p50/p95/max of a list of seconds"""
+    if not values:
+        return {'count': 0, 'p50': None, 'p95': None, 'max': None}
+    ordered = sorted(values)
+    pick = lambda fraction: round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+    return {'count': len(ordered), 'p50': pick(0.5), 'p95': pick(0.95), 'max': round(ordered[-1], 2)}
+
+class FleetSimulator:
+    """
+    Simulated device fleet.
+
+    Per-device state lives in flat arrays indexed by device number and all
+    heartbeats are driven from one min-heap of due times, so the cost per
+    device is a few bytes and one heap entry rather than a thread or task.
+    """
+
+    PART_NUMBERS = ("RELAYMINI", "RELAY")
+
+    def __init__(self, args):
+        self.args = args
+        self.mqtt = AsyncMQTTHandler(broker=args.broker, port=args.port, client_id=args.client_id,
+                                     max_inflight=args.max_inflight)
+        configured = load_configured_macs(args.configured)[:args.devices] if args.configured else []
+        self.configured = len(configured)
+        self.macs = configured + [self._mac(i) for i in range(self.configured, args.devices)]
+        self.index = {mac: i for i, mac in enumerate(self.macs)}
+        # Epoch time of the last heartbeat sent, and end of the current offline period (0 while online)
+        self.last_heartbeat = array('d', bytes(8 * args.devices))
+        self.offline_until = array('d', bytes(8 * args.devices))
+        self.schedule = []
         self.running = False
-        self.threads = []
+        self.started_at = None
+        self.counters = dict.fromkeys(('heartbeats', 'announces', 'acks', 'failed', 'churned', 'recovered'), 0)
+        self.behind = 0.0
+        self.offline_lags = []
+        self.online_lags = []
+        self.missed = 0
+        self._probes = 0
+        self._tasks = set()
+        self._service = None
+
+    def _mac(self, i):
+        return f"{self.args.mac_prefix}:{(i >> 24) & 255:02x}:{(i >> 16) & 255:02x}:{(i >> 8) & 255:02x}:{i & 255:02x}"
+
+    def _device(self, i):
+        return f"SimRelay{i}", self.PART_NUMBERS[i % 2]
+
+    def _spawn(self, coroutine):
+        """Run a coroutine in the background, keeping a reference until it finishes"""
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _publish(self, topic, payload, counter):
+        if await self.mqtt.publish(topic, payload, qos=self.args.qos):
+            self.counters[counter] += 1
+            return True
+        self.counters['failed'] += 1
+        return False
+
+    def send_heartbeat(self, i):
+        name, part_number = self._device(i)
+        self.last_heartbeat[i] = time.time()
+        self._spawn(self._publish(f"device/heartbeat/{self.macs[i]}", {
+            "timestamp": utc_timestamp(),
+            "device_name": name,
+            "part_number": part_number,
+            "status": "online"
+        }, 'heartbeats'))
+
+    def send_announcement(self, i):
+        name, part_number = self._device(i)
+        self._spawn(self._publish(f"device/announce/{self.macs[i]}", {
+            "name": name,
+            "part_number": part_number,
+            "mac": self.macs[i],
+            "timestamp": utc_timestamp(),
+            "status": "online"
+        }, 'announces'))
 
-    def send_heartbeat(self, device):
-        """Send heartbeat for a specific device"""
+    def announce_storm(self):
+        """Every online device announces at once, like after a discovery request or power cut"""
+        online = [i for i in range(len(self.macs)) if not self.offline_until[i]]
+        log_simple(f"Announce storm: {len(online)} devices", "INFO")
+        for i in online:
+            self.send_announcement(i)
+
+    async def heartbeat_loop(self):
+        """Send due heartbeats from the schedule heap"""
+        interval = self.args.interval
+        jitter = self.args.jitter
         while self.running:
-            try:
-                heartbeat_payload = {
-                    "timestamp": datetime.now().isoformat() + "Z",
-                    "device_name": device["name"],
-                    "part_number": device["part_number"],
-                    "status": "online"
-                }
+            now = time.monotonic()
+            while self.schedule and self.schedule[0][0] <= now:
+                due, i = heapq.heappop(self.schedule)
+                if self.offline_until[i]:
+                    if time.time() < self.offline_until[i]:
+                        # Silent; check again when the offline period ends
+                        heapq.heappush(self.schedule, (now + self.offline_until[i] - time.time(), i))
+                        continue
+                    self.offline_until[i] = 0
+                    self.counters['recovered'] += 1
+                    self.send_announcement(i)
+                    if time.time() - self.last_heartbeat[i] > self.args.service_timeout:
+                        # Silent long enough to have been marked offline
+                        self._probe(i, "online", time.time())
+                self.behind = now - due
+                self.send_heartbeat(i)
+                heapq.heappush(self.schedule, (now + interval * (1 + random.uniform(-jitter, jitter)), i))
+            await asyncio.sleep(min(0.05, self.schedule[0][0] - now) if self.schedule else 0.05)
+
+    async def churn_loop(self):
+        """Take a share of the fleet offline every second"""
+        per_second = self.args.churn * len(self.macs) / 60
+        while self.running:
+            await asyncio.sleep(1)
+            count = int(per_second) + (random.random() < per_second % 1)
+            for _ in range(count):
+                i = random.randrange(len(self.macs))
+                if self.offline_until[i]:
+                    continue
+                self.offline_until[i] = time.time() + self.args.offline_for * random.uniform(0.5, 1.5)
+                self.counters['churned'] += 1
+                if self.offline_until[i] - self.last_heartbeat[i] > self.args.service_timeout + self.args.interval:
+                    # Only outages the service is expected to notice
+                    self._probe(i, "offline", self.last_heartbeat[i])
+
+    async def storm_loop(self):
+        while self.running:
+            await asyncio.sleep(self.args.storm_every)
+            self.announce_storm()
 
-                topic = f"device/heartbeat/{device['mac']}"
-                success = self.mqtt.publish(topic, heartbeat_payload)
+    async def ack_loop(self):
+        """Confirm relay writes on device/status/<mac>, as the relay firmware does"""
+        codec = get_codec(self.args.codec)
+        await self.mqtt.subscribe("modular")
+        async for msg in self.mqtt.messages("modular"):
+            try:
+                command = codec.decode(msg.payload)
+            except Exception:
+                continue
+            mac = command.get("mac") if isinstance(command, dict) else None
+            i = self.index.get(mac)
+            if i is None or self.offline_until[i]:
+                continue
+            self._spawn(self._ack(mac, command))
 
-                if success:
-                    log_simple(f"Sent heartbeat for {device['name']} ({device['mac']})", "INFO")
-                else:
-                    log_simple(f"Failed to send heartbeat for {device['name']}", "ERROR")
+    async def _ack(self, mac, command):
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.args.ack_delay)
+        await self._publish(f"device/status/{mac}", {
+            "mac": mac,
+            "address": command.get("address"),
+            "value": command.get("value"),
+            "status": "online",
+            "timestamp": utc_timestamp()
+        }, 'acks')
 
-            except Exception as e:
-                log_simple(f"Error sending heartbeat for {device['name']}: {e}", "ERROR")
+    def _api_get(self, path):
+        with urllib.request.urlopen(self.args.api.rstrip('/') + path, timeout=5) as response:
+            return json.loads(response.read().decode())
 
-            # Wait for next heartbeat interval
-            time.sleep(device["heartbeat_interval"])
+    def _probe(self, i, status, since):
+        """Measure how long the service takes to report a status transition of a sampled device"""
+        if not self.args.api or self._probes >= self.args.probe_limit:
+            return
+        self._probes += 1
+        self._spawn(self._watch_transition(self.macs[i], status, since))
 
-    def send_device_announcement(self, device):
-        """Send device announcement"""
+    async def _watch_transition(self, mac, status, since):
+        expected = self.args.service_timeout if status == "offline" else 0
+        deadline = since + expected + 3 * self.args.interval
         try:
-            announcement_payload = {
-                "name": device["name"],
-                "part_number": device["part_number"],
-                "mac": device["mac"],
-                "timestamp": datetime.now().isoformat() + "Z",
-                "status": "online"
-            }
+            await asyncio.sleep(max(0.0, since + expected - 1 - time.time()))
+            while self.running and time.time() < deadline:
+                try:
+                    response = await asyncio.to_thread(self._api_get, f"/api/devices/history/{mac}")
+                except Exception:
+                    response = {}
+                for transition in (response.get('history') or {}).get('transitions', []):
+                    if transition['status'] == status and transition['timestamp'] >= since:
+                        lags = self.offline_lags if status == "offline" else self.online_lags
+                        lags.append(transition['timestamp'] - since)
+                        return
+                await asyncio.sleep(self.args.probe_poll)
+            self.missed += 1
+        finally:
+            self._probes -= 1
 
-            topic = f"device/announce/{device['mac']}"
-            success = self.mqtt.publish(topic, announcement_payload)
+    async def report_loop(self):
+        """Log send rate and, with --api, the rate AutomationVoice ingests heartbeats"""
+        previous_sent, previous_ingested, previous_time = 0, None, time.monotonic()
+        while self.running:
+            await asyncio.sleep(self.args.report_every)
+            now = time.monotonic()
+            elapsed = now - previous_time
+            sent = self.counters['heartbeats']
+            line = (f"sent {(sent - previous_sent) / elapsed:.0f} hb/s, behind {max(0.0, self.behind):.2f}s, "
+                    f"offline {sum(1 for until in self.offline_until if until)}, failed {self.counters['failed']}")
 
-            if success:
-                log_simple(f"Sent announcement for {device['name']} ({device['mac']})", "INFO")
-            else:
-                log_simple(f"Failed to send announcement for {device['name']}", "ERROR")
+            if self.args.api:
+                try:
+                    metrics = (await asyncio.to_thread(self._api_get, "/api/metrics/router"))['metrics']
+                    ingested = metrics['routes'].get('heartbeat', {}).get('count', 0)
+                    if previous_ingested is not None:
+                        line += f" | ingested {(ingested - previous_ingested) / elapsed:.0f} hb/s"
+                    line += f", queue {metrics['queue_depth_total']}, dropped {metrics['dropped']}"
+                    self._service = metrics
+                    previous_ingested = ingested
+                except Exception as e:
+                    line += f" | service metrics unavailable: {e}"
+                for status, lags in (("offline", self.offline_lags), ("online", self.online_lags)):
+                    if lags:
+                        line += f", {status} lag p50 {percentiles(lags)['p50']}s"
 
-        except Exception as e:
-            log_simple(f"Error sending announcement for {device['name']}: {e}", "ERROR")
+            log_simple(line, "INFO")
+            previous_sent, previous_time = sent, now
 
-    def start_simulation(self):
-        """Start the device heartbeat simulation"""
-        log_simple("Starting device heartbeat simulation", "INFO")
+    def summary(self):
+        elapsed = time.monotonic() - self.started_at
+        summary = {
+            'devices': len(self.macs),
+            'configured_devices': self.configured,
+            'duration_s': round(elapsed, 1),
+            'sent': dict(self.counters),
+            'heartbeat_rate': round(self.counters['heartbeats'] / elapsed, 1) if elapsed else 0.0,
+            'offline_detection_lag_s': percentiles(self.offline_lags),
+            'online_detection_lag_s': percentiles(self.online_lags),
+            'probes_without_transition': self.missed,
+            'service_timeout_s': self.args.service_timeout
+        }
+        if self._service:
+            heartbeat_route = self._service['routes'].get('heartbeat', {})
+            summary['service'] = {
+                'heartbeats_handled': heartbeat_route.get('count'),
+                'avg_handler_ms': heartbeat_route.get('avg_ms'),
+                'avg_queue_wait_ms': heartbeat_route.get('avg_queue_wait_ms'),
+                'dropped': self._service['dropped']
+            }
+        return summary
 
-        if not self.mqtt.connect():
+    async def run(self):
+        if not await self.mqtt.connect():
             log_simple("Failed to connect to MQTT broker", "ERROR")
-            return False
+            return None
 
         self.running = True
+        self.started_at = time.monotonic()
+        if self.args.announce:
+            self.announce_storm()
 
-        # Send initial announcements
-        for device in self.devices:
-            self.send_device_announcement(device)
-            time.sleep(1)  # Small delay between announcements
-
-        # Start heartbeat threads
-        for device in self.devices:
-            thread = threading.Thread(target=self.send_heartbeat, args=(device,), daemon=True)
-            thread.start()
-            self.threads.append(thread)
+        # Spread the first heartbeats over one interval so the fleet does not pulse
+        start = time.monotonic()
+        self.schedule = [(start + random.uniform(0, self.args.interval), i) for i in range(len(self.macs))]
+        heapq.heapify(self.schedule)
 
-        log_simple(f"Device simulation started for {len(self.devices)} devices", "SUCCESS")
-        log_simple("Devices will send heartbeats every 30 seconds", "INFO")
-        return True
+        loops = [self.heartbeat_loop(), self.report_loop()]
+        if self.args.churn:
+            loops.append(self.churn_loop())
+        if self.args.storm_every:
+            loops.append(self.storm_loop())
+        if self.args.relay_ack:
+            loops.append(self.ack_loop())
+        tasks = [asyncio.create_task(loop) for loop in loops]
+        log_simple(f"Fleet simulation started: {len(self.macs)} devices, heartbeat every "
+                   f"{self.args.interval}s ±{self.args.jitter:.0%}", "SUCCESS")
 
-    def stop_simulation(self):
-        """Stop the device heartbeat simulation"""
-        log_simple("Stopping device heartbeat simulation", "INFO")
-        self.running = False
-
-        # Wait for threads to finish
-        for thread in self.threads:
-            thread.join(timeout=5)
+        try:
+            if self.args.duration:
+                await asyncio.sleep(self.args.duration)
+            else:
+                await asyncio.gather(*tasks)
+        finally:
+            self.running = False
+            for task in tasks + list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, *self._tasks, return_exceptions=True)
+            await self.mqtt.disconnect()
+        return self.summary()
 
-        self.mqtt.disconnect()
-        log_simple("Device heartbeat simulation stopped", "SUCCESS")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulate a device fleet sending heartbeats over MQTT")
+    parser.add_argument("--devices", type=int, default=2, help="Number of simulated devices")
+    parser.add_argument("--interval", type=float, default=30, help="Heartbeat interval in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Heartbeat jitter as a fraction of the interval")
+    parser.add_argument("--churn", type=float, default=0.0,
+                        help="Fraction of the fleet going offline per minute")
+    parser.add_argument("--offline-for", type=float, default=120,
+                        help="Average seconds a churned device stays silent")
+    parser.add_argument("--no-announce", dest="announce", action="store_false",
+                        help="Do not announce all devices at start")
+    parser.add_argument("--storm-every", type=float, default=0,
+                        help="Seconds between announce storms of the whole fleet (0 disables)")
+    parser.add_argument("--relay-ack", action="store_true",
+                        help="Confirm relay commands on device/status/<mac>")
+    parser.add_argument("--ack-delay", type=float, default=0.05, help="Average relay confirmation delay in seconds")
+    parser.add_argument("--codec", default="json", help="Payload codec of relay commands")
+    parser.add_argument("--api", help="Web service base URL for ingestion and detection lag reports")
+    parser.add_argument("--service-timeout", type=float, default=70,
+                        help="Offline timeout of the service for unconfigured devices (2x30s + 10s)")
+    parser.add_argument("--probe-limit", type=int, default=50, help="Concurrent detection lag probes")
+    parser.add_argument("--probe-poll", type=float, default=0.5, help="Seconds between history polls of a probe")
+    parser.add_argument("--report-every", type=float, default=10, help="Seconds between progress reports")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after this many seconds (0 runs until Ctrl+C)")
+    parser.add_argument("--broker", default="localhost")
+    parser.add_argument("--port", type=int, default=1884)
+    parser.add_argument("--qos", type=int, default=1, choices=(0, 1, 2))
+    parser.add_argument("--max-inflight", type=int, default=1000, help="Unacknowledged publishes allowed")
+    parser.add_argument("--client-id", default="device_simulator")
+    parser.add_argument("--mac-prefix", default="02:5e", help="First two octets of the simulated MACs")
+    parser.add_argument("--configured", nargs="?", const="JSON/automationVoiceConfig.json",
+                        help="Use the MACs of this configuration file for the first devices "
+                             "(default file if given without a path)")
+    return parser.parse_args()
 
 def main():
     """Main function"""
-    simulator = DeviceHeartbeatSimulator()
+    setup_logging()
+    simulator = FleetSimulator(parse_args())
 
     try:
-        if simulator.start_simulation():
-            log_simple("Press Ctrl+C to stop simulation", "INFO")
-
-            # Keep running
-            while True:
-                time.sleep(1)
-
+        summary = asyncio.run(simulator.run())
     except KeyboardInterrupt:
-        simulator.stop_simulation()
+        summary = simulator.summary() if simulator.started_at else None
     except Exception as e:
         log_simple(f"Error in simulation: {e}", "ERROR")
-        simulator.stop_simulation()
+        summary = None
+
+    if summary:
+        log_simple("Fleet simulation summary:\n%s", "SUCCESS", json.dumps(summary, indent=2))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,1301 @@
+// Voice Control Dashboard (bundled by scripts/build_assets.py)
+
+// MQTT Configuration for Voice Control Relay System
+const MQTT_CONFIG = {
+    broker: 'localhost',
+    port: 9001,  // Changed from 9000 to avoid conflict
+    websocketUrl: 'ws://localhost:9001/mqtt',
+    clientId: 'voice-control-frontend-' + Date.now()
+};
+
+// Initialize Lucide Icons
+lucide.createIcons();
+
+let availableDevices = [];
+let currentConfigId = null;
+let autoRefreshInterval = null;
+let autoRefreshEnabled = false;
+let voiceControlActive = false;
+
+// MQTT status tracking (via backend API)
+let isMqttConnected = false;
+
+// Load initial data
+document.addEventListener('DOMContentLoaded', function() {
+    loadAvailableDevices();
+    loadConfigurations();
+    updateStats();
+    setupSearchAndFilter();
+    setupKeyboardShortcuts();
+    setupModalHandlers();
+    setupVoiceControlHandlers();
+    setupRefreshHandler();
+
+    // Voice results, device status, configuration changes and MQTT state are pushed by the server
+    connectEventStream();
+});
+
+// Server-Sent Events push channel (falls back to polling without EventSource support)
+let configRefreshTimer = null;
+
+function connectEventStream() {
+    if (!window.EventSource) {
+        setInterval(updateMqttStatus, 5000);
+        setInterval(updateVoiceResults, 2000);
+        return;
+    }
+
+    const events = new EventSource('/api/events');
+
+    events.addEventListener('voice_result', event => {
+        const result = JSON.parse(event.data);
+        if (result.command_text) {
+            showVoiceResult(result);
+        }
+    });
+
+    events.addEventListener('mqtt', event => {
+        renderMqttStatus(JSON.parse(event.data).mqtt_connected);
+    });
+
+    events.addEventListener('device_status', event => {
+        const device = JSON.parse(event.data);
+        deviceStatusCache[device.mac] = device;
+        document.querySelectorAll(`[data-status-mac="${device.mac}"]`).forEach(badge => {
+            badge.outerHTML = deviceStatusBadge(device.mac, device.status);
+        });
+    });
+
+    events.addEventListener('devices', () => {
+        // Device list changed on MODULAR_DEVICE/AVAILABLES; refetch (revalidated by ETag)
+        loadAvailableDevices();
+    });
+
+    events.addEventListener('config', () => {
+        // Several changes in a row trigger a single reload
+        clearTimeout(configRefreshTimer);
+        configRefreshTimer = setTimeout(() => {
+            loadConfigurations();
+            updateStats();
+        }, 300);
+    });
+
+    // EventSource reconnects by itself and resumes from the last event id
+    events.onerror = () => console.debug('Event stream interrupted, reconnecting');
+}
+
+// Update voice results from backend (polling fallback)
+async function updateVoiceResults() {
+    try {
+        const response = await fetch('/api/voice/last-result');
+        const data = await response.json();
+
+        if (data.status === 'success' && data.result && data.result.command_text) {
+            // Only update if there's actual command data (not empty result)
+            showVoiceResult(data.result);
+        }
+    } catch (error) {
+        // Silently fail - don't spam console with polling errors
+        console.debug('Voice results polling:', error);
+    }
+}
+
+function showVoiceResult(result) {
+    // Create a mock result object for the UI update function
+    const mockResult = {
+        success: result.success,
+        status: result.success ? 'success' : 'warning',
+        details: result
+    };
+
+    // Update the voice results card
+    updateVoiceResultsCard(mockResult, result.command_text);
+}
+
+// Status of all devices in one request; revalidated with the ETag, so unchanged data costs a 304
+let deviceStatusCache = {};
+
+async function fetchDeviceStatuses() {
+    try {
+        const response = await fetch('/api/devices/status', { cache: 'no-cache' });
+        const data = await response.json();
+        if (data.status === 'success') {
+            deviceStatusCache = data.devices;
+        }
+    } catch (error) {
+        console.error('Error fetching device statuses:', error);
+    }
+    return deviceStatusCache;
+}
+
+// Device status badge of a configuration row
+function deviceStatusBadge(mac, status) {
+    let statusColor, statusText;
+
+    switch (status) {
+        case 'online':
+            statusColor = 'emerald';
+            statusText = 'Online';
+            break;
+        case 'offline':
+            statusColor = 'slate';
+            statusText = 'Offline';
+            break;
+        default:
+            statusColor = 'yellow';
+            statusText = 'Unknown';
+    }
+
+    return `
+        <div data-status-mac="${mac}" class="inline-flex items-center gap-1.5 px-2.5 py-1 rounded-full text-xs font-medium bg-${statusColor}-50 text-${statusColor}-700 border border-${statusColor}-200">
+            <div class="w-1.5 h-1.5 rounded-full bg-${statusColor}-500"></div>
+            <span>${statusText}</span>
+        </div>`;
+}
+
+// Load available devices
+async function loadAvailableDevices() {
+    try {
+        const response = await fetch('/api/devices/available');
+        const data = await response.json();
+
+        if (data.status === 'success') {
+            availableDevices = data.devices;
+            updateDeviceDropdowns();
+        }
+    } catch (error) {
+        console.error('Error loading devices:', error);
+        showAlert('Error loading available devices', 'error');
+    }
+}
+
+// Update device dropdowns in modals
+function updateDeviceDropdowns() {
+    const createSelect = document.getElementById('createDevice');
+    const editSelect = document.getElementById('editDevice');
+
+    // Update create modal dropdown
+    createSelect.innerHTML = '<option value="">Select Device...</option>';
+    availableDevices.forEach(device => {
+        const option = document.createElement('option');
+        option.value = device.name;
+        option.textContent = `${device.name} (${device.part_number})`;
+        option.dataset.device = JSON.stringify(device);
+        createSelect.appendChild(option);
+    });
+
+    // Update edit modal dropdown
+    editSelect.innerHTML = '<option value="">Select Device...</option>';
+    availableDevices.forEach(device => {
+        const option = document.createElement('option');
+        option.value = device.name;
+        option.textContent = `${device.name} (${device.part_number})`;
+        option.dataset.device = JSON.stringify(device);
+        editSelect.appendChild(option);
+    });
+}
+
+// Setup modal handlers
+function setupModalHandlers() {
+    // Create Configuration Modal
+    document.getElementById('createConfigBtn').addEventListener('click', () => {
+        document.getElementById('createModal').style.display = 'flex';
+    });
+
+    document.getElementById('cancelCreateBtn').addEventListener('click', () => {
+        document.getElementById('createModal').style.display = 'none';
+        // Reset form and hide device details
+        const form = document.getElementById('createModal').querySelector('form') || document.createElement('form');
+        if (form.reset) form.reset();
+        document.getElementById('deviceDetails').classList.add('hidden');
+        document.getElementById('createAddress').value = '';
+        document.getElementById('createBus').value = '';
+        document.getElementById('createPartNumber').value = '';
+        document.getElementById('createMac').value = '';
+        document.getElementById('createPin').innerHTML = '<option value="">Select Pin...</option>';
+    });
+
+    document.getElementById('submitCreateBtn').addEventListener('click', createConfiguration);
+
+    // Edit Configuration Modal
+    document.getElementById('cancelEditBtn').addEventListener('click', () => {
+        document.getElementById('editModal').style.display = 'none';
+    });
+
+    document.getElementById('cancelEditBtnBottom').addEventListener('click', () => {
+        document.getElementById('editModal').style.display = 'none';
+    });
+
+    document.getElementById('submitEditBtn').addEventListener('click', updateConfiguration);
+
+    // Test Voice Command Modal
+    document.getElementById('testVoiceBtn').addEventListener('click', () => {
+        document.getElementById('testVoiceModal').style.display = 'flex';
+    });
+
+    document.getElementById('cancelTestBtn').addEventListener('click', () => {
+        document.getElementById('testVoiceModal').style.display = 'none';
+        document.getElementById('testCommand').value = '';
+    });
+
+    document.getElementById('submitTestBtn').addEventListener('click', testVoiceCommand);
+
+    // Device Preview Modal
+    document.getElementById('closePreviewBtn').addEventListener('click', () => {
+        document.getElementById('previewModal').style.display = 'none';
+    });
+
+    document.getElementById('closePreviewBtnBottom').addEventListener('click', () => {
+        document.getElementById('previewModal').style.display = 'none';
+    });
+
+    // Delete Confirmation Modal
+    document.getElementById('cancelDeleteBtn').addEventListener('click', () => {
+        document.getElementById('deleteModal').style.display = 'none';
+    });
+
+    document.getElementById('confirmDeleteBtn').addEventListener('click', () => {
+        const configId = document.getElementById('confirmDeleteBtn').dataset.configId;
+        if (configId) {
+            performDeleteConfiguration(configId);
+        }
+    });
+
+    // Close modals when clicking outside
+    document.querySelectorAll('.fixed.inset-0').forEach(modal => {
+        modal.addEventListener('click', (e) => {
+            if (e.target === modal) {
+                modal.style.display = 'none';
+            }
+        });
+    });
+
+    // Handle device selection in create modal
+    document.getElementById('createDevice').addEventListener('change', function() {
+        const selectedOption = this.options[this.selectedIndex];
+        const deviceDetailsDiv = document.getElementById('deviceDetails');
+
+        if (this.value) {
+            const device = JSON.parse(selectedOption.dataset.device);
+
+            // Show device details section
+            deviceDetailsDiv.classList.remove('hidden');
+
+            // Populate device details fields
+            document.getElementById('createAddress').value = device.address || '';
+            document.getElementById('createBus').value = device.device_bus || '0';
+            document.getElementById('createPartNumber').value = device.part_number || '';
+            document.getElementById('createMac').value = device.mac || '';
+
+            // Load pins for device type
+            loadPinsForDevice(device.part_number, 'createPin');
+        } else {
+            // Hide device details section and reset fields
+            deviceDetailsDiv.classList.add('hidden');
+            document.getElementById('createAddress').value = '';
+            document.getElementById('createBus').value = '';
+            document.getElementById('createPartNumber').value = '';
+            document.getElementById('createMac').value = '';
+            document.getElementById('createPin').innerHTML = '<option value="">Select Pin...</option>';
+        }
+    });
+
+    // Handle device selection in edit modal
+    document.getElementById('editDevice').addEventListener('change', function() {
+        const selectedOption = this.options[this.selectedIndex];
+        const deviceDetailsDiv = document.getElementById('editDeviceDetails');
+
+        if (this.value) {
+            const device = JSON.parse(selectedOption.dataset.device);
+
+            // Show device details section
+            deviceDetailsDiv.classList.remove('hidden');
+
+            // Populate device details fields
+            document.getElementById('editAddress').value = device.address || '';
+            document.getElementById('editBus').value = device.device_bus || '0';
+            document.getElementById('editPartNumber').value = device.part_number || '';
+            document.getElementById('editMac').value = device.mac || '';
+
+            // Load pins for device type
+            loadPinsForDevice(device.part_number, 'editPin');
+        } else {
+            // Hide device details section and reset fields
+            deviceDetailsDiv.classList.add('hidden');
+            document.getElementById('editAddress').value = '';
+            document.getElementById('editBus').value = '';
+            document.getElementById('editPartNumber').value = '';
+            document.getElementById('editMac').value = '';
+            document.getElementById('editPin').innerHTML = '<option value="">Select Pin...</option>';
+        }
+    });
+}
+
+// Setup voice control handlers
+function setupVoiceControlHandlers() {
+    document.getElementById('startVoiceBtn').addEventListener('click', startVoiceControl);
+    document.getElementById('stopVoiceBtn').addEventListener('click', stopVoiceControl);
+    document.getElementById('discoverDevicesBtn').addEventListener('click', discoverDevices);
+}
+
+// Setup refresh button handler
+function setupRefreshHandler() {
+    document.getElementById('refreshBtn').addEventListener('click', function() {
+        window.location.reload();
+    });
+}
+
+// Load pins for device type
+async function loadPinsForDevice(partNumber, pinSelectId) {
+    try {
+        const response = await fetch(`/api/pins/${partNumber}`);
+        const data = await response.json();
+
+        if (data.status === 'success') {
+            const pinSelect = document.getElementById(pinSelectId);
+            pinSelect.innerHTML = '<option value="">Select Pin...</option>';
+
+            data.pins.forEach(pin => {
+                const option = document.createElement('option');
+                option.value = pin;
+                option.textContent = pin;
+                pinSelect.appendChild(option);
+            });
+        }
+    } catch (error) {
+        console.error('Error loading pins:', error);
+    }
+}
+
+// Create configuration
+async function createConfiguration() {
+    const deviceSelect = document.getElementById('createDevice');
+    const selectedOption = deviceSelect.options[deviceSelect.selectedIndex];
+
+    if (!selectedOption.value) {
+        showAlert('Please select a device', 'error');
+        return;
+    }
+
+    const device = JSON.parse(selectedOption.dataset.device);
+    const data = {
+        device_name: deviceSelect.value,
+        objectName: document.getElementById('createObjectName').value,
+        pin: document.getElementById('createPin').value,
+        desc: document.getElementById('createDesc').value,
+        address: device.address,
+        bus: device.device_bus,
+        part_number: device.part_number,
+        mac: device.mac
+    };
+
+    if (!data.objectName || !data.pin) {
+        showAlert('Please fill in all required fields', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/configurations', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(data)
+        });
+
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            showAlert('Configuration created successfully', 'success');
+
+            // Close modal and reset form first
+            document.getElementById('createModal').style.display = 'none';
+            document.getElementById('createForm').reset();
+
+            // Force immediate refresh of data
+            setTimeout(async () => {
+                try {
+                    await loadConfigurations();
+                    await updateStats();
+                } catch (error) {
+                    console.error('Error refreshing data after creation:', error);
+                    // Fallback: reload the page if refresh fails
+                    window.location.reload();
+                }
+            }, 500);
+        } else {
+            console.error('Configuration creation failed:', result);
+            showAlert(result.message || 'Error creating configuration', 'error');
+        }
+    } catch (error) {
+        console.error('Error creating configuration:', error);
+        showAlert('Error creating configuration', 'error');
+    }
+}
+
+// Edit configuration
+function editConfiguration(id) {
+    // Find configuration
+    fetch('/api/configurations')
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'success') {
+                const config = data.data.find(c => c.id === id);
+                if (config) {
+                    currentConfigId = id;
+                    document.getElementById('editId').value = id;
+                    document.getElementById('editDevice').value = config.device_name;
+                    document.getElementById('editObjectName').value = config.object_name || '';
+                    document.getElementById('editDesc').value = config.desc || '';
+
+                    // Load pins for this device type
+                    loadPinsForDevice(config.part_number, 'editPin').then(() => {
+                        document.getElementById('editPin').value = config.pin || '';
+                    });
+
+                    document.getElementById('editModal').style.display = 'flex';
+                }
+            }
+        })
+        .catch(error => {
+            console.error('Error loading configuration for edit:', error);
+            showAlert('Error loading configuration', 'error');
+        });
+}
+
+// Update configuration
+async function updateConfiguration() {
+    if (!currentConfigId) return;
+
+    const deviceSelect = document.getElementById('editDevice');
+    const selectedOption = deviceSelect.options[deviceSelect.selectedIndex];
+    const deviceChanged = selectedOption && selectedOption.value;
+
+    const data = {
+        desc: document.getElementById('editDesc').value,
+        objectName: document.getElementById('editObjectName').value,
+        pin: document.getElementById('editPin').value
+    };
+
+    // If device was changed, include device-related fields
+    if (deviceChanged) {
+        const device = JSON.parse(selectedOption.dataset.device);
+        data.device_name = deviceSelect.value;
+        data.address = device.address;
+        data.bus = device.device_bus;
+        data.part_number = device.part_number;
+        data.mac = device.mac;
+    }
+
+    try {
+        const response = await fetch(`/api/configurations/${currentConfigId}`, {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(data)
+        });
+
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            showAlert('Configuration updated successfully', 'success');
+            document.getElementById('editModal').style.display = 'none';
+
+            // Auto-refresh data after successful update
+            setTimeout(() => {
+                loadConfigurations();
+                updateStats();
+            }, 300);
+        } else {
+            showAlert(result.message || 'Error updating configuration', 'error');
+        }
+    } catch (error) {
+        console.error('Error updating configuration:', error);
+        showAlert('Error updating configuration', 'error');
+    }
+}
+
+// Delete configuration
+async function deleteConfiguration(id) {
+    if (!confirm('Are you sure you want to delete this configuration?')) return;
+
+    try {
+        const response = await fetch(`/api/configurations/${id}`, {
+            method: 'DELETE'
+        });
+
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            showAlert('Configuration deleted successfully', 'success');
+            loadConfigurations();
+            updateStats();
+        } else {
+            showAlert(result.message || 'Error deleting configuration', 'error');
+        }
+    } catch (error) {
+        console.error('Error deleting configuration:', error);
+        showAlert('Error deleting configuration', 'error');
+    }
+}
+
+// Voice Control Functions
+async function startVoiceControl() {
+    try {
+        const response = await fetch('/api/voice/start', {
+            method: 'POST'
+        });
+
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            voiceControlActive = true;
+            document.getElementById('startVoiceBtn').style.display = 'none';
+            document.getElementById('stopVoiceBtn').style.display = 'inline-flex';
+            updateVoiceControlStatus('Active', 'emerald');
+            showAlert('Voice control started successfully', 'success');
+        } else {
+            showAlert(result.message || 'Failed to start voice control', 'error');
+        }
+    } catch (error) {
+        console.error('Error starting voice control:', error);
+        showAlert('Error starting voice control', 'error');
+    }
+}
+
+async function stopVoiceControl() {
+    try {
+        const response = await fetch('/api/voice/stop', {
+            method: 'POST'
+        });
+
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            voiceControlActive = false;
+            document.getElementById('startVoiceBtn').style.display = 'inline-flex';
+            document.getElementById('stopVoiceBtn').style.display = 'none';
+            updateVoiceControlStatus('Inactive', 'gray');
+
+            // Hide voice results card when stopping voice control
+            const voiceResultsCard = document.getElementById('voiceResultsCard');
+            voiceResultsCard.style.display = 'none';
+
+            showAlert('Voice control stopped', 'info');
+        } else {
+            showAlert(result.message || 'Failed to stop voice control', 'error');
+        }
+    } catch (error) {
+        console.error('Error stopping voice control:', error);
+        showAlert('Error stopping voice control', 'error');
+    }
+}
+
+// Update voice control status in UI
+function updateVoiceControlStatus(status, color) {
+    const statusDiv = document.getElementById('voiceControlStatus');
+    statusDiv.innerHTML = `
+        <div class="w-2 h-2 rounded-full bg-${color}-500"></div>
+        <span class="text-sm font-medium">${status}</span>
+    `;
+}
+
+// Test voice command
+async function testVoiceCommand() {
+    const commandInput = document.getElementById('testCommand');
+    const command = commandInput.value.trim();
+
+    if (!command) {
+        showAlert('Please enter a command to test', 'error');
+        return;
+    }
+
+    try {
+        // Show loading state
+        showAlert('Processing voice command...', 'info');
+
+        const response = await fetch('/api/voice/test', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ command: command })
+        });
+
+        const result = await response.json();
+
+        // Update voice results card
+        updateVoiceResultsCard(result, command);
+
+        // Show appropriate alert
+        if (result.status === 'success') {
+            showAlert(`✅ Command processed successfully: "${command}"`, 'success');
+        } else {
+            showAlert(`⚠️ Command processed with warning: "${command}"`, 'info');
+        }
+
+        // Clear input
+        commandInput.value = '';
+
+    } catch (error) {
+        console.error('Error testing voice command:', error);
+        showAlert('Error testing voice command', 'error');
+    }
+}
+
+// Update voice results card with command details
+function updateVoiceResultsCard(result, originalCommand) {
+    const card = document.getElementById('voiceResultsCard');
+    const details = result.details || {};
+
+    // Show the card
+    card.style.display = 'block';
+
+    // Update status badge
+    const statusBadge = document.getElementById('commandStatusBadge');
+    if (result.success || result.status === 'success') {
+        statusBadge.className = 'inline-flex items-center gap-1.5 px-2.5 py-1 rounded-full text-xs font-medium bg-emerald-50 text-emerald-700 border border-emerald-200';
+        statusBadge.innerHTML = '<div class="w-1.5 h-1.5 rounded-full bg-emerald-500"></div><span>Success</span>';
+    } else {
+        statusBadge.className = 'inline-flex items-center gap-1.5 px-2.5 py-1 rounded-full text-xs font-medium bg-red-50 text-red-700 border border-red-200';
+        statusBadge.innerHTML = '<div class="w-1.5 h-1.5 rounded-full bg-red-500"></div><span>Failed</span>';
+    }
+
+    // Update recognized text
+    document.getElementById('recognizedText').textContent = originalCommand;
+
+    // Update detected action
+    document.getElementById('detectedAction').textContent = details.action || 'None';
+
+    // Update target device
+    document.getElementById('targetDevice').textContent = details.object_name || 'None';
+
+    // Update device details section
+    const deviceSection = document.getElementById('deviceDetailsSection');
+    if (details.device_found) {
+        deviceSection.style.display = 'block';
+        document.getElementById('deviceNameDetail').textContent = details.device_name || '-';
+        document.getElementById('devicePinDetail').textContent = details.pin || '-';
+        document.getElementById('mqttStatusDetail').textContent = details.queued ? 'Queued (MQTT offline)' : (details.mqtt_success ? 'Success' : 'Failed');
+    } else {
+        deviceSection.style.display = 'none';
+    }
+
+    // Update error section
+    const errorSection = document.getElementById('errorSection');
+    if (details.error_message) {
+        errorSection.style.display = 'block';
+        document.getElementById('errorMessage').textContent = details.error_message;
+    } else {
+        errorSection.style.display = 'none';
+    }
+
+    // Update timestamp
+    const timestamp = details.timestamp ? new Date(details.timestamp).toLocaleString('id-ID') : new Date().toLocaleString('id-ID');
+    document.getElementById('commandTimestamp').textContent = `Last updated: ${timestamp}`;
+
+    // Scroll to results card
+    card.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+}
+
+// Discover devices
+async function discoverDevices() {
+    const button = document.getElementById('discoverDevicesBtn');
+    try {
+        button.disabled = true;
+        showAlert('Discovering devices...', 'info');
+
+        // The server collects announce responses for a short window and answers once
+        const response = await fetch('/api/devices/discover', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ wait: true })
+        });
+
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            showAlert(`Device discovery finished: ${result.discovery.count} device(s) responded.`, 'success');
+            loadAvailableDevices();
+            loadConfigurations();
+        } else {
+            showAlert(result.message || 'Failed to initiate device discovery', 'error');
+        }
+    } catch (error) {
+        console.error('Error discovering devices:', error);
+        showAlert('Error initiating device discovery', 'error');
+    } finally {
+        button.disabled = false;
+    }
+}
+
+// Load configurations
+async function loadConfigurations() {
+    try {
+        const tbody = document.getElementById('configTableBody');
+        tbody.innerHTML = `
+            <tr>
+                <td colspan="7" class="px-4 py-8 text-center text-muted-foreground">
+                    <div class="flex flex-col items-center gap-2">
+                        <i data-lucide="loader-2" class="h-8 w-8 animate-spin"></i>
+                        <p>Loading configurations...</p>
+                    </div>
+                </td>
+            </tr>
+        `;
+
+        const timestamp = Date.now();
+        const response = await fetch(`/api/configurations?t=${timestamp}`, {
+            method: 'GET',
+            headers: {
+                'Cache-Control': 'no-cache, no-store, must-revalidate',
+                'Pragma': 'no-cache',
+                'Expires': '0'
+            }
+        });
+        const data = await response.json();
+
+        tbody.innerHTML = '';
+
+        if (data.status === 'success') {
+            let filteredData = data.data;
+
+            // Apply search filter
+            const searchTerm = document.getElementById('searchInput').value.toLowerCase().trim();
+            const searchType = document.getElementById('searchTypeSelect').value;
+
+            if (searchTerm) {
+                filteredData = filteredData.filter(config => {
+                    switch (searchType) {
+                        case 'object_name':
+                            return config.object_name?.toLowerCase().includes(searchTerm);
+                        case 'device_name':
+                            return config.device_name?.toLowerCase().includes(searchTerm);
+                        case 'part_number':
+                            return config.part_number?.toLowerCase().includes(searchTerm);
+                        case 'pin':
+                            return config.pin?.toLowerCase().includes(searchTerm);
+                        case 'description':
+                            return config.desc?.toLowerCase().includes(searchTerm);
+                        case 'status':
+                            // For status search, check device status
+                            const statusText = config.realStatus || 'unknown';
+                            return statusText.toLowerCase().includes(searchTerm);
+                        case 'all':
+                        default:
+                            return config.object_name?.toLowerCase().includes(searchTerm) ||
+                                   config.device_name?.toLowerCase().includes(searchTerm) ||
+                                   config.part_number?.toLowerCase().includes(searchTerm) ||
+                                   config.pin?.toLowerCase().includes(searchTerm) ||
+                                   config.desc?.toLowerCase().includes(searchTerm) ||
+                                   (config.realStatus || 'unknown').toLowerCase().includes(searchTerm);
+                    }
+                });
+            }
+
+            // Process configurations with real status first (one bulk request), then apply search filter
+            fetchDeviceStatuses().then(statuses => data.data.map(config => ({
+                ...config,
+                realStatus: statuses[config.mac]?.status || 'unknown'
+            }))).then(allConfigsWithStatus => {
+                // Apply search filter after we have all status data
+                let filteredData = allConfigsWithStatus;
+
+                const searchTerm = document.getElementById('searchInput').value.toLowerCase().trim();
+                const searchType = document.getElementById('searchTypeSelect').value;
+
+                if (searchTerm) {
+                    filteredData = filteredData.filter(config => {
+                        switch (searchType) {
+                            case 'object_name':
+                                return config.object_name?.toLowerCase().includes(searchTerm);
+                            case 'device_name':
+                                return config.device_name?.toLowerCase().includes(searchTerm);
+                            case 'part_number':
+                                return config.part_number?.toLowerCase().includes(searchTerm);
+                            case 'pin':
+                                return config.pin?.toLowerCase().includes(searchTerm);
+                            case 'description':
+                                return config.desc?.toLowerCase().includes(searchTerm);
+                            case 'status':
+                                // For status search, check device status
+                                const statusText = config.realStatus || 'unknown';
+                                return statusText.toLowerCase().includes(searchTerm);
+                            case 'all':
+                            default:
+                                return config.object_name?.toLowerCase().includes(searchTerm) ||
+                                       config.device_name?.toLowerCase().includes(searchTerm) ||
+                                       config.part_number?.toLowerCase().includes(searchTerm) ||
+                                       config.pin?.toLowerCase().includes(searchTerm) ||
+                                       config.desc?.toLowerCase().includes(searchTerm) ||
+                                       (config.realStatus || 'unknown').toLowerCase().includes(searchTerm);
+                        }
+                    });
+                }
+
+                tbody.innerHTML = ''; // Clear loading state
+
+                if (filteredData.length === 0) {
+                    tbody.innerHTML = `
+                        <tr>
+                            <td colspan="7" class="px-4 py-8 text-center text-muted-foreground">
+                                <div class="flex flex-col items-center gap-2">
+                                    <i data-lucide="search" class="h-8 w-8"></i>
+                                    <p>No configurations found matching your criteria</p>
+                                </div>
+                            </td>
+                        </tr>
+                    `;
+                } else {
+                    filteredData.forEach((config, index) => {
+                        const row = document.createElement('tr');
+                        row.className = 'hover:bg-muted/30 transition-colors';
+                        row.innerHTML = `
+                            <td class="px-6 py-4 text-center">
+                                <span class="text-sm font-medium text-muted-foreground">${index + 1}</span>
+                            </td>
+                            <td class="px-6 py-4">
+                                <div class="font-medium text-foreground">${config.object_name || '-'}</div>
+                            </td>
+                            <td class="px-6 py-4">
+                                <div class="space-y-1">
+                                    <div class="font-medium text-foreground">${config.device_name}</div>
+                                    <div class="text-xs text-muted-foreground">${config.part_number}</div>
+                                </div>
+                            </td>
+                            <td class="px-6 py-4">
+                                ${deviceStatusBadge(config.mac, config.realStatus)}
+                            </td>
+                            <td class="px-6 py-4">
+                                <code class="px-2 py-1 bg-muted/50 rounded text-xs font-mono text-foreground">${config.pin || '-'}</code>
+                            </td>
+                            <td class="px-6 py-4">
+                                <div class="text-sm text-muted-foreground max-w-xs truncate" title="${config.desc || '-'}">${config.desc || '-'}</div>
+                            </td>
+                            <td class="px-6 py-4">
+                                <div class="flex items-center justify-center gap-1">
+                                    <button class="inline-flex items-center justify-center h-8 w-8 rounded-md border border-border hover:bg-muted transition-colors" title="Preview Data" onclick="previewDevice('${config.id}')">
+                                        <i data-lucide="eye" class="h-3.5 w-3.5 text-muted-foreground"></i>
+                                    </button>
+                                    <button class="inline-flex items-center justify-center h-8 w-8 rounded-md border border-border hover:bg-muted transition-colors" title="Edit" onclick="editConfiguration('${config.id}')">
+                                        <i data-lucide="edit-2" class="h-3.5 w-3.5 text-muted-foreground"></i>
+                                    </button>
+                                    <button class="inline-flex items-center justify-center h-8 w-8 rounded-md border border-destructive/50 text-destructive hover:bg-destructive/10 hover:border-destructive transition-colors" title="Delete" onclick="deleteConfiguration('${config.id}')">
+                                        <i data-lucide="trash-2" class="h-3.5 w-3.5"></i>
+                                    </button>
+                                </div>
+                            </td>
+                        `;
+                        tbody.appendChild(row);
+                    });
+                }
+
+                // Re-initialize Lucide icons for new elements
+                lucide.createIcons();
+            }).catch(error => {
+                console.error('Error fetching device statuses:', error);
+                // Fallback: show all data without status
+                tbody.innerHTML = '';
+                data.data.forEach((config, index) => {
+                    const row = document.createElement('tr');
+                    row.className = 'hover:bg-muted/30 transition-colors';
+                    row.innerHTML = `
+                        <td class="px-6 py-4 text-center">
+                            <span class="text-sm font-medium text-muted-foreground">${index + 1}</span>
+                        </td>
+                        <td class="px-6 py-4">
+                            <div class="font-medium text-foreground">${config.object_name || '-'}</div>
+                        </td>
+                        <td class="px-6 py-4">
+                            <div class="space-y-1">
+                                <div class="font-medium text-foreground">${config.device_name}</div>
+                                <div class="text-xs text-muted-foreground">${config.part_number}</div>
+                            </div>
+                        </td>
+                        <td class="px-6 py-4">
+                            <div class="inline-flex items-center gap-1.5 px-2.5 py-1 rounded-full text-xs font-medium bg-yellow-50 text-yellow-700 border border-yellow-200">
+                                <div class="w-1.5 h-1.5 rounded-full bg-yellow-500"></div>
+                                <span>Unknown</span>
+                            </div>
+                        </td>
+                        <td class="px-6 py-4">
+                            <code class="px-2 py-1 bg-muted/50 rounded text-xs font-mono text-foreground">${config.pin || '-'}</code>
+                        </td>
+                        <td class="px-6 py-4">
+                            <div class="text-sm text-muted-foreground max-w-xs truncate" title="${config.desc || '-'}">${config.desc || '-'}</div>
+                        </td>
+                        <td class="px-6 py-4">
+                            <div class="flex items-center justify-center gap-1">
+                                <button class="inline-flex items-center justify-center h-8 w-8 rounded-md border border-border hover:bg-muted transition-colors" title="Preview Data">
+                                    <i data-lucide="eye" class="h-3.5 w-3.5 text-muted-foreground"></i>
+                                </button>
+                                <button class="inline-flex items-center justify-center h-8 w-8 rounded-md border border-border hover:bg-muted transition-colors" title="Edit" onclick="editConfiguration('${config.id}')">
+                                    <i data-lucide="edit-2" class="h-3.5 w-3.5 text-muted-foreground"></i>
+                                </button>
+                                <button class="inline-flex items-center justify-center h-8 w-8 rounded-md border border-destructive/50 text-destructive hover:bg-destructive/10 hover:border-destructive transition-colors" title="Delete" onclick="deleteConfiguration('${config.id}')">
+                                    <i data-lucide="trash-2" class="h-3.5 w-3.5"></i>
+                                </button>
+                            </div>
+                        </td>
+                    `;
+                    tbody.appendChild(row);
+                });
+                lucide.createIcons();
+            });
+        } else {
+            tbody.innerHTML = `
+                <tr>
+                    <td colspan="7" class="px-4 py-8 text-center text-destructive">
+                        <div class="flex flex-col items-center gap-2">
+                            <i data-lucide="alert-triangle" class="h-8 w-8"></i>
+                            <p>Error loading configurations: ${data.message || 'Unknown error'}</p>
+                        </div>
+                    </td>
+                </tr>
+            `;
+            lucide.createIcons();
+        }
+    } catch (error) {
+        console.error('Error loading configurations:', error);
+        const tbody = document.getElementById('configTableBody');
+        tbody.innerHTML = `
+            <tr>
+                <td colspan="7" class="px-4 py-8 text-center text-destructive">
+                    <div class="flex flex-col items-center gap-2">
+                        <i data-lucide="alert-triangle" class="h-8 w-8"></i>
+                        <p>Network error: Unable to load configurations</p>
+                    </div>
+                </td>
+            </tr>
+        `;
+        lucide.createIcons();
+        showAlert('Network error: Unable to load configurations', 'error');
+    }
+}
+
+// Update statistics
+async function updateStats() {
+    try {
+        // Update device count
+        document.getElementById('totalDevices').textContent = availableDevices.length;
+
+        // Update configuration count
+        const configResponse = await fetch('/api/configurations');
+        const configData = await configResponse.json();
+        if (configData.status === 'success') {
+            document.getElementById('totalConfigs').textContent = configData.data.length;
+            document.getElementById('totalConfigsCount').textContent = configData.data.length;
+        }
+
+        // Update MQTT status
+        await updateMqttStatus();
+
+    } catch (error) {
+        console.error('Error updating stats:', error);
+    }
+}
+
+// Update MQTT status indicator
+async function updateMqttStatus() {
+    try {
+        const mqttResponse = await fetch('/api/status/mqtt');
+        const mqttData = await mqttResponse.json();
+
+        // Check if MQTT is connected (either frontend or backend)
+        renderMqttStatus(mqttData.mqtt_connected);
+    } catch (mqttError) {
+        console.error('Error checking MQTT status:', mqttError);
+        const mqttBtn = document.getElementById('mqttStatusBtn');
+        mqttBtn.className = 'flex items-center gap-2 px-3 py-1.5 text-xs rounded-full border transition-all duration-200 bg-red-100 text-red-700 border-red-200 hover:bg-red-200';
+        mqttBtn.innerHTML = '<div class="w-1 h-1 rounded-full bg-red-500"></div>MQTT Error';
+    }
+}
+
+function renderMqttStatus(connected) {
+    const mqttBtn = document.getElementById('mqttStatusBtn');
+    if (connected) {
+        mqttBtn.className = 'flex items-center gap-2 px-3 py-1.5 text-xs rounded-full border transition-all duration-200 bg-emerald-100 text-emerald-700 border-emerald-200 hover:bg-emerald-200';
+        mqttBtn.innerHTML = '<div class="w-1 h-1 rounded-full bg-emerald-500"></div>MQTT Connected';
+    } else {
+        mqttBtn.className = 'flex items-center gap-2 px-3 py-1.5 text-xs rounded-full border transition-all duration-200 bg-slate-100 text-slate-600 border-slate-200 hover:bg-slate-200';
+        mqttBtn.innerHTML = '<div class="w-1 h-1 rounded-full bg-slate-400"></div>MQTT Disconnected';
+    }
+}
+
+// Search and Filter
+function setupSearchAndFilter() {
+    const searchInput = document.getElementById('searchInput');
+
+    searchInput.addEventListener('input', debounce(() => {
+        loadConfigurations();
+    }, 300));
+}
+
+// Debounce utility
+function debounce(func, wait) {
+    let timeout;
+    return function executedFunction(...args) {
+        const later = () => {
+            clearTimeout(timeout);
+            func(...args);
+        };
+        clearTimeout(timeout);
+        timeout = setTimeout(later, wait);
+    };
+}
+
+// Keyboard Shortcuts
+function setupKeyboardShortcuts() {
+    document.addEventListener('keydown', function(e) {
+        // Ctrl + R: Refresh data
+        if (e.ctrlKey && e.key === 'r') {
+            e.preventDefault();
+            loadConfigurations();
+            loadAvailableDevices();
+            updateStats();
+            showAlert('Data refreshed', 'success');
+        }
+
+        // Ctrl + F: Focus search
+        if (e.ctrlKey && e.key === 'f') {
+            e.preventDefault();
+            document.getElementById('searchInput').focus();
+        }
+
+        // Ctrl + ,: New Config
+        if (e.ctrlKey && e.key === ',') {
+            e.preventDefault();
+            document.getElementById('createConfigBtn').click();
+        }
+    });
+}
+
+// Show alert
+function showAlert(message, type) {
+    const alertContainer = document.getElementById('alertContainer');
+
+    const alertDiv = document.createElement('div');
+    alertDiv.className = `animate-in slide-in-from-top-2 flex items-center gap-2 px-4 py-3 text-sm rounded-lg border ${
+        type === 'success'
+            ? 'bg-green-50 text-green-800 border-green-200'
+            : type === 'error'
+            ? 'bg-red-50 text-red-800 border-red-200'
+            : 'bg-blue-50 text-blue-800 border-blue-200'
+    }`;
+
+    const iconName = type === 'success' ? 'check-circle' : type === 'error' ? 'alert-triangle' : 'info';
+    alertDiv.innerHTML = `
+        <i data-lucide="${iconName}" class="h-4 w-4"></i>
+        <span>${message}</span>
+    `;
+
+    alertContainer.appendChild(alertDiv);
+    lucide.createIcons();
+
+    setTimeout(() => {
+        alertDiv.remove();
+    }, 5000);
+}
+
+// Edit configuration
+async function editConfiguration(id) {
+    try {
+        // Show loading state
+        showAlert('Loading configuration...', 'info');
+
+        const response = await fetch('/api/configurations');
+        const data = await response.json();
+
+        if (data.status === 'success') {
+            const config = data.data.find(c => c.id === id);
+            if (config) {
+                currentConfigId = id;
+                document.getElementById('editId').value = id;
+                document.getElementById('editDevice').value = config.device_name;
+                document.getElementById('editObjectName').value = config.object_name || '';
+                document.getElementById('editDesc').value = config.desc || '';
+
+                // Load pins for this device type and set the current pin
+                await loadPinsForDevice(config.part_number, 'editPin');
+                document.getElementById('editPin').value = config.pin || '';
+
+                // Show the modal
+                document.getElementById('editModal').style.display = 'flex';
+
+                // Clear the loading alert
+                setTimeout(() => {
+                    // Remove the loading alert by clearing all alerts and showing success
+                    document.getElementById('alertContainer').innerHTML = '';
+                }, 500);
+            } else {
+                showAlert('Configuration not found', 'error');
+            }
+        } else {
+            showAlert('Error loading configuration data', 'error');
+        }
+    } catch (error) {
+        console.error('Error loading configuration for edit:', error);
+        showAlert('Error loading configuration', 'error');
+    }
+}
+
+// Delete configuration - show confirmation modal
+async function deleteConfiguration(id) {
+    try {
+        // Show loading state
+        showAlert('Loading configuration details...', 'info');
+
+        const response = await fetch('/api/configurations');
+        const data = await response.json();
+
+        if (data.status === 'success') {
+            const config = data.data.find(c => c.id === id);
+            if (config) {
+                // Populate the delete modal with configuration details
+                document.getElementById('deleteObjectName').textContent = config.object_name || '-';
+                document.getElementById('deleteDeviceName').textContent = config.device_name || '-';
+                document.getElementById('deletePin').textContent = config.pin || '-';
+
+                // Store the config ID in the confirm button
+                document.getElementById('confirmDeleteBtn').dataset.configId = id;
+
+                // Show the modal
+                document.getElementById('deleteModal').style.display = 'flex';
+
+                // Clear the loading alert
+                setTimeout(() => {
+                    document.getElementById('alertContainer').innerHTML = '';
+                }, 500);
+            } else {
+                showAlert('Configuration not found', 'error');
+            }
+        } else {
+            showAlert('Error loading configuration data', 'error');
+        }
+    } catch (error) {
+        console.error('Error loading configuration for deletion:', error);
+        showAlert('Error loading configuration', 'error');
+    }
+}
+
+// Perform the actual deletion
+async function performDeleteConfiguration(id) {
+    try {
+        const response = await fetch(`/api/configurations/${id}`, {
+            method: 'DELETE'
+        });
+
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            showAlert('Configuration deleted successfully', 'success');
+            document.getElementById('deleteModal').style.display = 'none';
+
+            // Auto-refresh data after successful deletion
+            setTimeout(() => {
+                loadConfigurations();
+                updateStats();
+            }, 300);
+        } else {
+            showAlert(result.message || 'Error deleting configuration', 'error');
+        }
+    } catch (error) {
+        console.error('Error deleting configuration:', error);
+        showAlert('Error deleting configuration', 'error');
+    }
+}
+
+// Preview device details
+async function previewDevice(id) {
+    try {
+        showAlert('Loading device details...', 'info');
+
+        // Fetch configuration data
+        const configResponse = await fetch('/api/configurations');
+        const configData = await configResponse.json();
+
+        if (configData.status === 'success') {
+            const config = configData.data.find(c => c.id === id);
+            if (config) {
+                // Fetch device status
+                const statusResponse = await fetch(`/api/devices/status/${config.mac}`);
+                const statusData = await statusResponse.json();
+                const deviceStatus = statusData.status === 'success' ? statusData.device_status : 'unknown';
+
+                // Populate modal fields
+                document.getElementById('previewDeviceName').textContent = config.device_name || '-';
+                document.getElementById('previewObjectName').textContent = config.object_name || '-';
+                document.getElementById('previewPartNumber').textContent = config.part_number || '-';
+                document.getElementById('previewMac').textContent = config.mac || '-';
+                document.getElementById('previewAddress').textContent = config.address || '-';
+                document.getElementById('previewBus').textContent = config.device_bus || '-';
+                document.getElementById('previewPin').textContent = config.pin || '-';
+                document.getElementById('previewHeartbeatInterval').textContent = config.heartbeat_interval || '30';
+                document.getElementById('previewDesc').textContent = config.desc || '-';
+                document.getElementById('previewDesc').title = config.desc || '-';
+                document.getElementById('previewId').textContent = config.id || '-';
+
+                // Status information
+                const statusDot = document.getElementById('previewStatusDot');
+                const statusText = document.getElementById('previewStatus');
+
+                switch (deviceStatus) {
+                    case 'online':
+                        statusDot.className = 'w-2 h-2 rounded-full bg-emerald-500';
+                        statusText.textContent = 'Online';
+                        statusText.className = 'text-sm font-medium text-emerald-700';
+                        break;
+                    case 'offline':
+                        statusDot.className = 'w-2 h-2 rounded-full bg-slate-500';
+                        statusText.textContent = 'Offline';
+                        statusText.className = 'text-sm font-medium text-slate-700';
+                        break;
+                    default:
+                        statusDot.className = 'w-2 h-2 rounded-full bg-yellow-500';
+                        statusText.textContent = 'Unknown';
+                        statusText.className = 'text-sm font-medium text-yellow-700';
+                }
+
+                // Timestamps
+                document.getElementById('previewLastSeen').textContent = config.last_seen ? formatDateTime(config.last_seen) : 'Never';
+                document.getElementById('previewCreatedAt').textContent = config.created_at ? formatDateTime(config.created_at) : '-';
+                document.getElementById('previewUpdatedAt').textContent = config.updated_at ? formatDateTime(config.updated_at) : '-';
+                document.getElementById('previewStatusUpdate').textContent = new Date().toLocaleString();
+
+                // Show modal
+                document.getElementById('previewModal').style.display = 'flex';
+
+                // Clear loading alert
+                setTimeout(() => {
+                    document.getElementById('alertContainer').innerHTML = '';
+                }, 500);
+            } else {
+                showAlert('Configuration not found', 'error');
+            }
+        } else {
+            showAlert('Error loading configuration data', 'error');
+        }
+    } catch (error) {
+        console.error('Error loading device details:', error);
+        showAlert('Error loading device details', 'error');
+    }
+}
+
+// Format date/time for display
+function formatDateTime(isoString) {
+    try {
+        const date = new Date(isoString.replace('Z', ''));
+        return date.toLocaleString('id-ID', {
+            year: 'numeric',
+            month: 'short',
+            day: 'numeric',
+            hour: '2-digit',
+            minute: '2-digit',
+            second: '2-digit',
+            timeZoneName: 'short'
+        });
+    } catch (error) {
+        return isoString || '-';
+    }
+}
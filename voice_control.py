@@ -5,23 +5,146 @@ Provides speech-to-text functionality to control relays based on voice commands.
 """
 
 import json
+import os
 import time
 import threading
 import speech_recognition as sr
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
-from middleware.mqtt_handler import MQTTHandler
+from middleware.mqtt_manager import MQTTConnectionManager
 from middleware.logging import setup_logging, log_simple
+from middleware.noise_floor import NoiseFloorEstimator, attach_noise_estimator
+from middleware.text_intake import TextCommandIntake
+from middleware.command_scheduler import OutboundCommandScheduler
+from middleware.payload_codec import ModularCommandTemplate, get_codec
+from middleware.actuation import ActuationTracker
+
+def parse_input_spec(spec):
+    """
+    Parse an audio input specification such as "meeting:1,lobby:3".
+    Malformed entries and repeated names are logged and skipped.
+
+    Args:
+        spec: Comma separated "name:device_index" pairs; a bare index is named after itself
+
+    Returns:
+        List of input definitions with name and device_index keys
+    """
+    inputs = []
+    names = set()
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, index = item.rpartition(':')
+        name = name.strip()
+        index = index.strip()
+        if index and not index.isdecimal():
+            log_simple(f"Skipping voice input '{item}': device index must be a non-negative integer", "WARNING")
+            continue
+        if not name:
+            name = f"mic{index}" if index else "default"
+        if name in names:
+            log_simple(f"Skipping voice input '{item}': name '{name}' is already used", "WARNING")
+            continue
+        names.add(name)
+        inputs.append({'name': name, 'device_index': int(index) if index else None})
+    return inputs
+
+class AudioInput:
+    """
+    One microphone capture stream.
+    Owns its recognizer and noise calibration; recognition runs on the shared pool.
+    """
+
+    def __init__(self, name="default", device_index=None, adaptive_noise=True):
+        """
+        Initialize audio input.
+
+        Args:
+            name: Input name used to tag command results (e.g. room name)
+            device_index: PyAudio device index, None for the system default
+            adaptive_noise: Enable continuous ambient-noise calibration
+        """
+        self.name = name
+        self.device_index = device_index
+        self.recognizer = sr.Recognizer()
+        self.active = False
+
+        # Continuous ambient-noise calibration (replaces the one-shot adjustment)
+        self.noise_estimator = None
+        if adaptive_noise:
+            self.recognizer.dynamic_energy_threshold = False
+            self.noise_estimator = NoiseFloorEstimator(self.recognizer)
+
+    def get_noise_stats(self):
+        """Get current energy threshold and noise floor history for diagnostics"""
+        if self.noise_estimator:
+            stats = self.noise_estimator.get_stats()
+            stats['adaptive'] = True
+        else:
+            stats = {
+                'adaptive': False,
+                'threshold': round(self.recognizer.energy_threshold, 1)
+            }
+        stats['device_index'] = self.device_index
+        stats['active'] = self.active
+        return stats
 
 class VoiceControl:
-    def __init__(self, config_file="JSON/automationVoiceConfig.json"):
+    COMPONENT = "voice_control"
+
+    def __init__(self, config_file="JSON/automationVoiceConfig.json", adaptive_noise=True,
+                 inputs: Optional[List[Dict[str, Any]]] = None, recognition_workers=2,
+                 text_topic="voice/text", text_socket=None, text_stdin=False, mqtt_manager=None,
+                 command_window=0.3, track_actuation=None, actuation_topic="device/status/+",
+                 actuation_timeout=5.0):
         self.config_file = config_file
-        self.mqtt = MQTTHandler(client_id="voice_control")
-        self.recognizer = sr.Recognizer()
+        # Use the shared connection when one is provided, otherwise a private one
+        self.mqtt_manager = mqtt_manager or MQTTConnectionManager(client_id="voice_control")
+        self.mqtt = self.mqtt_manager.handler
         self.is_listening = False
+
+        # Collapses repeated/superseded writes to the same relay pin
+        self.command_scheduler = OutboundCommandScheduler(self.mqtt.publish_async, window=command_window)
+        self._command_templates = {}
         self.logger = setup_logging()
 
+        # Optional end-to-end tracking: publish -> device confirmation on actuation_topic
+        if track_actuation is None:
+            track_actuation = os.environ.get('VOICE_TRACK_ACTUATION', '').lower() in ('1', 'true', 'yes')
+        self.actuation_topic = actuation_topic
+        self.actuation = ActuationTracker(timeout=actuation_timeout) if track_actuation else None
+
+        # Capture streams; all of them share the recognition pool, parser cache and MQTT client
+        if inputs is None:
+            inputs = parse_input_spec(os.environ.get('VOICE_INPUTS')) or [{'name': 'default'}]
+        self.inputs = [
+            AudioInput(i.get('name', 'default'), i.get('device_index'), adaptive_noise)
+            for i in inputs
+        ]
+        self.recognizer = self.inputs[0].recognizer
+        self.noise_estimator = self.inputs[0].noise_estimator
+        self.recognition_workers = recognition_workers
+        self.recognition_pool = None
+
+        # Event-driven text command intake (MQTT topic, UNIX socket, stdin)
+        self.text_topic = text_topic
+        self.text_socket = text_socket or os.environ.get('VOICE_TEXT_SOCKET')
+        self.text_stdin = text_stdin
+        self.text_intake = TextCommandIntake(
+            lambda text, source: self.process_voice_command(text, input_name=source)
+        )
+
+        # Parsed configuration cache, invalidated when the config file changes
+        self._config_cache = None
+        self._config_mtime = None
+        self._config_lock = threading.Lock()
+        self._result_lock = threading.Lock()
+        self._result_listeners = []
+
         # Voice commands mapping
         self.voice_commands = {
             # Indonesian commands
@@ -57,22 +180,34 @@ class VoiceControl:
             'device_name': '',
             'pin': '',
             'mqtt_success': False,
+            'queued': False,
             'error_message': '',
-            'success': False
+            'success': False,
+            'input': ''
         }
+        self.last_results_by_input = {}
 
     def load_configurations(self):
-        """Load automation voice configurations"""
+        """Load automation voice configurations (cached until the file changes)"""
         try:
-            with open(self.config_file, 'r') as f:
-                data = json.load(f)
+            with self._config_lock:
+                mtime = os.stat(self.config_file).st_mtime_ns
+                if self._config_cache is not None and mtime == self._config_mtime:
+                    return self._config_cache
+
+                with open(self.config_file, 'r') as f:
+                    data = json.load(f)
                 # Ensure it's a list
                 if isinstance(data, dict) and "configurations" in data:
-                    return data["configurations"]
+                    configurations = data["configurations"]
                 elif isinstance(data, list):
-                    return data
+                    configurations = data
                 else:
-                    return []
+                    configurations = []
+
+                self._config_cache = configurations
+                self._config_mtime = mtime
+                return configurations
         except (FileNotFoundError, json.JSONDecodeError) as e:
             log_simple(f"Error loading configurations: {e}", "ERROR")
             return []
@@ -136,8 +271,21 @@ class VoiceControl:
 
         return None
 
-    def control_relay(self, config, action):
-        """Control relay using MQTT"""
+    def control_relay(self, config, action, wait=True, result=None):
+        """
+        Control relay using MQTT.
+
+        Args:
+            config: Configuration entry of the target relay
+            action: "on", "off" or "toggle"
+            wait: Wait for the broker acknowledgement; with False the publish Future is
+                  returned so callers can pipeline several writes (False if no payload could be built)
+            result: Optional command result dict; with actuation tracking enabled and wait=True
+                    the device confirmation is awaited and stored under 'actuation'
+
+        Returns True once acknowledged, or when the write was buffered while MQTT is
+        disconnected (result['queued'] is then set and it is sent on reconnect).
+        """
         try:
             # Determine data value based on action
             if action == "on":
@@ -152,25 +300,47 @@ class VoiceControl:
                 log_simple(f"Unknown action: {action}", "ERROR")
                 return False
 
-            # Prepare MQTT payload
-            payload = {
-                "mac": config.get('mac', '00:00:00:00:00:00'),
-                "protocol_type": "Modular",
-                "device": config.get('part_number', 'RELAY'),
-                "function": "write",
-                "value": {
-                    "pin": config.get('pin', 1),
-                    "data": data_value
-                },
-                "address": config.get('address', 0),
-                "device_bus": config.get('device_bus', 0),
-                "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-
-            # Publish to MQTT
-            success = self.mqtt.publish("modular", payload)
-
-            if success:
+            # Prepare MQTT payload from the pre-encoded template of this configuration
+            template = self.get_command_template(config)
+            payload = template.render(data_value)
+
+            # Publish to MQTT, coalesced per relay pin
+            fields = template.fields
+            key = (fields["mac"], fields["address"], fields["device_bus"], template.pin)
+            actuation = None
+            if self.actuation is not None:
+                # Registered before publishing so a fast confirmation cannot be missed
+                actuation = self.actuation.track(fields["mac"], fields["address"], template.pin, data_value)
+            future = self.command_scheduler.submit(key, "modular", payload, data_value)
+            if not wait:
+                return future
+
+            queued = not future.done() and self.mqtt.is_buffering()
+            if queued:
+                # Waits in the offline queue and switches the relay on reconnect (within its TTL)
+                success = True
+            else:
+                try:
+                    success = future.result(timeout=self.mqtt.publish_timeout)
+                except Exception:
+                    success = False
+            if result is not None:
+                result['queued'] = queued
+
+            if actuation is not None:
+                if not success or queued:
+                    self.actuation.cancel(actuation)
+                elif result is not None:
+                    try:
+                        result['actuation'] = actuation.result(timeout=self.actuation.timeout + 1)
+                    except Exception:
+                        result['actuation'] = {'confirmed': False, 'timed_out': True, 'latency_ms': None}
+
+            if queued:
+                device_name = config.get('object_name') or config.get('device_name')
+                log_simple(f"MQTT disconnected, queued {device_name} - {action} until reconnect", "WARNING")
+                return True
+            elif success:
                 device_name = config.get('object_name') or config.get('device_name')
                 log_simple(f"Successfully controlled {device_name} - {action}", "SUCCESS")
                 return True
@@ -182,13 +352,34 @@ class VoiceControl:
             log_simple(f"Error controlling relay: {e}", "ERROR")
             return False
 
-    def process_voice_command(self, text):
-        """Process voice command and execute control"""
-        text_lower = text.lower().strip()
-        log_simple(f"Processing voice command: '{text}'", "INFO")
-
-        # Reset last command result
-        self.last_command_result = {
+    def get_command_template(self, config):
+        """
+        Get the cached write-command template for a configuration.
+        The codec comes from the configuration's "payload_codec" field or the codec
+        negotiated with the device on the MQTT handler.
+        """
+        codec_name = config.get('payload_codec')
+        codec = get_codec(codec_name) if codec_name else self.mqtt.codec_for("modular", device=config.get('mac'))
+        key = (config.get('mac'), config.get('part_number'), config.get('pin'),
+               config.get('address'), config.get('device_bus'), codec.name)
+
+        template = self._command_templates.get(key)
+        if template is None:
+            if len(self._command_templates) >= 1024:
+                self._command_templates.clear()
+            template = self._command_templates[key] = ModularCommandTemplate(config, codec)
+        return template
+
+    def process_voice_command(self, text, input_name=None):
+        """
+        Process voice command and execute control.
+
+        Args:
+            text: Recognized (or typed) command text
+            input_name: Name of the input the command came from, used to tag the result
+        """
+        # Build the result locally; several inputs may be processing at once
+        result = {
             'timestamp': datetime.now().isoformat(),
             'command_text': text,
             'recognized_text': text,
@@ -198,32 +389,59 @@ class VoiceControl:
             'device_name': '',
             'pin': '',
             'mqtt_success': False,
+            'queued': False,
             'error_message': '',
-            'success': False
+            'success': False,
+            'input': input_name or ''
         }
+        try:
+            return self._execute_command(text, result)
+        finally:
+            self._store_result(result)
+
+    def add_result_listener(self, callback):
+        """Register a callback called with every finished command result"""
+        self._result_listeners.append(callback)
+
+    def _store_result(self, result):
+        """Publish a finished command result as the latest one (overall and per input)"""
+        with self._result_lock:
+            self.last_command_result = result
+            if result.get('input'):
+                self.last_results_by_input[result['input']] = result
+        for listener in list(self._result_listeners):
+            try:
+                listener(result)
+            except Exception as e:
+                log_simple(f"Error in command result listener: {e}", "ERROR")
+
+    def _execute_command(self, text, result):
+        """Analyze command text, resolve the configuration and publish the relay write"""
+        text_lower = text.lower().strip()
+        log_simple(f"Processing voice command: '{text}'", "INFO")
 
         # Step 1: Analyze command - what action is being requested (on/off → boolean 1/0)
         action = self.analyze_command_action(text_lower)
         if not action:
             log_simple(f"No valid action found in command: {text}", "WARNING")
-            self.last_command_result['error_message'] = f"No valid action found in command: {text}"
+            result['error_message'] = f"No valid action found in command: {text}"
             return False
 
-        self.last_command_result['action'] = action
+        result['action'] = action
 
         # Convert action to boolean data value
         data_value = 1 if action == "on" else 0
-        log_simple(f"Command analysis: action='{action}' → data_value={data_value}", "INFO")
+        log_simple("Command analysis: action='%s' → data_value=%s", "DEBUG", action, data_value)
 
         # Step 2: Extract object name from command (what device to control)
         object_name = self.extract_object_name(text_lower, action)
         if not object_name:
             log_simple(f"Could not extract object name from: {text}", "WARNING")
-            self.last_command_result['error_message'] = f"Could not extract object name from: {text}"
+            result['error_message'] = f"Could not extract object name from: {text}"
             return False
 
-        self.last_command_result['object_name'] = object_name
-        log_simple(f"Object extraction: '{object_name}'", "INFO")
+        result['object_name'] = object_name
+        log_simple("Object extraction: '%s'", "DEBUG", object_name)
 
         # Step 3: Find configuration using object_name as key
         config = self.find_configuration_by_object_name(object_name)
@@ -231,100 +449,119 @@ class VoiceControl:
             log_simple(f"No configuration found for object: '{object_name}'", "WARNING")
             available_devices = [c.get('object_name', '') for c in self.load_configurations() if c.get('object_name')]
             log_simple(f"Available objects: {', '.join(available_devices)}", "INFO")
-            self.last_command_result['error_message'] = f"No configuration found for object: '{object_name}'. Available: {', '.join(available_devices)}"
+            result['error_message'] = f"No configuration found for object: '{object_name}'. Available: {', '.join(available_devices)}"
             return False
 
-        self.last_command_result['device_found'] = True
-        self.last_command_result['device_name'] = config.get('object_name') or config.get('device_name')
+        result['device_found'] = True
+        result['device_name'] = config.get('object_name') or config.get('device_name')
 
         # Step 4: Extract pin data from JSON configuration
         pin = config.get('pin', 1)
-        self.last_command_result['pin'] = pin
-        log_simple(f"Configuration found: {config.get('object_name')} → pin {pin}", "INFO")
+        result['pin'] = pin
+        log_simple("Configuration found: %s → pin %s", "DEBUG", config.get('object_name'), pin)
 
         # Step 5: Create MQTT payload and publish
-        mqtt_success = self.control_relay(config, action)
-        self.last_command_result['mqtt_success'] = mqtt_success
+        mqtt_success = self.control_relay(config, action, result=result)
+        result['mqtt_success'] = mqtt_success
 
         if mqtt_success:
-            self.last_command_result['success'] = True
+            result['success'] = True
             log_simple("Command executed successfully", "SUCCESS")
         else:
-            self.last_command_result['error_message'] = "Failed to publish MQTT command"
+            result['error_message'] = "Failed to publish MQTT command"
             log_simple("Command execution failed", "WARNING")
 
         return mqtt_success
 
     def listen_for_commands(self):
-        """Listen for voice commands"""
+        """Listen for voice commands on every configured input"""
         if hasattr(self, 'demo_mode') and self.demo_mode:
-            # Demo mode - simulate voice control without microphone
+            # Demo mode - no microphone; commands arrive through the text intake
             log_simple("Voice control running in DEMO mode", "INFO")
             log_simple("Demo commands available: 'nyalakan lampu', 'matikan lampu', 'toggle lampu'", "INFO")
-
-            while self.is_listening:
-                try:
-                    # In demo mode, just wait and show status
-                    time.sleep(2)
-                    log_simple("Demo mode: Voice control active (use test_voice_command for testing)", "INFO")
-                except Exception as e:
-                    log_simple(f"Demo mode error: {e}", "ERROR")
-                    break
+            log_simple(f"Send text commands via MQTT topic '{self.text_topic}', the text socket or test_voice_command", "INFO")
         else:
-            # Normal mode with microphone
-            try:
-                with sr.Microphone() as source:
-                    log_simple("Adjusting for ambient noise...", "INFO")
-                    self.recognizer.adjust_for_ambient_noise(source, duration=1)
-
-                    log_simple("Voice control activated. Say commands like 'turn on lamp' or 'matikan lampu'", "SUCCESS")
-
-                    while self.is_listening:
-                        try:
-                            log_simple("Listening for command...", "INFO")
-                            audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=5)
-
-                            # Recognize speech
-                            text = self.recognizer.recognize_google(audio, language='id-ID')
-                            log_simple(f"Heard: {text}", "INFO")
-
-                            # Process command
-                            success = self.process_voice_command(text)
-
-                            if success:
-                                log_simple("Command executed successfully", "SUCCESS")
-                            else:
-                                log_simple("Command execution failed", "WARNING")
-
-                        except sr.WaitTimeoutError:
-                            # Timeout, continue listening
-                            continue
-                        except sr.UnknownValueError:
-                            log_simple("Could not understand audio", "WARNING")
-                            continue
-                        except sr.RequestError as e:
-                            log_simple(f"Speech recognition error: {e}", "ERROR")
-                            time.sleep(1)
-                            continue
-                        except Exception as e:
-                            log_simple(f"Unexpected error: {e}", "ERROR")
-                            continue
-            except Exception as e:
-                log_simple(f"Failed to initialize microphone: {e}", "ERROR")
+            # Normal mode with microphone(s): one capture thread per input
+            capture_threads = []
+            for audio_input in self.inputs:
+                thread = threading.Thread(target=self.capture_input, args=(audio_input,), daemon=True)
+                thread.start()
+                capture_threads.append(thread)
+
+            for thread in capture_threads:
+                thread.join()
+
+            if self.is_listening:
+                log_simple("No audio input could be opened", "ERROR")
                 log_simple("Falling back to demo mode", "WARNING")
                 self.demo_mode = True
                 # Recursively call in demo mode
                 self.listen_for_commands()
 
+    def capture_input(self, audio_input):
+        """Capture phrases from one input and hand them to the recognition pool"""
+        try:
+            with sr.Microphone(device_index=audio_input.device_index) as source:
+                log_simple(f"[{audio_input.name}] Adjusting for ambient noise...", "INFO")
+                audio_input.recognizer.adjust_for_ambient_noise(source, duration=1)
+                if audio_input.noise_estimator:
+                    # Keep recalibrating from non-speech frames while listening
+                    attach_noise_estimator(source, audio_input.noise_estimator)
+
+                audio_input.active = True
+                log_simple(f"[{audio_input.name}] Voice control activated. Say commands like 'turn on lamp' or 'matikan lampu'", "SUCCESS")
+
+                while self.is_listening:
+                    try:
+                        log_simple("[%s] Listening for command...", "DEBUG", audio_input.name)
+                        audio = audio_input.recognizer.listen(source, timeout=5, phrase_time_limit=5)
+
+                        # Recognition runs on the shared pool so capture never stalls
+                        self.recognition_pool.submit(self.recognize_and_process, audio_input, audio)
+
+                    except sr.WaitTimeoutError:
+                        # Timeout, continue listening
+                        continue
+                    except Exception as e:
+                        log_simple(f"[{audio_input.name}] Unexpected error: {e}", "ERROR")
+                        continue
+        except Exception as e:
+            log_simple(f"[{audio_input.name}] Failed to initialize microphone: {e}", "ERROR")
+        finally:
+            audio_input.active = False
+
+    def recognize_and_process(self, audio_input, audio):
+        """Recognize a captured phrase and execute it, tagged with its input"""
+        try:
+            # Recognize speech
+            text = audio_input.recognizer.recognize_google(audio, language='id-ID')
+            log_simple(f"[{audio_input.name}] Heard: {text}", "INFO")
+
+            # Process command
+            success = self.process_voice_command(text, input_name=audio_input.name)
+
+            if success:
+                log_simple(f"[{audio_input.name}] Command executed successfully", "SUCCESS")
+            else:
+                log_simple(f"[{audio_input.name}] Command execution failed", "WARNING")
+
+        except sr.UnknownValueError:
+            log_simple(f"[{audio_input.name}] Could not understand audio", "WARNING")
+        except sr.RequestError as e:
+            log_simple(f"[{audio_input.name}] Speech recognition error: {e}", "ERROR")
+        except Exception as e:
+            log_simple(f"[{audio_input.name}] Unexpected error: {e}", "ERROR")
+
     def start_voice_control(self):
         """Start voice control"""
         try:
-            # First, check if we can access microphone
+            # First, check if we can access the microphones
             log_simple("Checking audio device availability...", "INFO")
-            with sr.Microphone() as source:
-                # Try to access microphone briefly
-                pass
-            log_simple("Audio device available", "SUCCESS")
+            for audio_input in self.inputs:
+                with sr.Microphone(device_index=audio_input.device_index) as source:
+                    # Try to access microphone briefly
+                    pass
+            log_simple(f"Audio device available ({len(self.inputs)} input(s))", "SUCCESS")
         except OSError as e:
             log_simple(f"No audio device available: {e}", "ERROR")
             log_simple("Voice control requires microphone access. Running in demo mode.", "WARNING")
@@ -335,12 +572,18 @@ class VoiceControl:
             log_simple("Voice control requires microphone access. Running in demo mode.", "WARNING")
             self.demo_mode = True
 
-        # Connect to MQTT
-        if not self.mqtt.connect():
-            log_simple("Failed to connect to MQTT broker", "ERROR")
-            return False
+        # Connect to MQTT; commands are buffered while the broker is unreachable
+        if not self.mqtt_manager.acquire(self.COMPONENT):
+            log_simple("MQTT broker not reachable yet, retrying in background", "WARNING")
+        if self.actuation is not None:
+            self.mqtt.add_handler(self.actuation_topic, self.actuation.on_message, self.COMPONENT)
 
         self.is_listening = True
+        self.start_text_intake()
+        self.recognition_pool = ThreadPoolExecutor(
+            max_workers=self.recognition_workers,
+            thread_name_prefix="voice_recognition"
+        )
 
         # Start listening in a separate thread
         voice_thread = threading.Thread(target=self.listen_for_commands)
@@ -355,24 +598,59 @@ class VoiceControl:
 
         return True
 
+    def start_text_intake(self):
+        """Start text command sources feeding the shared command queue"""
+        self.text_intake.start()
+        if self.text_topic:
+            self.text_intake.attach_mqtt(self.mqtt, self.text_topic, self.COMPONENT)
+        if self.text_socket:
+            self.text_intake.start_unix_socket(self.text_socket)
+        if self.text_stdin:
+            self.text_intake.start_stdin()
+
     def stop_voice_control(self):
         """Stop voice control"""
         self.is_listening = False
-        self.mqtt.disconnect()
+        self.text_intake.stop()
+        if self.recognition_pool:
+            self.recognition_pool.shutdown(wait=False)
+            self.recognition_pool = None
+        self.mqtt_manager.release(self.COMPONENT)
         log_simple("Voice control stopped", "SUCCESS")
 
-    def test_voice_command(self, text):
+    def test_voice_command(self, text, input_name=None):
         """Test voice command processing without MQTT"""
         log_simple(f"Testing voice command: {text}", "INFO")
-        return self.process_voice_command(text)
-
-    def get_last_command_result(self):
-        """Get the result of the last processed command for UI display"""
-        return self.last_command_result.copy()
+        return self.process_voice_command(text, input_name=input_name)
+
+    def get_last_command_result(self, input_name=None):
+        """
+        Get the result of the last processed command for UI display.
+
+        Args:
+            input_name: Return the latest result of this input instead of the overall latest
+        """
+        with self._result_lock:
+            if input_name:
+                result = self.last_results_by_input.get(input_name)
+                return result.copy() if result else None
+            return self.last_command_result.copy()
+
+    def get_command_stats(self):
+        """Get outbound relay write coalescing counters and actuation confirmation latency"""
+        stats = self.command_scheduler.get_stats()
+        stats['actuation'] = self.actuation.get_stats() if self.actuation is not None else None
+        return stats
+
+    def get_noise_stats(self):
+        """Get current energy threshold and noise floor history for diagnostics"""
+        stats = self.inputs[0].get_noise_stats()
+        stats['inputs'] = {audio_input.name: audio_input.get_noise_stats() for audio_input in self.inputs}
+        return stats
 
 def main():
     """Main function"""
-    voice_control = VoiceControl()
+    voice_control = VoiceControl(text_stdin=True)
 
     try:
         if voice_control.start_voice_control():
@@ -0,0 +1,16 @@
+"""
+WSGI entry point for production serving.
+
+Each HTTP worker only holds an IPC client of the backend service process, so
+any number of workers can run side by side:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py starts the backend process (python backend.py) once, before
+the workers fork.
+"""
+
+from app import create_app
+from middleware.ipc import IPCClient
+
+app = create_app(IPCClient())